@@ -6,16 +6,21 @@ It handles the creation of browser profiles using FingerprintSwitcher and manage
 import json
 import logging
 import os
+from typing import Union
 
 import click
 from pydantic import FilePath
 
-from pybas_automation.browser_profile import BrowserProfileStorage
+from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy
+from pybas_automation.browser_profile import BrowserProfileStorage, ProxyPool
 from pybas_automation.proxy_providers.brightdata import BrightdataCredentialsModel, BrightDataProxyModel
 from pybas_automation.task import BasTask, TaskStorage, TaskStorageModeEnum
 
 logger = logging.getLogger("[cmd_worker]")
 
+# Number of profiles created at once.
+PROFILES_CONCURRENCY = 10
+
 
 def run(
     fingerprint_key: str,
@@ -23,6 +28,7 @@ def run(
     proxy_provider: str,
     proxy_username: str,
     proxy_password: str,
+    refresh_proxies: bool = False,
 ) -> FilePath:
     """
     Initialize and run the script.
@@ -32,6 +38,7 @@ def run(
     :param proxy_provider: Proxy provider to use.
     :param proxy_username: Proxy provider username.
     :param proxy_password: Proxy provider password.
+    :param refresh_proxies: Check the proxies of the profiles and rotate the failing ones before generating tasks.
 
     :return: Path to the generated tasks file.
     """
@@ -56,33 +63,50 @@ def run(
 
     needs = limit_tasks - browser_profile_storage.count()
 
-    # Create any additional profiles if necessary
-    if needs > 0:
-        for _ in range(needs):
-            browser_profile = browser_profile_storage.new()
-
-            match proxy_provider:
-                case "brightdata":
-                    credentials = BrightdataCredentialsModel(username=proxy_username, password=proxy_password)
-                    proxy = BrightDataProxyModel(credentials=credentials)
+    def proxy_factory() -> Union[BasActionBrowserProxy, None]:
+        """Return the proxy of a new profile."""
 
-                    proxy_bas = proxy.to_bas_proxy(keep_session=True)
-                    browser_profile.proxy = proxy_bas
-                    browser_profile.save_proxy_to_profile()
+        match proxy_provider:
+            case "brightdata":
+                credentials = BrightdataCredentialsModel(username=proxy_username, password=proxy_password)
+                proxy = BrightDataProxyModel(credentials=credentials)
+                return proxy.to_bas_proxy(keep_session=True)
 
-            logger.debug("Created new profile: %s", browser_profile.profile_dir)
+        return None
 
-    # Generate tasks corresponding to each profile
-    for browser_profile in browser_profile_storage.load_all()[:limit_tasks]:
-        task = BasTask()
-
-        task.browser_settings.profile.profile_folder_path = browser_profile.profile_dir
-        task.browser_settings.proxy = browser_profile.proxy
+    # Create any additional profiles if necessary, fetching the fingerprints concurrently
+    if needs > 0:
+        result = browser_profile_storage.new_many(
+            n=needs, concurrency=PROFILES_CONCURRENCY, proxy_factory=proxy_factory
+        )
 
-        task_storage.save(task=task)
+        for browser_profile in result.profiles:
+            logger.debug("Created new profile: %s", browser_profile.profile_dir)
+        if result.failures:
+            logger.warning("Failed to create %d of %d profiles", len(result.failures), needs)
+
+    # Give the profiles whose proxy sessions are dead or slow new sessions, before tasks start behind them.
+    # Checking every proxy takes a while, so it is only done on request.
+    if proxy_provider and refresh_proxies:
+        proxy_pool = ProxyPool(storage=browser_profile_storage, proxy_factory=proxy_factory)
+        rotated = proxy_pool.refresh()
+        if rotated:
+            logger.info("Rotated the proxies of %d profiles", len(rotated))
+
+    # Generate tasks corresponding to each profile and write them all at once
+    # The manifest has everything a task needs, the fingerprints are not read.
+    with task_storage.batch() as batch:
+        for entry in browser_profile_storage.entries()[:limit_tasks]:
+            task = BasTask()
+
+            task.browser_settings.profile.profile_folder_path = browser_profile_storage.profile_dir(
+                profile_name=entry.profile_name
+            )
+            task.browser_settings.proxy = entry.proxy
+
+            batch.save(task=task)
 
     logger.info("Total tasks generated: %d", task_storage.count())
-    task_storage.save_all()
 
     return task_storage.task_file_path
 
@@ -96,13 +120,24 @@ def run(
 @click.option("--proxy_provider", help="Proxy provider to use.", type=str, default="")
 @click.option("--proxy_username", help="Proxy provider username.", type=str, default="")
 @click.option("--proxy_password", help="Proxy provider password.", type=str, default="")
+@click.option(
+    "--refresh_proxies",
+    help="Check the proxies of the profiles and rotate the failing ones.",
+    is_flag=True,
+    default=False,
+)
 @click.option(
     "--limit_tasks",
     help="Number of tasks/profiles.",
     default=10,
 )
 def main(
-    bas_fingerprint_key: str, limit_tasks: int, proxy_provider: str, proxy_username: str, proxy_password: str
+    bas_fingerprint_key: str,
+    limit_tasks: int,
+    proxy_provider: str,
+    proxy_username: str,
+    proxy_password: str,
+    refresh_proxies: bool,
 ) -> None:
     """
     Entry point of the script. Sets up logging, validates the fingerprint key,
@@ -111,6 +146,7 @@ def main(
     :param bas_fingerprint_key: Personal fingerprint key from FingerprintSwitcher.
     :param limit_tasks: Number of tasks/profiles to be created.
     :param proxy_provider: Proxy provider to use.
+    :param refresh_proxies: Check the proxies of the profiles and rotate the failing ones.
 
     :return: None.
     """
@@ -153,6 +189,7 @@ def main(
         proxy_provider=proxy_provider,
         proxy_username=proxy_username,
         proxy_password=proxy_password,
+        refresh_proxies=refresh_proxies,
     )
 
     # Print the path for potential use in BAS
@@ -46,14 +46,11 @@ async def run(task_id: UUID, remote_debugging_port: int, unique_process_id: str)
 
     logger.debug("Retrieving task with ID: %s", task_id)
 
-    task_storage = TaskStorage(mode=TaskStorageModeEnum.READ_WRITE)
-
-    # Ensure there are tasks to load
-    if not task_storage.load_all():
-        raise ValueError("No tasks available for processing")
+    # Only this worker's task is needed, so skip loading and validating all the other tasks.
+    task_storage = TaskStorage(mode=TaskStorageModeEnum.READ_WRITE, preload=False)
 
     # Fetch the specified task
-    found_task = task_storage.get(task_id=task_id)
+    found_task = task_storage.load_one(task_id=task_id)
     if not found_task:
         raise ValueError(f"Task with ID {task_id} not found")
 
@@ -70,10 +67,10 @@ async def run(task_id: UUID, remote_debugging_port: int, unique_process_id: str)
     screenshot_filename = os.path.join(os.path.dirname(__file__), "reports", f"{found_task.task_id}_screenshot.png")
 
     browser_profile_storage = BrowserProfileStorage()
-    browser_profile_storage.load_all()
 
     profile_name = os.path.basename(found_task.browser_settings.profile.profile_folder_path)
     browser_profile = browser_profile_storage.load(profile_name=profile_name)
+    browser_profile_storage.touch(profile_name=profile_name)
     print(browser_profile.profile_dir)
 
     async with BrowserAutomator(
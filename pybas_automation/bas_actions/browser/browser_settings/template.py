@@ -0,0 +1,193 @@
+"""
+Browser / Browser Settings template.
+
+Most tasks use the same browser settings apart from the profile and the proxy. A template holds the common settings
+once, so tasks can be stored as their differences from the template, and the sections left unchanged are shared
+between the tasks in memory.
+"""
+
+import copy
+from typing import Any, Dict, Tuple, Type, TypeVar, Union
+
+from pydantic import BaseModel, ConfigDict
+
+from pybas_automation.bas_actions.browser.browser_settings.models import BasActionBrowserSettings
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Sections that rarely differ between tasks, their instances are shared.
+_shared_sections: Tuple[str, ...] = ("components", "network", "rendering", "fingerprint")
+
+_frozen_models: Dict[Type[BaseModel], Type[BaseModel]] = {}
+
+
+def _frozen_model(model: Type[ModelT]) -> Type[ModelT]:
+    """
+    Get a frozen subclass of a model, its instances can be shared safely.
+
+    Instances compare equal to the instances of the model with the same values.
+    """
+
+    if model in _frozen_models:
+        return _frozen_models[model]  # type: ignore
+
+    def __eq__(self: BaseModel, other: Any) -> bool:  # pylint: disable=invalid-name
+        if isinstance(other, model):
+            return self.__dict__ == other.__dict__
+        return NotImplemented
+
+    def __hash__(self: BaseModel) -> int:  # pylint: disable=invalid-name
+        return hash(tuple(self.__dict__.values()))
+
+    namespace = {
+        "__module__": model.__module__,
+        "__qualname__": model.__qualname__,
+        "__doc__": model.__doc__,
+        "model_config": ConfigDict(frozen=True),
+        "__eq__": __eq__,
+        "__hash__": __hash__,
+    }
+
+    _frozen_models[model] = type(model.__name__, (model,), namespace)
+
+    return _frozen_models[model]  # type: ignore
+
+
+def _delta(data: Dict[str, Any], template: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the values of data that differ from the template, nested dicts are compared key by key."""
+
+    delta: Dict[str, Any] = {}
+
+    for key, value in data.items():
+        if key not in template:
+            delta[key] = value
+            continue
+
+        template_value = template[key]
+        if isinstance(value, dict) and isinstance(template_value, dict):
+            nested = _delta(value, template_value)
+            if nested:
+                delta[key] = nested
+        elif value != template_value:
+            delta[key] = value
+
+    return delta
+
+
+def _merge(template: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of the template with the delta applied, the reverse of _delta()."""
+
+    data = {key: copy.deepcopy(value) for key, value in template.items() if key not in delta}
+
+    for key, value in delta.items():
+        template_value = template.get(key)
+        if isinstance(value, dict) and isinstance(template_value, dict):
+            data[key] = _merge(template_value, value)
+        else:
+            data[key] = value
+
+    return data
+
+
+class BasActionBrowserSettingsTemplate:
+    """
+    Browser settings the settings of many tasks are derived from.
+
+    The template is immutable, create a new one to change it.
+    """
+
+    _settings: BasActionBrowserSettings
+    _data: Dict[str, Any]
+    _shared: Dict[str, BaseModel]
+
+    def __init__(self, settings: Union[BasActionBrowserSettings, None] = None) -> None:
+        """
+        Initialize BasActionBrowserSettingsTemplate.
+
+        :param settings: The common browser settings. Defaults to BasActionBrowserSettings().
+        """
+
+        if settings is None:
+            settings = BasActionBrowserSettings()
+
+        self._data = settings.model_dump(mode="json")
+        self._settings = BasActionBrowserSettings.model_validate(self._data)
+        self._shared = {}
+        for name in _shared_sections:
+            section = getattr(self._settings, name)
+            self._shared[name] = _frozen_model(type(section)).model_validate(section.model_dump())
+
+    def __repr__(self) -> str:
+        """Return a string representation of the BasActionBrowserSettingsTemplate."""
+        return f"<BasActionBrowserSettingsTemplate settings={self._settings}>"
+
+    def __eq__(self, other: Any) -> bool:
+        """Templates with the same settings are equal."""
+        if isinstance(other, BasActionBrowserSettingsTemplate):
+            return self._data == other._data
+        return NotImplemented
+
+    @property
+    def settings(self) -> BasActionBrowserSettings:
+        """Return a copy of the template settings."""
+        return self._settings.model_copy(deep=True)
+
+    def to_data(self) -> Dict[str, Any]:
+        """
+        Return the template settings as JSON data.
+
+        :return: The JSON data, BasActionBrowserSettingsTemplate.from_data() restores the template from it.
+        """
+
+        return copy.deepcopy(self._data)
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any]) -> "BasActionBrowserSettingsTemplate":
+        """
+        Create a template from the JSON data returned by to_data().
+
+        :param data: The JSON data.
+        :return: BasActionBrowserSettingsTemplate instance.
+        """
+
+        return cls(settings=BasActionBrowserSettings.model_validate(data))
+
+    def delta(self, settings: Union[BasActionBrowserSettings, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Get the differences of browser settings from the template.
+
+        :param settings: The browser settings, either as a model or as JSON data.
+        :return: JSON data with only the values that differ from the template.
+        """
+
+        if isinstance(settings, BaseModel):
+            settings = settings.model_dump(mode="json")
+
+        return _delta(settings, self._data)
+
+    def expand_data(self, delta: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply differences returned by delta() to the template.
+
+        :param delta: The differences from the template.
+        :return: The full browser settings as JSON data, in the form BAS reads.
+        """
+
+        return _merge(self._data, delta)
+
+    def expand(self, delta: Dict[str, Any]) -> BasActionBrowserSettings:
+        """
+        Apply differences returned by delta() to the template.
+
+        Sections the delta does not change are shared with the template and are frozen, assign a new section instead
+        of changing such a section in place.
+
+        :param delta: The differences from the template.
+        :return: The full browser settings.
+        """
+
+        shared = {name: section for name, section in self._shared.items() if name not in delta}
+        data = _merge({key: value for key, value in self._data.items() if key not in shared}, delta)
+        data.update(shared)
+
+        return BasActionBrowserSettings.model_validate(data)
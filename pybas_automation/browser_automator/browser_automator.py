@@ -7,6 +7,7 @@ This module provides:
    the BAS_SAFE environment, ensuring reliable execution of critical operations such as simulating mouse movements.
 """
 
+import asyncio
 import json
 from typing import Any, Dict, List, Tuple, Union
 
@@ -149,7 +150,8 @@ class BrowserAutomator:
         self.cdp_client = CDPClient(self.ws_endpoint)
 
     async def __aexit__(self, *args: Any) -> None:
-        """Asynchronous exit method to stop the Playwright instance."""
+        """Asynchronous exit method to close the CDP connection and stop the Playwright instance."""
+        await self.cdp_client.close()
         if self.pw:
             await self.pw.stop()
 
@@ -184,10 +186,14 @@ class BrowserAutomator:
         return [target_info for target_info in data["targetInfos"] if target_info["attached"]]
 
     async def _prepare_cdp(self) -> None:
-        # Enables network tracking, network events will now be delivered to the client.
-        await self.cdp_session.send("Network.setCacheDisabled", params={"cacheDisabled": False})
-        # https://chromedevtools.github.io/devtools-protocol/tot/DOMStorage/#method-enable
-        await self.cdp_session.send("DOMStorage.enable")
+        """Enable the page domains on cdp_session, with both commands in flight at once."""
+
+        await asyncio.gather(
+            # Enables network tracking, network events will now be delivered to the client.
+            self.cdp_session.send("Network.setCacheDisabled", params={"cacheDisabled": False}),
+            # https://chromedevtools.github.io/devtools-protocol/tot/DOMStorage/#method-enable
+            self.cdp_session.send("DOMStorage.enable"),
+        )
 
     async def __aenter__(self) -> "BrowserAutomator":
         """
@@ -199,6 +205,19 @@ class BrowserAutomator:
 
         self.connect()
 
+        # One connection for all the commands of the automator, instead of one per command.
+        await self.cdp_client.connect()
+        try:
+            await self._connect_browser()
+        except BaseException:
+            await self.cdp_client.close()
+            raise
+
+        return self
+
+    async def _connect_browser(self) -> None:
+        """Retrieve the browser details and connect Playwright to the browser."""
+
         await self._get_browser_version()
         logger.info("Retrieved browser version: %s", self.browser_version)
 
@@ -220,8 +239,6 @@ class BrowserAutomator:
 
         logger.debug("Successfully connected to browser: %s", self.browser)
 
-        return self
-
     async def _bas_hide_call(self, page: Page, javascript_func_code: str) -> Any:
         """
         Call a JavaScript function in the BAS _SAFE internal API.
@@ -1,62 +1,579 @@
 """
 CDPClient is a wrapper around the Chrome DevTools Protocol (CDP) that allows sending commands to the browser.
+
+The client keeps one WebSocket connection open while it is used as an async context manager. A background task reads
+the messages of the connection and hands every response to the command waiting for it, so commands may be sent
+concurrently over the one connection. send_many() writes several commands before waiting for the first response, so
+they take one round trip instead of one each.
+
+Events are streamed to subscribers with events(). The reader only passes on events some subscriber asked for, into a
+bounded backlog that a separate task hands out to the bounded queues of the subscribers. A slow subscriber never holds
+up the responses to commands: once the backlog is full, further events are dropped, also for subscribers with the BLOCK
+overflow policy, and counted in the dropped counter of every subscriber they were for.
 """
+import asyncio
+import fnmatch
 import json
-from typing import Any, Dict, Optional
+from enum import Enum
+from types import TracebackType
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union
 
 import websockets
+from websockets.client import WebSocketClientProtocol
 
-from pybas_automation.browser_automator.models import WsUrlModel
+from pybas_automation.browser_automator.models import CDPCommand, CDPCommandResult, CDPEvent, WsUrlModel
 from pybas_automation.utils import get_logger
 
 logger = get_logger()
 
+# Seconds to wait for the response to a command.
+CDP_COMMAND_TIMEOUT = 30.0
+
+# Events read but not yet handed out to the subscribers, and events a subscriber queues, by default.
+CDP_EVENT_BACKLOG = 10000
+CDP_EVENT_QUEUE_SIZE = 1000
+
+
+class CDPCommandError(ValueError):
+    """Raised when the browser answers a command with an error."""
+
+
+class CDPConnectionClosedError(ConnectionError):
+    """Raised when the connection to the browser is closed while waiting for a response."""
+
+
+class CDPEventOverflowEnum(str, Enum):
+    """What happens to an event for a subscriber whose queue is full."""
+
+    # Drop the oldest event in the queue.
+    DROP_OLDEST = "drop_oldest"
+    # Wait until the subscriber takes an event, the events of the other subscribers wait too. Events keep arriving
+    # meanwhile, they are kept only as long as the backlog of the client has room.
+    BLOCK = "block"
+
+
+class CDPEventSubscription:
+    """
+    Events of the browser matching some method patterns, see CDPClient.events().
+
+    Iterating over the subscription waits for the next event, it ends when the subscription or the client is closed.
+    """
+
+    patterns: Tuple[str, ...]
+    session_id: Union[str, None]
+    maxsize: int
+    overflow: CDPEventOverflowEnum
+    # Events dropped because the queue, or the backlog of the client, was full.
+    dropped: int
+
+    _client: "CDPClient"
+    # Events, and None once the subscription is closed. Bounded by maxsize here, so that None always fits.
+    _queue: "asyncio.Queue[Union[CDPEvent, None]]"
+    _space: asyncio.Event
+    _closed: bool
+
+    def __init__(
+        self,
+        client: "CDPClient",
+        patterns: Tuple[str, ...],
+        session_id: Union[str, None] = None,
+        maxsize: int = CDP_EVENT_QUEUE_SIZE,
+        overflow: CDPEventOverflowEnum = CDPEventOverflowEnum.DROP_OLDEST,
+    ) -> None:
+        """
+        Initialize CDPEventSubscription.
+
+        :param client: The client the events come from.
+        :param patterns: Method patterns, e.g. "Network.*" or "Page.loadEventFired".
+        :param session_id: Only events of the target of this session.
+        :param maxsize: The maximum number of events waiting to be taken.
+        :param overflow: What happens to an event when the queue is full.
+        """
+
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1: {maxsize}")
+
+        self.patterns = patterns
+        self.session_id = session_id
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+
+        self._client = client
+        self._queue = asyncio.Queue()
+        self._space = asyncio.Event()
+        self._closed = False
+
+    def __repr__(self) -> str:
+        """Return a string representation of the CDPEventSubscription."""
+        return f"<CDPEventSubscription patterns={self.patterns} queued={self._queue.qsize()} dropped={self.dropped}>"
+
+    @property
+    def closed(self) -> bool:
+        """Whether the subscription is closed."""
+        return self._closed
+
+    def matches(self, method: str) -> bool:
+        """Return True if an event method matches one of the patterns."""
+        return any(fnmatch.fnmatchcase(method, pattern) for pattern in self.patterns)
+
+    def wants(self, event: CDPEvent) -> bool:
+        """Return True if the event is from the session of the subscription, if it has one."""
+        return self.session_id is None or event.session_id == self.session_id
+
+    async def _put(self, event: CDPEvent) -> None:
+        """Queue an event, according to the overflow policy."""
+
+        if self._closed or not self.wants(event):
+            return
+
+        if self.overflow == CDPEventOverflowEnum.BLOCK:
+            while self._queue.qsize() >= self.maxsize and not self._closed:
+                self._space.clear()
+                await self._space.wait()
+            if self._closed:
+                return
+        elif self._queue.qsize() >= self.maxsize:
+            self._queue.get_nowait()
+            self.dropped += 1
+
+        self._queue.put_nowait(event)
+
+    def _end(self) -> None:
+        """Mark the subscription closed, events still queued are handed out before the iteration ends."""
+
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put_nowait(None)
+        # Wake up the dispatcher waiting for room in a blocking queue.
+        self._space.set()
+
+    def close(self) -> None:
+        """Stop receiving events and drop the queued ones."""
+
+        self._client._unsubscribe(self)  # pylint: disable=protected-access
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._end()
+
+    async def get(self) -> Union[CDPEvent, None]:
+        """
+        Wait for the next event.
+
+        :return: CDPEvent instance, or None once the subscription is closed and its queue is empty.
+        """
+
+        if self._closed and self._queue.empty():
+            return None
+
+        event = await self._queue.get()
+        self._space.set()
+
+        return event
+
+    def __aiter__(self) -> "CDPEventSubscription":
+        """Iterate over the events."""
+        return self
+
+    async def __anext__(self) -> CDPEvent:
+        """Wait for the next event."""
+
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+
+        return event
+
+    async def __aenter__(self) -> "CDPEventSubscription":
+        """Return the subscription, it is closed on exit."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Union[Type[BaseException], None],
+        exc_val: Union[BaseException, None],
+        exc_tb: Union[TracebackType, None],
+    ) -> None:
+        """Close the subscription."""
+        self.close()
+
 
 class CDPClient:
-    """CDPClient is a wrapper around the Chrome DevTools Protocol (CDP) that allows sending commands to the browser."""
+    """
+    CDPClient is a wrapper around the Chrome DevTools Protocol (CDP) that allows sending commands to the browser.
+
+    Use it as an async context manager, the connection is closed on exit:
+
+        async with CDPClient(ws_endpoint) as cdp_client:
+            data = await cdp_client.send_command("Browser.getVersion")
+    """
 
     ws_endpoint: WsUrlModel
     message_id: int
+    timeout: float
+    event_backlog: int
+    # Events dropped because the backlog was full.
+    events_dropped: int
+
+    _ws: Union[WebSocketClientProtocol, None]
+    _reader_task: Union[asyncio.Task, None]
+    # Message id -> the future of the command waiting for the response.
+    _pending: Dict[int, asyncio.Future]
 
-    def __init__(self, ws_endpoint: WsUrlModel):
+    _subscriptions: List[CDPEventSubscription]
+    # Event method -> the subscriptions matching it, filled on demand.
+    _routes: Dict[str, List[CDPEventSubscription]]
+    _event_backlog: "Union[asyncio.Queue[Tuple[List[CDPEventSubscription], CDPEvent]], None]"
+    _event_task: Union[asyncio.Task, None]
+
+    def __init__(
+        self, ws_endpoint: WsUrlModel, timeout: float = CDP_COMMAND_TIMEOUT, event_backlog: int = CDP_EVENT_BACKLOG
+    ):
         """
         Initialize CDPClient.
+
         :param ws_endpoint: The WebSocket endpoint URL.
+        :param timeout: Seconds to wait for the response to a command.
+        :param event_backlog: The maximum number of events read but not yet handed out to the subscribers.
         """
 
+        if event_backlog < 1:
+            raise ValueError(f"event_backlog must be at least 1: {event_backlog}")
+
         self.ws_endpoint = ws_endpoint
         self.message_id = 0
+        self.timeout = timeout
+        self.event_backlog = event_backlog
+
+        self.events_dropped = 0
+
+        self._ws = None
+        self._reader_task = None
+        self._pending = {}
+
+        self._subscriptions = []
+        self._routes = {}
+        self._event_backlog = None
+        self._event_task = None
 
-    async def send_command(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict:
+    def __repr__(self) -> str:
+        """Return a string representation of the CDPClient."""
+        return f"<CDPClient {self.ws_endpoint.ws_url} connected={self.connected}>"
+
+    @property
+    def connected(self) -> bool:
+        """Whether the connection to the browser is open."""
+        return self._ws is not None and self._reader_task is not None and not self._reader_task.done()
+
+    async def connect(self) -> None:
+        """
+        Open the connection to the browser and start reading its messages.
+
+        :raises RuntimeError: If the client is already connected.
+        """
+
+        if self._ws is not None:
+            raise RuntimeError("CDPClient is already connected.")
+
+        url = self.ws_endpoint.ws_url.unicode_string()
+        # Responses of CDP commands are not limited in size, e.g. DOM snapshots.
+        self._ws = await websockets.connect(url, max_size=None)  # type: ignore
+        self._event_backlog = asyncio.Queue(maxsize=self.event_backlog)
+        self._event_task = asyncio.create_task(self._event_loop(self._event_backlog))
+        self._reader_task = asyncio.create_task(self._read_loop(self._ws))
+
+    async def close(self) -> None:
+        """Close the connection, commands waiting for a response fail with CDPConnectionClosedError."""
+
+        ws, self._ws = self._ws, None
+        reader_task, self._reader_task = self._reader_task, None
+
+        if ws is not None:
+            await ws.close()
+        if reader_task is not None:
+            await reader_task
+
+        self._fail_pending(CDPConnectionClosedError("The connection to the browser was closed."))
+        self._end_events()
+
+        event_task, self._event_task = self._event_task, None
+        if event_task is not None:
+            try:
+                await event_task
+            except asyncio.CancelledError:
+                pass
+
+    async def __aenter__(self) -> "CDPClient":
+        """Open the connection to the browser."""
+
+        await self.connect()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Union[Type[BaseException], None],
+        exc_val: Union[BaseException, None],
+        exc_tb: Union[TracebackType, None],
+    ) -> None:
+        """Close the connection to the browser."""
+
+        await self.close()
+
+    def _end_events(self) -> None:
+        """Stop handing out events and end the subscriptions, the events they queued are still handed out."""
+
+        self._event_backlog = None
+        if self._event_task is not None:
+            self._event_task.cancel()
+
+        subscriptions, self._subscriptions = self._subscriptions, []
+        self._routes = {}
+        for subscription in subscriptions:
+            subscription._end()  # pylint: disable=protected-access
+
+    def _fail_pending(self, exc: Exception) -> None:
+        """Fail the commands waiting for a response."""
+
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    def _dispatch(self, data: Dict[str, Any]) -> None:
+        """Route a message of the browser."""
+
+        message_id = data.get("id")
+        if message_id is None:
+            self._dispatch_event(data)
+            return
+
+        future = self._pending.pop(message_id, None)
+        if future is None:
+            logger.debug("Ignoring response to an unknown command: %s", message_id)
+            return
+        if not future.done():
+            future.set_result(data)
+
+    def _route(self, method: str) -> List[CDPEventSubscription]:
+        """Return the subscriptions matching an event method."""
+
+        subscriptions = self._routes.get(method)
+        if subscriptions is None:
+            subscriptions = [subscription for subscription in self._subscriptions if subscription.matches(method)]
+            self._routes[method] = subscriptions
+
+        return subscriptions
+
+    def _dispatch_event(self, data: Dict[str, Any]) -> None:
+        """Pass an event on to the dispatcher, if any subscriber wants it. Never waits."""
+
+        method = data.get("method")
+        if not method or self._event_backlog is None:
+            return
+
+        subscriptions = self._route(method)
+        if not subscriptions:
+            return
+
+        event = CDPEvent(method=method, params=data.get("params") or {}, session_id=data.get("sessionId"))
+        subscriptions = [subscription for subscription in subscriptions if subscription.wants(event)]
+        if not subscriptions:
+            return
+
+        try:
+            self._event_backlog.put_nowait((subscriptions, event))
+        except asyncio.QueueFull:
+            self.events_dropped += 1
+            for subscription in subscriptions:
+                subscription.dropped += 1
+            logger.debug("Event backlog full, dropping event: %s", method)
+
+    async def _event_loop(self, backlog: "asyncio.Queue[Tuple[List[CDPEventSubscription], CDPEvent]]") -> None:
+        """Hand out the events to the subscribers. Runs in the background task."""
+
+        while True:
+            subscriptions, event = await backlog.get()
+            for subscription in subscriptions:
+                await subscription._put(event)  # pylint: disable=protected-access
+
+    def events(
+        self,
+        *patterns: str,
+        session_id: Optional[str] = None,
+        maxsize: int = CDP_EVENT_QUEUE_SIZE,
+        overflow: CDPEventOverflowEnum = CDPEventOverflowEnum.DROP_OLDEST,
+    ) -> CDPEventSubscription:
+        """
+        Subscribe to events of the browser. Events are queued from now on, until the subscription is closed:
+
+            async with cdp_client.events("Network.*") as events:
+                async for event in events:
+                    ...
+
+        Only events of enabled domains are sent by the browser, e.g. Network events after Network.enable.
+
+        :param patterns: Method patterns, e.g. "Network.*" or "Page.loadEventFired". Defaults to all events.
+        :param session_id: Only events of the target of this session.
+        :param maxsize: The maximum number of events waiting to be taken.
+        :param overflow: What happens to an event when the queue is full. With BLOCK no event is dropped as long as
+            the backlog of the client has room, see event_backlog.
+
+        :return: CDPEventSubscription instance.
+
+        :raises RuntimeError: If the client is not connected.
+        """
+
+        if not self.connected or self._event_backlog is None:
+            raise RuntimeError("CDPClient is not connected, use it as an async context manager.")
+
+        subscription = CDPEventSubscription(
+            client=self, patterns=patterns or ("*",), session_id=session_id, maxsize=maxsize, overflow=overflow
+        )
+        self._subscriptions.append(subscription)
+        self._routes = {}
+
+        return subscription
+
+    def _unsubscribe(self, subscription: CDPEventSubscription) -> None:
+        """Stop routing events to a subscription."""
+
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            self._routes = {}
+
+    async def _read_loop(self, ws: WebSocketClientProtocol) -> None:
+        """Read the messages of the connection until it is closed. Runs in the background task."""
+
+        try:
+            async for message in ws:
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    logger.warning("Ignoring a message that is not JSON: %r", message[:100])
+                    continue
+
+                self._dispatch(data)
+        except websockets.ConnectionClosed as exc:
+            logger.debug("Connection to the browser closed: %r", exc)
+        finally:
+            self._fail_pending(CDPConnectionClosedError("The connection to the browser was closed."))
+            # Subscribers would wait forever for the events of a lost connection.
+            self._end_events()
+
+    async def _send(
+        self, method: str, params: Optional[Dict[str, Any]], session_id: Optional[str] = None
+    ) -> Tuple[int, asyncio.Future]:
+        """Send a command and return its message id and the future of its response."""
+
+        if self._ws is None or not self.connected:
+            raise RuntimeError("CDPClient is not connected, use it as an async context manager.")
+
+        self.message_id += 1
+        message_id = self.message_id
+        message: Dict[str, Any] = {
+            "id": message_id,
+            "method": method,
+            "params": params or {},
+        }
+        if session_id is not None:
+            message["sessionId"] = session_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+
+        logger.debug("Sending message: %s", message)
+
+        try:
+            await self._ws.send(json.dumps(message))
+        except Exception:
+            self._pending.pop(message_id, None)
+            raise
+
+        return message_id, future
+
+    async def _wait(self, message_id: int, future: asyncio.Future) -> Dict:
+        """Wait for the response to a command and return its result."""
+
+        try:
+            data = await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(message_id, None)
+            raise
+
+        logger.debug("Received message: %s", data)
+
+        if "error" in data:
+            raise CDPCommandError(f"Command failed: {data['error']}")
+        if "result" not in data:
+            raise CDPCommandError(f"Unable to fetch result: {data}")
+
+        return dict(data["result"])
+
+    async def send_command(
+        self, method: str, params: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None
+    ) -> Dict:
         """
         Send a command to the browser via CDP.
 
         :param method: The CDP method to call.
         :param params: The parameters to pass to the CDP method.
+        :param session_id: Send the command to the target of this session, see Target.attachToTarget with flatten.
+        :return: The result of the command.
+
+        :raises CDPCommandError: If the browser answers with an error.
+        :raises CDPConnectionClosedError: If the connection is closed before the response arrives.
+        :raises asyncio.TimeoutError: If the response does not arrive within the timeout.
+        :raises RuntimeError: If the client is not connected.
         """
-        url = self.ws_endpoint.ws_url.unicode_string()
 
-        async with websockets.connect(url) as ws:  # type: ignore
-            self.message_id += 1
-            message = {
-                "id": self.message_id,
-                "method": method,
-                "params": params or {},
-            }
+        message_id, future = await self._send(method=method, params=params, session_id=session_id)
+        return await self._wait(message_id=message_id, future=future)
+
+    async def send_many(
+        self, commands: Iterable[CDPCommand], session_id: Optional[str] = None
+    ) -> List[CDPCommandResult]:
+        """
+        Send several commands at once, without waiting for the response to one before sending the next.
+
+        A failed command is reported in its result, the other commands are not affected.
+
+        :param commands: The commands.
+        :param session_id: Send the commands to the target of this session, see Target.attachToTarget with flatten.
+
+        :return: The results, in the order of the commands.
+
+        :raises RuntimeError: If the client is not connected.
+        """
 
-            logger.debug("Sending message: %s", message)
+        commands = list(commands)
 
-            await ws.send(json.dumps(message))
+        sent: List[Union[Tuple[int, asyncio.Future], BaseException]] = []
+        for command in commands:
+            try:
+                sent.append(await self._send(method=command.method, params=command.params, session_id=session_id))
+            except RuntimeError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                sent.append(exc)
 
-            # Wait for the response
-            response = await ws.recv()
-            if response is None:
-                raise ValueError("Unable to fetch response")
+        async def _wait_one(item: Union[Tuple[int, asyncio.Future], BaseException]) -> Dict:
+            if isinstance(item, BaseException):
+                raise item
+            return await self._wait(message_id=item[0], future=item[1])
 
-            data = json.loads(response)
-            logger.debug("Received message: %s", data)
+        outcomes = await asyncio.gather(*(_wait_one(item) for item in sent), return_exceptions=True)
 
-            if not data.get("result"):
-                raise ValueError(f"Unable to fetch result: {data}")
+        results = []
+        for command, outcome in zip(commands, outcomes):
+            if isinstance(outcome, Exception):
+                results.append(
+                    CDPCommandResult(method=command.method, error_type=type(outcome).__name__, error=str(outcome))
+                )
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results.append(CDPCommandResult(method=command.method, result=outcome))
 
-            return dict(data.get("result"))
+        return results
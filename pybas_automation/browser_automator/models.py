@@ -2,11 +2,13 @@
 Models for the browser_automator module.
 """
 
-from typing import Annotated
+from typing import Annotated, Any, Dict, Union
 
-from pydantic import BaseModel, UrlConstraints
+from pydantic import BaseModel, Field, UrlConstraints
 from pydantic_core import Url
 
+from pybas_automation import default_model_config
+
 WebsocketUrl = Annotated[Url, UrlConstraints(allowed_schemes=["ws"])]
 
 
@@ -14,3 +16,41 @@ class WsUrlModel(BaseModel):
     """WsUrlModel is a model for a WebSocket URL."""
 
     ws_url: WebsocketUrl
+
+
+class CDPCommand(BaseModel):
+    """A CDP command to send with CDPClient.send_many()."""
+
+    model_config = default_model_config
+
+    method: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+
+class CDPCommandResult(BaseModel):
+    """Result of a CDP command sent with CDPClient.send_many()."""
+
+    model_config = default_model_config
+
+    method: str
+    # The result of the command, None if it failed.
+    result: Union[Dict[str, Any], None] = Field(default=None)
+    # Type and message of the exception, if the command failed.
+    error_type: Union[str, None] = Field(default=None)
+    error: Union[str, None] = Field(default=None)
+
+    @property
+    def ok(self) -> bool:
+        """Whether the command succeeded."""
+        return self.error is None
+
+
+class CDPEvent(BaseModel):
+    """An event of the browser, see CDPClient.events()."""
+
+    model_config = default_model_config
+
+    method: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    # Session of the target the event comes from, None for events of the browser.
+    session_id: Union[str, None] = Field(default=None)
@@ -5,7 +5,19 @@ This module is responsible for managing browser profiles. It provides functional
 and load browser profiles. The profiles can be customized with different settings like fingerprints and proxies.
 """
 
+from .blob_store import FingerprintBlobStore
+from .catalog import FingerprintCatalog
 from .models import BrowserProfile
-from .storage import BrowserProfileStorage
+from .proxy import ProxyHealthChecker
+from .proxy_pool import ProxyPool
+from .storage import BrowserProfileStorage, BrowserProfileStorageLayoutEnum
 
-__all__ = ["BrowserProfile", "BrowserProfileStorage"]
+__all__ = [
+    "BrowserProfile",
+    "BrowserProfileStorage",
+    "BrowserProfileStorageLayoutEnum",
+    "FingerprintBlobStore",
+    "FingerprintCatalog",
+    "ProxyHealthChecker",
+    "ProxyPool",
+]
@@ -0,0 +1,301 @@
+"""
+Fingerprint blob store module.
+
+Fingerprints are stored once per content, compressed, under the SHA-256 of their contents. Profiles refer to them by
+hash, so identical fingerprints shared by many profiles take the disk space of one. Blobs are compressed with gzip, or
+with zstd if the zstandard package is installed and requested.
+"""
+
+import gzip
+import hashlib
+import mmap
+import os
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Union
+
+from pydantic import BaseModel, Field, FilePath
+
+from pybas_automation import default_model_config
+from pybas_automation.browser_profile.settings import _blob_store_dir
+from pybas_automation.utils import atomic_open, create_storage_dir_in_app_data, get_logger
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None  # type: ignore
+
+logger = get_logger()
+
+
+class FingerprintCompressionEnum(str, Enum):
+    """Compression of the fingerprint blobs."""
+
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+
+_suffixes: Dict[FingerprintCompressionEnum, str] = {
+    FingerprintCompressionEnum.GZIP: ".gz",
+    FingerprintCompressionEnum.ZSTD: ".zst",
+}
+
+
+class FingerprintBlobNotFoundError(Exception):
+    """Raised when a fingerprint blob does not exist in the store."""
+
+
+class FingerprintBlobRef(BaseModel):
+    """Reference from a profile to a fingerprint blob."""
+
+    model_config = default_model_config
+
+    fingerprint_hash: str
+    # Not validated, the store may be unavailable when the reference is loaded. Reading the blob fails then.
+    store_dir: Path
+
+
+class FingerprintBlobStoreStats(BaseModel):
+    """Deduplication and compression statistics of the fingerprint blob store."""
+
+    model_config = default_model_config
+
+    # Number of stored blobs and of the references to them.
+    blobs: int = Field(default=0, ge=0)
+    references: int = Field(default=0, ge=0)
+
+    # Size of the fingerprints as plain files, one per reference.
+    logical_bytes: int = Field(default=0, ge=0)
+    # Uncompressed size of the stored blobs, each once.
+    unique_bytes: int = Field(default=0, ge=0)
+    # Size of the stored blobs on disk.
+    stored_bytes: int = Field(default=0, ge=0)
+
+    @property
+    def dedupe_ratio(self) -> float:
+        """How many times larger the fingerprints would be without deduplication."""
+        return self.logical_bytes / self.unique_bytes if self.unique_bytes else 1.0
+
+    @property
+    def compression_ratio(self) -> float:
+        """How many times larger the stored blobs would be without compression."""
+        return self.unique_bytes / self.stored_bytes if self.stored_bytes else 1.0
+
+    @property
+    def saved_bytes(self) -> int:
+        """Disk space saved compared to plain files, one per reference."""
+        return self.logical_bytes - self.stored_bytes
+
+
+class FingerprintBlobStore:
+    """Content-addressed store of compressed fingerprints, it can be shared by many profile storages."""
+
+    store_dir: Path
+    compression: FingerprintCompressionEnum
+
+    def __init__(
+        self,
+        store_dir: Union[Path, None] = None,
+        compression: FingerprintCompressionEnum = FingerprintCompressionEnum.GZIP,
+    ) -> None:
+        """
+        Initialize FingerprintBlobStore. If the store_dir is not provided, the default directory will be used.
+
+        :param store_dir: The directory to store the blobs in. It is not checked here, blobs are not found in a
+            missing directory.
+        :param compression: Compression of new blobs. Blobs compressed otherwise are still read.
+
+        :raises ValueError: If zstd is requested but zstandard is not installed.
+        """
+
+        if store_dir is None:
+            self.store_dir = create_storage_dir_in_app_data(storage_dir=_blob_store_dir)
+        else:
+            self.store_dir = Path(store_dir)
+
+        if compression == FingerprintCompressionEnum.ZSTD and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package.")
+        self.compression = FingerprintCompressionEnum(compression)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the FingerprintBlobStore."""
+        return f"<FingerprintBlobStore store_dir={self.store_dir} compression={self.compression.value}>"
+
+    def _blob_path(self, fingerprint_hash: str, compression: FingerprintCompressionEnum) -> FilePath:
+        """Return the path of a blob, blobs are spread over subdirectories by the first two characters of the hash."""
+
+        return self.store_dir.joinpath(fingerprint_hash[:2], fingerprint_hash + _suffixes[compression])
+
+    def _find(self, fingerprint_hash: str) -> Union[FilePath, None]:
+        """Return the path of an existing blob, in any compression."""
+
+        for compression in FingerprintCompressionEnum:
+            blob_path = self._blob_path(fingerprint_hash=fingerprint_hash, compression=compression)
+            if blob_path.exists():
+                return blob_path
+
+        return None
+
+    def ref(self, fingerprint_hash: str) -> FingerprintBlobRef:
+        """
+        Create a reference to a blob of this store.
+
+        :param fingerprint_hash: The hash of the fingerprint.
+        :return: FingerprintBlobRef instance.
+        """
+
+        return FingerprintBlobRef(fingerprint_hash=fingerprint_hash, store_dir=self.store_dir)
+
+    def put(self, fingerprint_raw: Union[str, bytes, mmap.mmap]) -> str:
+        """
+        Store a fingerprint. A fingerprint that is already stored is not written again.
+
+        :param fingerprint_raw: The fingerprint raw string, or its UTF-8 encoded bytes, e.g. a mapped fingerprint file.
+        :return: The hash of the fingerprint, the same as browser_profile.storage.fingerprint_hash() returns.
+        """
+
+        data = fingerprint_raw.encode("utf-8") if isinstance(fingerprint_raw, str) else fingerprint_raw
+        fingerprint_hash = hashlib.sha256(data).hexdigest()
+
+        if self._find(fingerprint_hash=fingerprint_hash) is not None:
+            return fingerprint_hash
+
+        blob_path = self._blob_path(fingerprint_hash=fingerprint_hash, compression=self.compression)
+        blob_path.parent.mkdir(exist_ok=True)
+
+        match self.compression:
+            case FingerprintCompressionEnum.ZSTD:
+                compressed = zstandard.ZstdCompressor().compress(data)
+            case _:
+                compressed = gzip.compress(data, mtime=0)
+
+        # Concurrent writers of the same blob write the same bytes, the last rename wins.
+        with atomic_open(blob_path, mode="wb") as f:
+            f.write(compressed)
+
+        return fingerprint_hash
+
+    def get_bytes(self, fingerprint_hash: str) -> bytes:
+        """
+        Read a fingerprint.
+
+        :param fingerprint_hash: The hash of the fingerprint.
+        :return: The UTF-8 encoded fingerprint.
+
+        :raises FingerprintBlobNotFoundError: If the blob does not exist.
+        """
+
+        blob_path = self._find(fingerprint_hash=fingerprint_hash)
+        if blob_path is None:
+            raise FingerprintBlobNotFoundError(f"Fingerprint blob not found: {fingerprint_hash} in {self.store_dir}")
+
+        compressed = blob_path.read_bytes()
+        if blob_path.suffix == _suffixes[FingerprintCompressionEnum.ZSTD]:
+            if zstandard is None:
+                raise ValueError(f"Reading {blob_path} requires the zstandard package.")
+            return bytes(zstandard.ZstdDecompressor().decompress(compressed))
+
+        return gzip.decompress(compressed)
+
+    def get(self, fingerprint_hash: str) -> str:
+        """
+        Read a fingerprint.
+
+        :param fingerprint_hash: The hash of the fingerprint.
+        :return: The fingerprint raw string.
+
+        :raises FingerprintBlobNotFoundError: If the blob does not exist.
+        """
+
+        return self.get_bytes(fingerprint_hash=fingerprint_hash).decode("utf-8")
+
+    def exists(self, fingerprint_hash: str) -> bool:
+        """
+        Check whether a fingerprint is stored.
+
+        :param fingerprint_hash: The hash of the fingerprint.
+        :return: True if the blob exists, False otherwise.
+        """
+
+        return self._find(fingerprint_hash=fingerprint_hash) is not None
+
+    def _iter_blobs(self) -> Iterator[FilePath]:
+        """Iterate over the paths of all blobs."""
+
+        if not self.store_dir.is_dir():
+            return
+
+        with os.scandir(self.store_dir) as it:
+            for shard in it:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as shard_it:
+                    for entry in shard_it:
+                        if entry.is_file() and entry.name.endswith(tuple(_suffixes.values())):
+                            yield FilePath(entry.path)
+
+    @staticmethod
+    def _uncompressed_size(blob_path: FilePath) -> int:
+        """Return the uncompressed size of a blob, read from its header or trailer where possible."""
+
+        if blob_path.suffix == _suffixes[FingerprintCompressionEnum.GZIP]:
+            # The gzip trailer ends with the uncompressed size modulo 2**32, fingerprints are much smaller.
+            with open(blob_path, "rb") as f:
+                f.seek(-4, os.SEEK_END)
+                return int.from_bytes(f.read(4), "little")
+
+        if zstandard is not None:
+            with open(blob_path, "rb") as f:
+                size = zstandard.frame_content_size(f.read(18))
+            if size >= 0:
+                return int(size)
+
+        return 0
+
+    def stats(self, references: Union[Iterable[str], None] = None) -> FingerprintBlobStoreStats:
+        """
+        Get the deduplication and compression statistics.
+
+        :param references: The hashes the profiles refer to, one per profile, hashes without a blob are skipped.
+            Defaults to one reference per blob.
+        :return: FingerprintBlobStoreStats instance.
+        """
+
+        sizes: Dict[str, int] = {}
+        stats = FingerprintBlobStoreStats()
+
+        for blob_path in self._iter_blobs():
+            fingerprint_hash = blob_path.name.split(".", 1)[0]
+            sizes[fingerprint_hash] = self._uncompressed_size(blob_path=blob_path)
+            stats.blobs += 1
+            stats.unique_bytes += sizes[fingerprint_hash]
+            stats.stored_bytes += blob_path.stat().st_size
+
+        for fingerprint_hash in sizes if references is None else references:
+            if fingerprint_hash in sizes:
+                stats.references += 1
+                stats.logical_bytes += sizes[fingerprint_hash]
+
+        return stats
+
+    def prune(self, references: Iterable[str]) -> int:
+        """
+        Remove the blobs no profile refers to.
+
+        :param references: The hashes the profiles refer to, blobs of all profile storages sharing the store must be
+            included.
+        :return: The number of removed blobs.
+        """
+
+        keep = set(references)
+        removed = 0
+
+        for blob_path in list(self._iter_blobs()):
+            if blob_path.name.split(".", 1)[0] not in keep:
+                blob_path.unlink()
+                removed += 1
+
+        if removed:
+            logger.debug("Removed %d unreferenced fingerprint blobs from %s", removed, self.store_dir)
+
+        return removed
@@ -0,0 +1,224 @@
+"""
+Fingerprint catalog module.
+
+The catalog holds the attributes of the fingerprints of all profiles of a storage in columns, one list per attribute,
+with platforms and tags encoded as small integers. It is a fraction of the size of the fingerprints and is read with one
+file read. Queries are answered from indexes built when the catalog is loaded, without touching the fingerprints.
+"""
+
+import bisect
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+from pybas_automation import default_model_config
+from pybas_automation.fingerprint.attributes import FingerprintAttributes
+
+
+class FingerprintCatalogData(BaseModel):
+    """On-disk form of the fingerprint catalog, one list per column."""
+
+    model_config = default_model_config
+
+    profile_names: List[str] = Field(default_factory=list)
+    fingerprint_hashes: List[str] = Field(default_factory=list)
+    widths: List[int] = Field(default_factory=list)
+    heights: List[int] = Field(default_factory=list)
+    browser_versions: List[int] = Field(default_factory=list)
+
+    # Index into platform_values per row.
+    platforms: List[int] = Field(default_factory=list)
+    platform_values: List[str] = Field(default_factory=list)
+
+    # Bit mask of indexes into tag_values per row.
+    tags: List[int] = Field(default_factory=list)
+    tag_values: List[str] = Field(default_factory=list)
+
+
+class FingerprintCatalogRow(BaseModel):
+    """One profile of the fingerprint catalog."""
+
+    model_config = default_model_config
+
+    profile_name: str
+    fingerprint_hash: str
+    attributes: FingerprintAttributes
+
+
+class FingerprintCatalog:
+    """Indexed, read-only catalog of the fingerprint attributes of profiles."""
+
+    data: FingerprintCatalogData
+
+    _rows: Dict[str, int]
+    _by_size: Dict[Tuple[int, int], List[int]]
+    _by_platform: Dict[int, List[int]]
+    # Rows sorted by browser version, and the sorted versions for bisect.
+    _version_rows: List[int]
+    _versions: List[int]
+
+    def __init__(self, data: Union[FingerprintCatalogData, None] = None) -> None:
+        """
+        Initialize FingerprintCatalog and build its indexes.
+
+        :param data: The catalog columns. Defaults to an empty catalog.
+        """
+
+        self.data = data if data is not None else FingerprintCatalogData()
+
+        self._rows = {profile_name: row for row, profile_name in enumerate(self.data.profile_names)}
+
+        self._by_size = {}
+        for row, size in enumerate(zip(self.data.widths, self.data.heights)):
+            self._by_size.setdefault(size, []).append(row)
+
+        self._by_platform = {}
+        for row, platform in enumerate(self.data.platforms):
+            self._by_platform.setdefault(platform, []).append(row)
+
+        self._version_rows = sorted(range(len(self.data.browser_versions)), key=self.data.browser_versions.__getitem__)
+        self._versions = [self.data.browser_versions[row] for row in self._version_rows]
+
+    def __repr__(self) -> str:
+        """Return a string representation of the FingerprintCatalog."""
+        return f"<FingerprintCatalog profiles={len(self)}>"
+
+    def __len__(self) -> int:
+        """Return the number of profiles in the catalog."""
+        return len(self.data.profile_names)
+
+    def __contains__(self, profile_name: object) -> bool:
+        """Return True if the profile is in the catalog."""
+        return profile_name in self._rows
+
+    @classmethod
+    def build(cls, rows: Iterable[FingerprintCatalogRow]) -> "FingerprintCatalog":
+        """
+        Build a catalog from rows.
+
+        :param rows: The rows, one per profile.
+        :return: FingerprintCatalog instance.
+        """
+
+        data = FingerprintCatalogData()
+        platform_codes: Dict[str, int] = {}
+        tag_bits: Dict[str, int] = {}
+
+        for row in rows:
+            attributes = row.attributes
+            data.profile_names.append(row.profile_name)
+            data.fingerprint_hashes.append(row.fingerprint_hash)
+            data.widths.append(attributes.width)
+            data.heights.append(attributes.height)
+            data.browser_versions.append(attributes.browser_version)
+
+            if attributes.platform not in platform_codes:
+                platform_codes[attributes.platform] = len(data.platform_values)
+                data.platform_values.append(attributes.platform)
+            data.platforms.append(platform_codes[attributes.platform])
+
+            mask = 0
+            for tag in attributes.tags:
+                if tag not in tag_bits:
+                    tag_bits[tag] = len(data.tag_values)
+                    data.tag_values.append(tag)
+                mask |= 1 << tag_bits[tag]
+            data.tags.append(mask)
+
+        return cls(data=data)
+
+    def row(self, profile_name: str) -> FingerprintCatalogRow:
+        """
+        Get the row of a profile.
+
+        :param profile_name: The name of the browser profile.
+        :return: FingerprintCatalogRow instance.
+
+        :raises KeyError: If the profile is not in the catalog.
+        """
+
+        return self._row(self._rows[profile_name])
+
+    def _row(self, row: int) -> FingerprintCatalogRow:
+        """Decode a row of the columns."""
+
+        data = self.data
+        mask = data.tags[row]
+        attributes = FingerprintAttributes(
+            width=data.widths[row],
+            height=data.heights[row],
+            browser_version=data.browser_versions[row],
+            platform=data.platform_values[data.platforms[row]],
+            tags=[tag for bit, tag in enumerate(data.tag_values) if mask & (1 << bit)],
+        )
+
+        return FingerprintCatalogRow(
+            profile_name=data.profile_names[row], fingerprint_hash=data.fingerprint_hashes[row], attributes=attributes
+        )
+
+    def rows(self) -> Iterator[FingerprintCatalogRow]:
+        """Iterate over the rows of the catalog."""
+
+        for row in range(len(self)):
+            yield self._row(row)
+
+    def query(
+        self,
+        width: Union[int, None] = None,
+        height: Union[int, None] = None,
+        min_browser_version: Union[int, None] = None,
+        max_browser_version: Union[int, None] = None,
+        platform: Union[str, None] = None,
+        tags: Union[List[str], None] = None,
+    ) -> List[str]:
+        """
+        Find the profiles whose fingerprints match all given criteria.
+
+        :param width: Only fingerprints with this screen width.
+        :param height: Only fingerprints with this screen height.
+        :param min_browser_version: Only fingerprints with at least this browser version.
+        :param max_browser_version: Only fingerprints with at most this browser version.
+        :param platform: Only fingerprints of this platform, e.g. "Windows".
+        :param tags: Only fingerprints with all these tags.
+
+        :return: The names of the matching profiles, in catalog order.
+        """
+
+        data = self.data
+        candidates: Union[Set[int], None] = None
+
+        def narrow(rows: Iterable[int]) -> None:
+            nonlocal candidates
+            candidates = set(rows) if candidates is None else candidates.intersection(rows)
+
+        if width is not None and height is not None:
+            narrow(self._by_size.get((width, height), []))
+        elif width is not None or height is not None:
+            matching: List[int] = []
+            for (row_width, row_height), size_rows in self._by_size.items():
+                if width in (None, row_width) and height in (None, row_height):
+                    matching.extend(size_rows)
+            narrow(matching)
+
+        if platform is not None:
+            code = data.platform_values.index(platform) if platform in data.platform_values else -1
+            narrow(self._by_platform.get(code, []))
+
+        if min_browser_version is not None or max_browser_version is not None:
+            start = 0 if min_browser_version is None else bisect.bisect_left(self._versions, min_browser_version)
+            end = len(self._versions)
+            if max_browser_version is not None:
+                end = bisect.bisect_right(self._versions, max_browser_version)
+            narrow(self._version_rows[start:end])
+
+        if tags:
+            if any(tag not in data.tag_values for tag in tags):
+                return []
+            mask = 0
+            for tag in tags:
+                mask |= 1 << data.tag_values.index(tag)
+            scan = range(len(self)) if candidates is None else candidates
+            narrow([row for row in scan if data.tags[row] & mask == mask])
+
+        result = range(len(self)) if candidates is None else sorted(candidates)
+        return [data.profile_names[row] for row in result]
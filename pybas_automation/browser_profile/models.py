@@ -1,24 +1,146 @@
 """Browser profile models."""
 
 import json
-from typing import Union
+import mmap
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Union
 
-from pydantic import BaseModel, DirectoryPath, Field
+from pydantic import (
+    BaseModel,
+    DirectoryPath,
+    Field,
+    FilePath,
+    PrivateAttr,
+    SerializerFunctionWrapHandler,
+    model_serializer,
+)
 
 from pybas_automation import STORAGE_SUBDIR, default_model_config
 from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy
+from pybas_automation.browser_profile.blob_store import (
+    FingerprintBlobNotFoundError,
+    FingerprintBlobRef,
+    FingerprintBlobStore,
+)
 from pybas_automation.browser_profile.settings import _proxy_filename, _user_data_dir_default_factory
+from pybas_automation.utils import atomic_open
 
 
 class BrowserProfile(BaseModel):
-    """Represents a browser profile with customizable settings."""
+    """
+    Represents a browser profile with customizable settings.
+
+    The fingerprint of a profile loaded from storage stays on disk and is read only when fingerprint_raw is accessed
+    or the profile is dumped, so listing profiles does not read fingerprints.
+    """
 
     model_config = default_model_config
 
     profile_dir: DirectoryPath = Field(default_factory=_user_data_dir_default_factory)
-    fingerprint_raw: Union[str, None] = Field(default=None)
+    # Fingerprint set in memory, it takes precedence over the fingerprint file. Set and read it as fingerprint_raw, it
+    # is dumped as fingerprint_raw as well, see _serialize().
+    fingerprint_raw_in_memory: Union[str, None] = Field(default=None, alias="fingerprint_raw", exclude=True, repr=False)
     proxy: Union[BasActionBrowserProxy, None] = Field(default=None)
 
+    # File the fingerprint is read from on access.
+    _fingerprint_file_path: Union[FilePath, None] = PrivateAttr(default=None)
+    # Blob the fingerprint is read from on access, if there is no fingerprint file.
+    _fingerprint_blob_ref: Union[FingerprintBlobRef, None] = PrivateAttr(default=None)
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler: SerializerFunctionWrapHandler) -> Dict[str, Any]:
+        """Dump the fingerprint as fingerprint_raw, a fingerprint on disk is read only now."""
+
+        data: Dict[str, Any] = handler(self)
+        data["fingerprint_raw"] = self.fingerprint_raw
+
+        return data
+
+    @property
+    def fingerprint_raw(self) -> Union[str, None]:
+        """
+        The fingerprint raw string.
+
+        A fingerprint on disk is read on every access and not kept in memory.
+        """
+
+        if self.fingerprint_raw_in_memory is not None:
+            return self.fingerprint_raw_in_memory
+
+        if self._fingerprint_file_path is not None:
+            try:
+                with open(self._fingerprint_file_path, "r", encoding="utf-8") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+
+        if self._fingerprint_blob_ref is not None:
+            blob_store = FingerprintBlobStore(store_dir=self._fingerprint_blob_ref.store_dir)
+            try:
+                return blob_store.get(fingerprint_hash=self._fingerprint_blob_ref.fingerprint_hash)
+            except FingerprintBlobNotFoundError:
+                return None
+
+        return None
+
+    @fingerprint_raw.setter
+    def fingerprint_raw(self, fingerprint_raw: Union[str, None]) -> None:
+        self.fingerprint_raw_in_memory = fingerprint_raw
+        if fingerprint_raw is None:
+            self._fingerprint_file_path = None
+            self._fingerprint_blob_ref = None
+
+    @property
+    def fingerprint_file_path(self) -> Union[FilePath, None]:
+        """The file the fingerprint is read from, if it is not set in memory."""
+        return self._fingerprint_file_path
+
+    def use_fingerprint_file(self, file_path: Union[FilePath, None]) -> None:
+        """
+        Read the fingerprint from a file on access instead of keeping it in memory.
+
+        :param file_path: The fingerprint file, None to forget it.
+        """
+
+        self.fingerprint_raw_in_memory = None
+        self._fingerprint_file_path = file_path
+        self._fingerprint_blob_ref = None
+
+    @property
+    def fingerprint_blob_ref(self) -> Union[FingerprintBlobRef, None]:
+        """The blob the fingerprint is read from, if it is neither set in memory nor in a file."""
+        return self._fingerprint_blob_ref
+
+    def use_fingerprint_blob(self, blob_ref: Union[FingerprintBlobRef, None]) -> None:
+        """
+        Read the fingerprint from a FingerprintBlobStore on access instead of keeping it in memory.
+
+        :param blob_ref: The reference to the fingerprint blob, None to forget it.
+        """
+
+        self.fingerprint_raw_in_memory = None
+        self._fingerprint_file_path = None
+        self._fingerprint_blob_ref = blob_ref
+
+    @contextmanager
+    def fingerprint_mmap(self) -> Iterator[Union[mmap.mmap, None]]:
+        """
+        Map the fingerprint file into memory, e.g. to hash or copy it without reading it into a string.
+
+        :return: Context manager yielding the read-only memory map, or None if there is no fingerprint file, e.g. the
+            fingerprint is in a blob store.
+        """
+
+        file_path = self._fingerprint_file_path
+        if file_path is None or not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            yield None
+            return
+
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
     def save_proxy_to_profile(self) -> bool:
         """
         Save the proxy to the profile directory.
@@ -41,6 +163,59 @@ class BrowserProfile(BaseModel):
         sub_dir.mkdir(parents=True, exist_ok=True)
 
         proxy_filename = sub_dir.joinpath(_proxy_filename)
-        proxy_filename.open("w", encoding="utf-8").write(json.dumps(bas_proxy.model_dump(mode="json")))
+        with atomic_open(proxy_filename) as f:
+            f.write(json.dumps(bas_proxy.model_dump(mode="json")))
 
         return True
+
+
+class BrowserProfileManifestEntry(BaseModel):
+    """Metadata of a browser profile, kept in the manifest of BrowserProfileStorage."""
+
+    model_config = default_model_config
+
+    # Name of the profile directory inside the storage directory.
+    profile_name: str
+
+    proxy: Union[BasActionBrowserProxy, None] = Field(default=None)
+
+    # SHA-256 of the fingerprint, profiles with the same fingerprint have the same hash.
+    fingerprint_hash: Union[str, None] = Field(default=None)
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_used_at: Union[datetime, None] = Field(default=None)
+
+
+class BrowserProfileManifest(BaseModel):
+    """Manifest of BrowserProfileStorage, the metadata of all profiles in one file."""
+
+    model_config = default_model_config
+
+    # Profile name -> metadata, in the order the profiles were added.
+    profiles: Dict[str, BrowserProfileManifestEntry] = Field(default_factory=dict)
+
+    # Modification time of the directories holding the profiles when the manifest was written. Profiles added or
+    # removed by other means than BrowserProfileStorage change it, the manifest is updated then.
+    storage_mtime_ns: Union[int, None] = Field(default=None)
+
+
+class BrowserProfileBatchFailure(BaseModel):
+    """A profile of a batch that could not be created."""
+
+    model_config = default_model_config
+
+    # Position of the profile in the batch.
+    index: int = Field(ge=0)
+    # Type and message of the exception.
+    error_type: str
+    error: str
+
+
+class BrowserProfileBatchResult(BaseModel):
+    """Result of creating a batch of browser profiles."""
+
+    model_config = default_model_config
+
+    # The created profiles, in the order of the batch.
+    profiles: List[BrowserProfile] = Field(default_factory=list)
+    failures: List[BrowserProfileBatchFailure] = Field(default_factory=list)
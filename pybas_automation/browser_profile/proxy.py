@@ -1,32 +1,46 @@
-"""Browser profile proxy module."""
+"""
+Browser profile proxy module.
 
-from typing import Dict
+get_external_info_ip() checks one proxy. ProxyHealthChecker checks many proxies at once, measures their latency and
+keeps the results for a while, so that proxies checked recently are not checked again.
+"""
+
+import asyncio
+import ssl
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Union
 
 import httpx
+from pydantic import BaseModel, Field
 
+from pybas_automation import default_model_config
 from pybas_automation.bas_actions.browser.proxy.models import BasActionBrowserProxy, BasActionBrowserProxyTypeEnum
+from pybas_automation.browser_profile.settings import _proxy_check_ttl
+
+EXTERNAL_IP_URL = "https://lumtest.com/myip.json"
+EXTERNAL_IP_TIMEOUT = 10
 
 
 class ExternalIPRequestException(Exception):
     """Raised when an error occurs while requesting the external IP address."""
 
 
-def get_external_info_ip(bas_proxy: BasActionBrowserProxy) -> Dict:
-    """Get the external IP address."""
+def _proxy_url(bas_proxy: BasActionBrowserProxy) -> str:
+    """Return the URL of a proxy, with its credentials."""
 
     proxy_str = f"{bas_proxy.server}:{bas_proxy.port}"
 
     if bas_proxy.login and bas_proxy.password:
         proxy_str = f"{bas_proxy.login}:{bas_proxy.password}@{proxy_str}"
     if bas_proxy.type == BasActionBrowserProxyTypeEnum.HTTP:
-        proxies = f"http://{proxy_str}"
-    else:
-        proxies = f"socks5://{proxy_str}"
+        return f"http://{proxy_str}"
 
-    try:
-        response = httpx.get(url="https://lumtest.com/myip.json", proxies=proxies, timeout=10)
-    except Exception as exc:
-        raise ExternalIPRequestException("Failed to get external IP.") from exc
+    return f"socks5://{proxy_str}"
+
+
+def _parse_external_ip_response(response: httpx.Response) -> Dict:
+    """Return the JSON data of an external IP response."""
 
     if response.status_code != 200:
         raise ExternalIPRequestException(f"Failed to get external IP: {response.text}")
@@ -37,3 +51,220 @@ def get_external_info_ip(bas_proxy: BasActionBrowserProxy) -> Dict:
         raise ExternalIPRequestException("Failed to get external IP.") from exc
 
     return dict(response_json_data)
+
+
+def get_external_info_ip(bas_proxy: BasActionBrowserProxy) -> Dict:
+    """Get the external IP address."""
+
+    try:
+        response = httpx.get(url=EXTERNAL_IP_URL, proxies=_proxy_url(bas_proxy), timeout=EXTERNAL_IP_TIMEOUT)
+    except Exception as exc:
+        raise ExternalIPRequestException("Failed to get external IP.") from exc
+
+    return _parse_external_ip_response(response)
+
+
+class ProxyCheckResult(BaseModel):
+    """Result of checking a proxy."""
+
+    model_config = default_model_config
+
+    proxy: BasActionBrowserProxy
+    ok: bool = Field(default=False)
+
+    # External IP address and location of the proxy, if the check succeeded.
+    ip: Union[str, None] = Field(default=None)
+    country: Union[str, None] = Field(default=None)
+    geo: Dict[str, Any] = Field(default_factory=dict)
+
+    # Seconds until the response through the proxy arrived.
+    latency: Union[float, None] = Field(default=None, ge=0)
+    # Reason of the failure, if the check failed.
+    error: Union[str, None] = Field(default=None)
+
+    checked_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def is_fresh(self, ttl: float) -> bool:
+        """
+        Check whether the result is recent enough to be used instead of checking the proxy again.
+
+        :param ttl: The maximum age of the result in seconds.
+        :return: True if the result is younger than ttl.
+        """
+
+        return (datetime.now(timezone.utc) - self.checked_at).total_seconds() < ttl
+
+
+class ProxyHealthChecker:
+    """
+    Checks proxies concurrently by requesting the external IP address through them.
+
+    Results are cached for ttl seconds, checking a proxy again within that time returns the cached result:
+
+        checker = ProxyHealthChecker(concurrency=50)
+        results = checker.check_many(proxies)
+    """
+
+    url: Union[str, None]
+    concurrency: int
+    timeout: float
+    ttl: float
+
+    # Proxy URL -> the last result.
+    _cache: Dict[str, ProxyCheckResult]
+    # Shared by the clients of all checks, creating one takes longer than a check through a fast proxy.
+    _ssl_context: Union[ssl.SSLContext, None]
+
+    def __init__(
+        self,
+        url: Union[str, None] = None,
+        concurrency: int = 50,
+        timeout: float = EXTERNAL_IP_TIMEOUT,
+        ttl: float = _proxy_check_ttl,
+    ) -> None:
+        """
+        Initialize ProxyHealthChecker.
+
+        :param url: The URL requested through the proxies. Defaults to EXTERNAL_IP_URL.
+        :param concurrency: The maximum number of proxies checked at once.
+        :param timeout: The timeout of a check in seconds.
+        :param ttl: The time in seconds a result is cached.
+        """
+
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1: {concurrency}")
+
+        self.url = url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = ttl
+        self._cache = {}
+        self._ssl_context = None
+
+    def __repr__(self) -> str:
+        """Return a string representation of the ProxyHealthChecker."""
+        return f"<ProxyHealthChecker concurrency={self.concurrency} ttl={self.ttl} cached={len(self._cache)}>"
+
+    def cached(self, bas_proxy: BasActionBrowserProxy) -> Union[ProxyCheckResult, None]:
+        """
+        Get the cached result of a proxy.
+
+        :param bas_proxy: The proxy.
+        :return: ProxyCheckResult instance, or None if the proxy was not checked within ttl.
+        """
+
+        result = self._cache.get(_proxy_url(bas_proxy))
+        if result is None or not result.is_fresh(ttl=self.ttl):
+            return None
+
+        return result
+
+    def remember(self, result: ProxyCheckResult) -> None:
+        """
+        Cache a result, e.g. one persisted earlier. Results older than a cached one are ignored.
+
+        :param result: The result of checking a proxy.
+        """
+
+        key = _proxy_url(result.proxy)
+        current = self._cache.get(key)
+        if current is None or current.checked_at < result.checked_at:
+            self._cache[key] = result
+
+    async def _check(self, bas_proxy: BasActionBrowserProxy) -> ProxyCheckResult:
+        """Check a proxy, failures are reported in the result."""
+
+        url = self.url if self.url is not None else EXTERNAL_IP_URL
+        if self._ssl_context is None:
+            self._ssl_context = httpx.create_ssl_context()
+
+        started = time.monotonic()
+        try:
+            async with httpx.AsyncClient(
+                proxies=_proxy_url(bas_proxy), timeout=self.timeout, verify=self._ssl_context
+            ) as client:
+                response = await client.get(url)
+            latency = time.monotonic() - started
+            data = _parse_external_ip_response(response)
+        except ExternalIPRequestException as exc:
+            return ProxyCheckResult(proxy=bas_proxy, latency=time.monotonic() - started, error=str(exc))
+        except Exception as exc:  # pylint: disable=broad-except
+            return ProxyCheckResult(proxy=bas_proxy, error=f"{type(exc).__name__}: {exc}")
+
+        geo = data.get("geo")
+        return ProxyCheckResult(
+            proxy=bas_proxy,
+            ok=True,
+            ip=data.get("ip"),
+            country=data.get("country"),
+            geo=geo if isinstance(geo, dict) else {},
+            latency=latency,
+        )
+
+    async def check_many_async(
+        self, proxies: Iterable[BasActionBrowserProxy], force: bool = False, timeout: Union[float, None] = None
+    ) -> List[ProxyCheckResult]:
+        """
+        Check proxies concurrently. A proxy given more than once is checked once.
+
+        :param proxies: The proxies.
+        :param force: Check the proxies even if they have a cached result.
+        :param timeout: Seconds to wait for all checks, None to wait for them to complete. The proxies not checked by
+            then fail with a timeout error, which is not cached.
+
+        :return: The results, in the order of the proxies.
+        """
+
+        proxies = list(proxies)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Forget the expired results, checkers of ever new proxy sessions would grow without bound otherwise.
+        for key in [key for key, result in self._cache.items() if not result.is_fresh(ttl=self.ttl)]:
+            del self._cache[key]
+
+        pending: Dict[str, BasActionBrowserProxy] = {}
+        for bas_proxy in proxies:
+            if force or self.cached(bas_proxy) is None:
+                pending.setdefault(_proxy_url(bas_proxy), bas_proxy)
+
+        checked: Dict[str, ProxyCheckResult] = {}
+
+        async def _check_one(key: str, bas_proxy: BasActionBrowserProxy) -> None:
+            async with semaphore:
+                checked[key] = await self._check(bas_proxy)
+                self.remember(checked[key])
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(_check_one(key, bas_proxy) for key, bas_proxy in pending.items())), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            for key, bas_proxy in pending.items():
+                if key not in checked:
+                    checked[key] = ProxyCheckResult(proxy=bas_proxy, error=f"TimeoutError: not checked in {timeout}s")
+
+        return [checked.get(_proxy_url(bas_proxy)) or self._cache[_proxy_url(bas_proxy)] for bas_proxy in proxies]
+
+    async def check_async(self, bas_proxy: BasActionBrowserProxy, force: bool = False) -> ProxyCheckResult:
+        """
+        Check a proxy.
+
+        :param bas_proxy: The proxy.
+        :param force: Check the proxy even if it has a cached result.
+
+        :return: ProxyCheckResult instance.
+        """
+
+        return (await self.check_many_async([bas_proxy], force=force))[0]
+
+    def check_many(self, proxies: Iterable[BasActionBrowserProxy], force: bool = False) -> List[ProxyCheckResult]:
+        """
+        Check proxies concurrently, see check_many_async(). Do not call it from a running event loop.
+
+        :param proxies: The proxies.
+        :param force: Check the proxies even if they have a cached result.
+
+        :return: The results, in the order of the proxies.
+        """
+
+        return asyncio.run(self.check_many_async(proxies, force=force))
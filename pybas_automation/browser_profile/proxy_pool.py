@@ -0,0 +1,311 @@
+"""
+Proxy pool module.
+
+ProxyPool keeps the health of the proxy sessions of the profiles of a storage: a moving average of their latency and
+error rate, and the time of their last success. A profile keeps its proxy session as long as it is healthy, which keeps
+its IP address stable. Failing sessions are replaced in bulk with new ones from a proxy factory.
+
+The health is saved in the storage directory, so that it is kept across runs. Pools on the same storage, e.g. of
+several workers, merge their records when saving.
+"""
+
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Set, Union
+
+from pydantic import BaseModel, Field, FilePath, ValidationError
+
+from pybas_automation import default_model_config
+from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy
+from pybas_automation.browser_profile.proxy import ProxyCheckResult, ProxyHealthChecker, _proxy_url
+from pybas_automation.browser_profile.settings import _proxy_pool_filename, _proxy_pool_smoothing
+from pybas_automation.browser_profile.storage import BrowserProfileStorage
+from pybas_automation.utils import atomic_open, get_logger
+
+logger = get_logger()
+
+
+class ProxySessionStats(BaseModel):
+    """Health of a proxy session."""
+
+    model_config = default_model_config
+
+    proxy: BasActionBrowserProxy
+
+    requests: int = Field(default=0, ge=0)
+    errors: int = Field(default=0, ge=0)
+
+    # Moving averages, recent requests weigh most.
+    latency: Union[float, None] = Field(default=None, ge=0)
+    error_rate: float = Field(default=0.0, ge=0, le=1)
+
+    last_success_at: Union[datetime, None] = Field(default=None)
+    last_failure_at: Union[datetime, None] = Field(default=None)
+
+    @property
+    def last_seen_at(self) -> Union[datetime, None]:
+        """Time of the last request, successful or not."""
+
+        seen = [at for at in (self.last_success_at, self.last_failure_at) if at is not None]
+        return max(seen) if seen else None
+
+
+class ProxyPoolData(BaseModel):
+    """On-disk form of ProxyPool."""
+
+    model_config = default_model_config
+
+    # Proxy URL -> health of the session.
+    sessions: Dict[str, ProxySessionStats] = Field(default_factory=dict)
+
+
+class ProxyPool:
+    """
+    Keeps profiles on healthy proxy sessions and rotates failing ones.
+
+        proxy_pool = ProxyPool(storage=browser_profile_storage, proxy_factory=brightdata.to_bas_proxy)
+        rotated = proxy_pool.refresh()
+    """
+
+    storage: BrowserProfileStorage
+    proxy_factory: Callable[[], Union[BasActionBrowserProxy, None]]
+    max_error_rate: float
+    max_latency: float
+    max_silence: float
+    min_requests: int
+    pool_file_path: FilePath
+
+    _sessions: Dict[str, ProxySessionStats]
+    # Sessions replaced since the last save, they are dropped from the file as well.
+    _retired: Set[str]
+
+    def __init__(
+        self,
+        storage: BrowserProfileStorage,
+        proxy_factory: Callable[[], Union[BasActionBrowserProxy, None]],
+        max_error_rate: float = 0.5,
+        max_latency: float = 5.0,
+        max_silence: float = 600.0,
+        min_requests: int = 2,
+    ) -> None:
+        """
+        Initialize ProxyPool and load the saved health of the sessions.
+
+        :param storage: The storage of the profiles.
+        :param proxy_factory: Returns a new proxy session, e.g. BrightDataProxyModel.to_bas_proxy.
+        :param max_error_rate: Sessions failing more often are rotated, once they have min_requests requests.
+        :param max_latency: Sessions slower than this on average are rotated, in seconds.
+        :param max_silence: Sessions failing since their last success longer ago than this are rotated, in seconds.
+        :param min_requests: The number of requests before the error rate of a session is judged.
+        """
+
+        self.storage = storage
+        self.proxy_factory = proxy_factory
+        self.max_error_rate = max_error_rate
+        self.max_latency = max_latency
+        self.max_silence = max_silence
+        self.min_requests = min_requests
+        self.pool_file_path = storage.storage_dir.joinpath(_proxy_pool_filename)
+
+        self._sessions = self._read_sessions()
+        self._retired = set()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the ProxyPool."""
+        return f"<ProxyPool sessions={len(self._sessions)}>"
+
+    def _read_sessions(self) -> Dict[str, ProxySessionStats]:
+        """Read the saved health of the sessions, an invalid file is ignored."""
+
+        if not self.pool_file_path.exists():
+            return {}
+
+        try:
+            return ProxyPoolData.model_validate_json(self.pool_file_path.read_bytes()).sessions
+        except ValidationError as exc:
+            logger.warning("Ignoring the invalid proxy pool file %s: %r", self.pool_file_path, exc)
+            return {}
+
+    def stats(self, proxy: BasActionBrowserProxy) -> Union[ProxySessionStats, None]:
+        """
+        Get the health of a proxy session.
+
+        :param proxy: The proxy session.
+        :return: ProxySessionStats instance, or None if nothing was recorded for the session.
+        """
+
+        return self._sessions.get(_proxy_url(proxy))
+
+    def record(
+        self,
+        proxy: BasActionBrowserProxy,
+        ok: bool,
+        latency: Union[float, None] = None,
+        at: Union[datetime, None] = None,
+    ) -> ProxySessionStats:
+        """
+        Record a request through a proxy session.
+
+        :param proxy: The proxy session.
+        :param ok: Whether the request succeeded.
+        :param latency: The latency of the request in seconds, if it succeeded.
+        :param at: The time of the request. Defaults to now.
+
+        :return: The updated ProxySessionStats instance.
+        """
+
+        if at is None:
+            at = datetime.now(timezone.utc)
+
+        stats = self._sessions.setdefault(_proxy_url(proxy), ProxySessionStats(proxy=proxy))
+        alpha = _proxy_pool_smoothing
+
+        stats.requests += 1
+        stats.error_rate = (1 - alpha) * stats.error_rate + alpha * (0.0 if ok else 1.0)
+        if ok:
+            stats.last_success_at = at
+            if latency is not None:
+                stats.latency = latency if stats.latency is None else (1 - alpha) * stats.latency + alpha * latency
+        else:
+            stats.errors += 1
+            stats.last_failure_at = at
+
+        return stats
+
+    def observe(self, results: Iterable[ProxyCheckResult]) -> None:
+        """
+        Record the results of proxy checks. Results not newer than the last recorded request of a session are skipped,
+        so cached results are counted once.
+
+        :param results: The results, e.g. of BrowserProfileStorage.check_proxies().
+        """
+
+        for result in results:
+            stats = self.stats(result.proxy)
+            last_seen_at = stats.last_seen_at if stats is not None else None
+            if last_seen_at is not None and result.checked_at <= last_seen_at:
+                continue
+
+            self.record(proxy=result.proxy, ok=result.ok, latency=result.latency, at=result.checked_at)
+
+    def is_healthy(self, proxy: BasActionBrowserProxy) -> bool:
+        """
+        Check whether a proxy session is healthy. Sessions without recorded requests are healthy.
+
+        :param proxy: The proxy session.
+        :return: True if the profile may keep the session.
+        """
+
+        stats = self.stats(proxy)
+        if stats is None:
+            return True
+
+        if stats.requests >= self.min_requests and stats.error_rate > self.max_error_rate:
+            return False
+        if stats.latency is not None and stats.latency > self.max_latency:
+            return False
+
+        if stats.last_failure_at is not None and (
+            stats.last_success_at is None or stats.last_success_at < stats.last_failure_at
+        ):
+            since = stats.last_success_at
+            if since is None or (datetime.now(timezone.utc) - since).total_seconds() > self.max_silence:
+                return False
+
+        return True
+
+    def assign(self, profile_name: str) -> Union[BasActionBrowserProxy, None]:
+        """
+        Get the proxy a profile should use: its current session if it is healthy, a new one otherwise.
+
+        :param profile_name: The name of the browser profile.
+        :return: The proxy of the profile, None if it has none.
+
+        :raises FileNotFoundError: If the profile does not exist.
+        """
+
+        proxy = self.storage.load(profile_name=profile_name).proxy
+        if proxy is None or self.is_healthy(proxy):
+            return proxy
+
+        new_proxy = self.proxy_factory()
+        if new_proxy is None:
+            return proxy
+
+        self.storage.set_proxies(proxies={profile_name: new_proxy})
+        self._sessions.pop(_proxy_url(proxy), None)
+        self._retired.add(_proxy_url(proxy))
+        self.save()
+
+        return new_proxy
+
+    def rotate_failing(self) -> Dict[str, BasActionBrowserProxy]:
+        """
+        Give the profiles on unhealthy proxy sessions new sessions, and write their proxy files in one go.
+
+        :return: Profile name -> the new proxy, for the rotated profiles.
+        """
+
+        rotated: Dict[str, BasActionBrowserProxy] = {}
+        retired = set()
+
+        for entry in self.storage.entries(has_proxy=True):
+            if entry.proxy is None or self.is_healthy(entry.proxy):
+                continue
+
+            proxy = self.proxy_factory()
+            if proxy is None:
+                logger.warning("No proxy to replace the failing proxy of %s", entry.profile_name)
+                continue
+
+            rotated[entry.profile_name] = proxy
+            retired.add(_proxy_url(entry.proxy))
+
+        if rotated:
+            self.storage.set_proxies(proxies=rotated)
+            for key in retired:
+                self._sessions.pop(key, None)
+            self._retired.update(retired)
+
+        self.save()
+
+        return rotated
+
+    def refresh(self, checker: Union[ProxyHealthChecker, None] = None) -> Dict[str, BasActionBrowserProxy]:
+        """
+        Check the proxies of all profiles, record the results and rotate the failing sessions. Do not call it from a
+        running event loop.
+
+        :param checker: The checker to use. Defaults to a ProxyHealthChecker with default settings.
+        :return: Profile name -> the new proxy, for the rotated profiles.
+        """
+
+        self.observe(self.storage.check_proxies(checker=checker).values())
+
+        return self.rotate_failing()
+
+    def save(self) -> None:
+        """
+        Save the health of the sessions under the write lock of the storage.
+
+        The file is read again first and merged: sessions saved by other pools on the same storage are kept, of a
+        session saved by both the more recently seen health wins, and the sessions retired by this pool are dropped.
+        The merged health is kept in memory as well.
+        """
+
+        def last_seen_at(stats: ProxySessionStats) -> datetime:
+            return stats.last_seen_at or datetime.min.replace(tzinfo=timezone.utc)
+
+        with self.storage._lock.write():  # pylint: disable=protected-access
+            sessions = self._read_sessions()
+            for key in self._retired:
+                sessions.pop(key, None)
+            for key, stats in self._sessions.items():
+                saved = sessions.get(key)
+                if saved is None or last_seen_at(saved) <= last_seen_at(stats):
+                    sessions[key] = stats
+
+            with atomic_open(self.pool_file_path, mode="wb") as f:
+                f.write(ProxyPoolData(sessions=sessions).model_dump_json().encode("utf-8"))
+
+        self._sessions = sessions
+        self._retired = set()
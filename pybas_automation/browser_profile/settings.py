@@ -11,9 +11,35 @@ from pybas_automation.utils import create_storage_dir_in_app_data
 _storage_dir = DirectoryPath("PyBASProfiles")
 _fingerprint_raw_filename = FilePath("fingerprint_raw.json")
 _proxy_filename = FilePath("proxy.json")
+# Result of the last check of the proxy of a profile, see ProxyHealthChecker.
+_proxy_check_filename = FilePath("proxy_check.json")
+# Seconds a proxy check result is used before the proxy is checked again.
+_proxy_check_ttl = 300.0
+# Health of the proxy sessions of the profiles, kept by ProxyPool in the storage directory.
+_proxy_pool_filename = FilePath("proxy_pool.json")
+# Weight of the latest check in the moving averages of the latency and the error rate of a proxy session.
+_proxy_pool_smoothing = 0.3
+
+# Reference to the fingerprint in a FingerprintBlobStore, written instead of the fingerprint file.
+_fingerprint_ref_filename = FilePath("fingerprint_raw.ref.json")
+
+# Default directory of FingerprintBlobStore, shared by all profile storages.
+_blob_store_dir = DirectoryPath("PyBASFingerprints")
 
 _filelock_filename = FilePath("tasks.lock")
 
+# The manifest lives in the storage directory, next to the profile directories.
+_manifest_filename = FilePath("manifest.json")
+_manifest_journal_filename = FilePath("manifest.journal")
+# Layout of the storage directory, written by sharded storages only.
+_layout_filename = FilePath("layout.json")
+
+# Catalog of the fingerprint attributes of the profiles, next to the manifest.
+_catalog_filename = FilePath("fingerprint_catalog.json")
+
+# Number of journal records after which the manifest journal is folded into the manifest.
+_manifest_compact_threshold = 1000
+
 
 def _user_data_dir_default_factory() -> DirectoryPath:
     """Return the default user data directory."""
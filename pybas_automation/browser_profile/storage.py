@@ -3,26 +3,94 @@ Browser storage module.
 
 This module is responsible for storing browser profiles to disk and  loading metadata of browser profiles from disk
 into memory.
+
+The metadata of all profiles is kept in a manifest, so that profiles can be counted, listed and filtered with one file
+read. Like the task journal, every save appends one record to the manifest journal, which is folded into the manifest
+once it grows past a threshold.
+
+A sharded storage keeps the profile directories two levels deep, under prefixes of the SHA-256 of the profile name, e.g.
+PyBASProfiles/3f/a2/<profile_name>, so no directory holds more than a few hundred entries even with millions of
+profiles. The directory of a profile follows from its name, and listings read one shard at a time. Flat storages are
+converted with migrate_to_sharded().
+
+With a FingerprintBlobStore, fingerprints are stored compressed and deduplicated in the blob store, and the profiles
+only hold a reference to them. BAS reads the fingerprint file of a profile, write it with materialize() before.
 """
+import asyncio
+import hashlib
 import json
+import mmap
 import os
+import re
+import shutil
 import tempfile
-from typing import List, Union
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Callable, Dict, Iterator, List, Tuple, Union
 
-import filelock
 from fastapi.encoders import jsonable_encoder
-from pydantic import DirectoryPath
+from pydantic import DirectoryPath, FilePath, ValidationError
 
 from pybas_automation import STORAGE_SUBDIR
 from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy
-from pybas_automation.browser_profile.models import BrowserProfile
-from pybas_automation.browser_profile.settings import (_filelock_filename, _fingerprint_raw_filename, _proxy_filename,
-                                                       _storage_dir)
-from pybas_automation.fingerprint import BasFingerprintRequest, get_fingerprint
-from pybas_automation.utils import create_storage_dir_in_app_data, get_logger
+from pybas_automation.browser_profile.blob_store import (
+    FingerprintBlobRef,
+    FingerprintBlobStore,
+    FingerprintBlobStoreStats,
+)
+from pybas_automation.browser_profile.catalog import FingerprintCatalog, FingerprintCatalogData, FingerprintCatalogRow
+from pybas_automation.browser_profile.models import (
+    BrowserProfile,
+    BrowserProfileBatchFailure,
+    BrowserProfileBatchResult,
+    BrowserProfileManifest,
+    BrowserProfileManifestEntry,
+)
+from pybas_automation.browser_profile.proxy import ProxyCheckResult, ProxyHealthChecker
+from pybas_automation.browser_profile.settings import (
+    _catalog_filename,
+    _filelock_filename,
+    _fingerprint_raw_filename,
+    _fingerprint_ref_filename,
+    _layout_filename,
+    _manifest_compact_threshold,
+    _manifest_filename,
+    _manifest_journal_filename,
+    _proxy_check_filename,
+    _proxy_filename,
+    _storage_dir,
+)
+from pybas_automation.fingerprint import BasFingerprintRequest, FingerprintClient, FingerprintPool, get_fingerprint
+from pybas_automation.fingerprint.attributes import FingerprintAttributes, parse_fingerprint_attributes
+from pybas_automation.utils import (
+    FileIdentity,
+    ReadWriteFileLock,
+    atomic_open,
+    create_storage_dir_in_app_data,
+    file_identity,
+    get_logger,
+    read_file_with_identity,
+)
 
 logger = get_logger()
 
+# Files of a profile whose changes are picked up by load_all().
+_profile_signature_filenames = (_fingerprint_raw_filename.name, _fingerprint_ref_filename.name, _proxy_filename.name)
+
+
+# Names of the shard directories of a sharded storage.
+_shard_name_re = re.compile(r"^[0-9a-f]{2}$")
+
+
+class BrowserProfileStorageLayoutEnum(str, Enum):
+    """Layout of the profile directories in the storage directory."""
+
+    # All profile directories directly in the storage directory.
+    FLAT = "flat"
+    # Profile directories in two levels of shard directories, see profile_shard().
+    SHARDED = "sharded"
+
 
 class BrowserProfileStorageExistsError(Exception):
     """Raised when a browser profile already exists in the storage."""
@@ -32,25 +100,75 @@ class FingerprintError(Exception):
     """Raised when a fingerprint key is empty."""
 
 
+def fingerprint_hash(fingerprint_raw: str) -> str:
+    """
+    Hash a fingerprint.
+
+    :param fingerprint_raw: The fingerprint raw string.
+    :return: SHA-256 hex digest of the fingerprint.
+    """
+
+    return hashlib.sha256(fingerprint_raw.encode("utf-8")).hexdigest()
+
+
+def profile_shard(profile_name: str) -> Tuple[str, str]:
+    """
+    Get the shard directories of a profile in a sharded storage.
+
+    :param profile_name: The name of the browser profile.
+    :return: The names of the first and the second level shard directory.
+    """
+
+    digest = hashlib.sha256(profile_name.encode("utf-8")).hexdigest()
+    return digest[:2], digest[2:4]
+
+
 class BrowserProfileStorage:
     """Handles the storage and retrieval of browser profiles."""
 
     storage_dir: DirectoryPath
     fingerprint_key: Union[str, None]
+    blob_store: Union[FingerprintBlobStore, None]
+    fingerprint_pool: Union[FingerprintPool, None]
+    layout: BrowserProfileStorageLayoutEnum
+    manifest_file_path: FilePath
+    manifest_journal_file_path: FilePath
+    manifest_compact_threshold: int = _manifest_compact_threshold
+    catalog_file_path: FilePath
+
+    # Profiles loaded by load_all() and the signature of their files, see _profile_signature()
+    _profiles: Dict[str, BrowserProfile]
+    _profile_signatures: Dict[str, Tuple]
+    _lock: ReadWriteFileLock
+
+    # The manifest in memory and the identity of the files it was read from, see _read_manifest()
+    _manifest: Union[BrowserProfileManifest, None] = None
+    _manifest_identity: Tuple[Union[FileIdentity, None], Union[FileIdentity, None]] = (None, None)
+    _manifest_journal_records: int = 0
 
-    _profiles: Union[list[BrowserProfile], None] = None
-    _lock: filelock.FileLock
+    # The fingerprint catalog in memory and the identity of the file it was read from, see _read_catalog()
+    _catalog: Union[FingerprintCatalog, None] = None
+    _catalog_identity: Union[FileIdentity, None] = None
 
     def __init__(
-        self, storage_dir: Union[DirectoryPath, None] = None, fingerprint_key: Union[str, None] = None
+        self,
+        storage_dir: Union[DirectoryPath, None] = None,
+        fingerprint_key: Union[str, None] = None,
+        blob_store: Union[FingerprintBlobStore, None] = None,
+        layout: Union[BrowserProfileStorageLayoutEnum, None] = None,
+        fingerprint_pool: Union[FingerprintPool, None] = None,
     ) -> None:
         """
         Initialize BrowserStorage.
 
         :param storage_dir: The directory to store the browser profiles.
         :param fingerprint_key: Your personal fingerprint key of FingerprintSwitcher.
+        :param blob_store: Store the fingerprints in this blob store instead of a file per profile.
+        :param layout: Layout of a new storage. Defaults to the layout of the existing storage, or flat.
+        :param fingerprint_pool: Take the fingerprints of new profiles from this pool, and fetch them only if it is
+            empty.
 
-        :raises ValueError: If the storage_dir is not a directory.
+        :raises ValueError: If the storage_dir is not a directory, or the layout differs from the existing storage.
         """
 
         if storage_dir is None:
@@ -61,7 +179,410 @@ class BrowserProfileStorage:
             self.storage_dir = DirectoryPath(storage_dir)
 
         self.fingerprint_key = fingerprint_key
-        self._lock = filelock.FileLock(os.path.join(self.storage_dir, _filelock_filename))
+        self.blob_store = blob_store
+        self.fingerprint_pool = fingerprint_pool
+        self.manifest_file_path = self.storage_dir.joinpath(_manifest_filename)
+        self.manifest_journal_file_path = self.storage_dir.joinpath(_manifest_journal_filename)
+        self.catalog_file_path = self.storage_dir.joinpath(_catalog_filename)
+        self._lock = ReadWriteFileLock(os.path.join(self.storage_dir, _filelock_filename))
+        self._profiles = {}
+        self._profile_signatures = {}
+
+        self.layout = self._read_layout()
+        if layout is not None and layout != self.layout:
+            if self.layout != BrowserProfileStorageLayoutEnum.FLAT or self._profile_names():
+                raise ValueError(f"Storage layout is {self.layout.value}, use migrate_to_sharded() to change it.")
+            self._write_layout(layout=BrowserProfileStorageLayoutEnum(layout))
+
+    def _read_layout(self) -> BrowserProfileStorageLayoutEnum:
+        """Read the layout of the storage, storages without a layout file are flat."""
+
+        layout_filename = self.storage_dir.joinpath(_layout_filename)
+        if not layout_filename.exists():
+            return BrowserProfileStorageLayoutEnum.FLAT
+
+        return BrowserProfileStorageLayoutEnum(json.loads(layout_filename.read_text(encoding="utf-8"))["layout"])
+
+    def _write_layout(self, layout: BrowserProfileStorageLayoutEnum) -> None:
+        """Write the layout of the storage."""
+
+        with atomic_open(self.storage_dir.joinpath(_layout_filename), mode="wb") as f:
+            f.write(json.dumps({"layout": layout.value}).encode("utf-8"))
+
+        self.layout = layout
+
+    def profile_dir(self, profile_name: str) -> DirectoryPath:
+        """
+        Get the directory of a profile, without touching the disk.
+
+        :param profile_name: The name of the browser profile.
+        :return: The path of the profile directory, it may not exist.
+        """
+
+        if self.layout == BrowserProfileStorageLayoutEnum.SHARDED:
+            return self.storage_dir.joinpath(*profile_shard(profile_name=profile_name), profile_name)
+
+        return self.storage_dir.joinpath(profile_name)
+
+    def _profile_name_of(self, profile_dir: DirectoryPath) -> Union[str, None]:
+        """Return the name of a profile directory of this storage, or None if the directory is elsewhere."""
+
+        if self.profile_dir(profile_name=profile_dir.name).resolve() == profile_dir.resolve():
+            return profile_dir.name
+
+        return None
+
+    def _iter_shards(self) -> Iterator[str]:
+        """Iterate over the paths of the second level shard directories of a sharded storage."""
+
+        with os.scandir(self.storage_dir) as it:
+            shards = sorted(entry.path for entry in it if entry.is_dir() and _shard_name_re.match(entry.name))
+
+        for shard in shards:
+            with os.scandir(shard) as it:
+                sub_shards = sorted(entry.path for entry in it if entry.is_dir() and _shard_name_re.match(entry.name))
+            yield from sub_shards
+
+    def _iter_profile_entries(self) -> Iterator[os.DirEntry]:
+        """
+        Iterate over the directory entries of the profiles.
+
+        A sharded storage is read one shard at a time, so the first profiles are returned without listing all of them.
+        """
+
+        if self.layout == BrowserProfileStorageLayoutEnum.FLAT:
+            with os.scandir(self.storage_dir) as it:
+                yield from (entry for entry in it if entry.is_dir())
+            return
+
+        for shard in self._iter_shards():
+            with os.scandir(shard) as it:
+                yield from (entry for entry in it if entry.is_dir())
+
+    def iter_profile_names(self) -> Iterator[str]:
+        """
+        Iterate over the names of the browser profiles on disk, a sharded storage is read one shard at a time.
+
+        :return: Iterator over the profile names.
+        """
+
+        for entry in self._iter_profile_entries():
+            yield entry.name
+
+    def _profile_names(self) -> List[str]:
+        """
+        List the names of the browser profiles in the storage.
+
+        Only directories are profiles, files like the lock file are skipped.
+
+        :return: List of profile names.
+        """
+
+        return list(self.iter_profile_names())
+
+    def _profiles_mtime_ns(self) -> int:
+        """
+        Return the latest modification time of the directories holding the profiles, adding or removing a profile
+        changes it.
+        """
+
+        mtime_ns = os.stat(self.storage_dir).st_mtime_ns
+        if self.layout == BrowserProfileStorageLayoutEnum.SHARDED:
+            for shard in self._iter_shards():
+                mtime_ns = max(mtime_ns, os.stat(shard).st_mtime_ns)
+
+        return mtime_ns
+
+    def _is_manifest_unchanged(self) -> bool:
+        """Check whether the manifest and its journal are the files the manifest in memory was read from."""
+
+        manifest_identity, journal_identity = self._manifest_identity
+        if manifest_identity is None:
+            if self.manifest_file_path.exists():
+                return False
+        elif not manifest_identity.matches(self.manifest_file_path):
+            return False
+
+        # The journal is only appended to, so its size tells new records apart.
+        return file_identity(self.manifest_journal_file_path, with_digest=False) == journal_identity
+
+    def _read_manifest(self) -> Union[BrowserProfileManifest, None]:
+        """
+        Read the manifest and apply its journal. The caller must hold the lock.
+
+        The manifest is kept in memory and read again only if the files changed.
+
+        :return: The manifest, or None if the storage has no valid manifest yet.
+        """
+
+        if self._manifest is not None and self._is_manifest_unchanged():
+            return self._manifest
+
+        manifest = BrowserProfileManifest()
+        manifest_identity = None
+        if self.manifest_file_path.exists():
+            data, manifest_identity = read_file_with_identity(self.manifest_file_path)
+            try:
+                manifest = BrowserProfileManifest.model_validate_json(data)
+            except ValidationError:
+                # Cut short by a process killed in the middle of a write, it is rebuilt.
+                logger.warning("Skipping corrupted manifest %s", self.manifest_file_path)
+                return None
+
+        journal_identity = file_identity(self.manifest_journal_file_path, with_digest=False)
+        if manifest_identity is None and journal_identity is None:
+            return None
+
+        records = 0
+        if journal_identity is not None:
+            with self.manifest_journal_file_path.open(mode="rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Truncated by a process killed in the middle of a write.
+                        break
+                    try:
+                        entry = BrowserProfileManifestEntry.model_validate_json(line)
+                    except ValidationError:
+                        logger.warning("Skipping corrupted record in %s", self.manifest_journal_file_path)
+                        continue
+                    manifest.profiles[entry.profile_name] = entry
+                    records += 1
+
+        self._manifest = manifest
+        self._manifest_identity = (manifest_identity, journal_identity)
+        self._manifest_journal_records = records
+
+        return manifest
+
+    def _write_manifest(self, manifest: BrowserProfileManifest) -> None:
+        """
+        Write the manifest and drop its journal. The caller must hold the write lock.
+
+        Unlike the other files the manifest is written in place, so writing it does not change the modification time
+        of the storage directory it records. Readers hold the lock, and a manifest cut short by a crash is rebuilt.
+        """
+
+        if self.manifest_journal_file_path.exists():
+            self.manifest_journal_file_path.unlink()
+        self.manifest_file_path.touch()
+
+        manifest.storage_mtime_ns = self._profiles_mtime_ns()
+        data = manifest.model_dump_json().encode("utf-8")
+        with self.manifest_file_path.open(mode="wb") as f:
+            f.write(data)
+
+        self._manifest = manifest
+        self._manifest_identity = (file_identity(self.manifest_file_path, data=data), None)
+        self._manifest_journal_records = 0
+
+    def _scan_entry(self, profile_name: str) -> BrowserProfileManifestEntry:
+        """Build the manifest entry of a profile from its files on disk. The caller must hold the lock."""
+
+        profile_dir = self.profile_dir(profile_name=profile_name)
+        sub_dir = profile_dir.joinpath(STORAGE_SUBDIR)
+
+        entry = BrowserProfileManifestEntry(
+            profile_name=profile_name,
+            created_at=datetime.fromtimestamp(os.stat(profile_dir).st_ctime, tz=timezone.utc),
+        )
+
+        fingerprint_filename = sub_dir.joinpath(_fingerprint_raw_filename)
+        fingerprint_ref_filename = sub_dir.joinpath(_fingerprint_ref_filename)
+        if fingerprint_filename.exists():
+            # Same as fingerprint_hash() of the contents, the file is written as UTF-8.
+            with fingerprint_filename.open(mode="rb") as f:
+                entry.fingerprint_hash = hashlib.file_digest(f, "sha256").hexdigest()
+        elif fingerprint_ref_filename.exists():
+            blob_ref = FingerprintBlobRef.model_validate_json(fingerprint_ref_filename.read_bytes())
+            entry.fingerprint_hash = blob_ref.fingerprint_hash
+
+        proxy_filename = sub_dir.joinpath(_proxy_filename)
+        if proxy_filename.exists():
+            entry.proxy = BasActionBrowserProxy(**json.loads(proxy_filename.read_text(encoding="utf-8")))
+
+        return entry
+
+    def _update_manifest(self, entry: BrowserProfileManifestEntry) -> None:
+        """
+        Add or replace the manifest entry of a profile. The caller must hold the write lock.
+
+        The timestamps of an existing entry are kept unless the new entry sets them.
+
+        :param entry: The manifest entry.
+        """
+
+        manifest = self._read_manifest()
+        if manifest is None:
+            manifest = self._rebuild_manifest()
+
+        existing = manifest.profiles.get(entry.profile_name)
+        if existing is not None:
+            entry.created_at = existing.created_at
+            if entry.last_used_at is None:
+                entry.last_used_at = existing.last_used_at
+
+        with self.manifest_journal_file_path.open(mode="ab") as f:
+            f.write(entry.model_dump_json().encode("utf-8") + b"\n")
+
+        manifest.profiles[entry.profile_name] = entry
+        self._manifest_identity = (
+            self._manifest_identity[0],
+            file_identity(self.manifest_journal_file_path, with_digest=False),
+        )
+        self._manifest_journal_records += 1
+
+        if self._manifest_journal_records >= self.manifest_compact_threshold:
+            self._write_manifest(manifest)
+
+    def _rebuild_manifest(self, rescan: bool = True) -> BrowserProfileManifest:
+        """
+        Build the manifest from the profile directories and write it. The caller must hold the write lock.
+
+        :param rescan: Scan the files of every profile. Otherwise only the profiles missing from the manifest are
+            scanned, and the entries of removed profiles are dropped.
+        """
+
+        manifest = self._read_manifest() or BrowserProfileManifest()
+
+        profile_names = self._profile_names()
+        if not rescan:
+            on_disk = set(profile_names)
+            profile_names = [name for name in manifest.profiles if name in on_disk] + sorted(
+                name for name in profile_names if name not in manifest.profiles
+            )
+        else:
+            profile_names.sort()
+
+        profiles = {}
+        for profile_name in profile_names:
+            existing = manifest.profiles.get(profile_name)
+            if existing is not None and not rescan:
+                profiles[profile_name] = existing
+                continue
+
+            entry = self._scan_entry(profile_name=profile_name)
+            if existing is not None:
+                entry.created_at = existing.created_at
+                entry.last_used_at = existing.last_used_at
+            profiles[profile_name] = entry
+
+        manifest = BrowserProfileManifest(profiles=profiles)
+        self._write_manifest(manifest)
+
+        return manifest
+
+    def rebuild_manifest(self) -> BrowserProfileManifest:
+        """
+        Build the manifest from the profile directories.
+
+        Use it after profiles were added, changed or removed by other means than this class. The timestamps of known
+        profiles are kept.
+
+        :return: The manifest.
+        """
+
+        with self._lock.write():
+            return self._rebuild_manifest()
+
+    def manifest(self) -> BrowserProfileManifest:
+        """
+        Get the manifest of the storage. It is built from the profile directories if it does not exist yet.
+
+        Profiles added or removed by other means than this class change the modification time of the storage
+        directory, the manifest is brought in line with the profile directories then.
+
+        :return: The manifest, do not change it.
+        """
+
+        with self._lock.read():
+            manifest = self._read_manifest()
+            if manifest is not None and manifest.storage_mtime_ns == self._profiles_mtime_ns():
+                return manifest
+
+        if manifest is None and not self._profile_names():
+            return BrowserProfileManifest()
+
+        with self._lock.write():
+            manifest = self._read_manifest()
+            if manifest is not None and manifest.storage_mtime_ns == self._profiles_mtime_ns():
+                return manifest
+            return self._rebuild_manifest(rescan=manifest is None)
+
+    def entries(
+        self,
+        has_proxy: Union[bool, None] = None,
+        fingerprint_hash: Union[str, None] = None,  # pylint: disable=redefined-outer-name
+        unused_since: Union[datetime, None] = None,
+    ) -> List[BrowserProfileManifestEntry]:
+        """
+        List the manifest entries of the profiles, optionally filtered.
+
+        :param has_proxy: Only profiles with (True) or without (False) a proxy.
+        :param fingerprint_hash: Only profiles with this fingerprint.
+        :param unused_since: Only profiles not used since this time, including never used ones.
+
+        :return: List of manifest entries, in the order the profiles were added.
+        """
+
+        entries = []
+        for entry in self.manifest().profiles.values():
+            if has_proxy is not None and (entry.proxy is not None) != has_proxy:
+                continue
+            if fingerprint_hash is not None and entry.fingerprint_hash != fingerprint_hash:
+                continue
+            if unused_since is not None and entry.last_used_at is not None and entry.last_used_at >= unused_since:
+                continue
+            entries.append(entry)
+
+        return entries
+
+    def touch(self, profile_name: str) -> BrowserProfileManifestEntry:
+        """
+        Record that a profile is used now.
+
+        :param profile_name: The name of the browser profile.
+        :return: The updated manifest entry.
+
+        :raises FileNotFoundError: If the profile does not exist.
+        """
+
+        with self._lock.write():
+            manifest = self._read_manifest()
+            if manifest is None or profile_name not in manifest.profiles:
+                manifest = self._rebuild_manifest()
+            if profile_name not in manifest.profiles:
+                raise FileNotFoundError(f"Browser profile not found: {self.profile_dir(profile_name=profile_name)}")
+
+            entry = manifest.profiles[profile_name].model_copy(update={"last_used_at": datetime.now(timezone.utc)})
+            self._update_manifest(entry=entry)
+
+        return entry
+
+    def set_proxies(self, proxies: Dict[str, BasActionBrowserProxy]) -> None:
+        """
+        Replace the proxies of profiles and update their manifest entries, all under one lock.
+
+        :param proxies: Profile name -> the new proxy.
+
+        :raises FileNotFoundError: If a profile does not exist, the proxies of the profiles before it are replaced.
+        """
+
+        with self._lock.write():
+            manifest = self._read_manifest()
+            if manifest is None:
+                manifest = self._rebuild_manifest()
+
+            for profile_name, proxy in proxies.items():
+                profile_dir = self.profile_dir(profile_name=profile_name)
+                if not profile_dir.is_dir():
+                    raise FileNotFoundError(f"Browser profile not found: {profile_dir}")
+
+                BrowserProfile(profile_dir=profile_dir, proxy=proxy).save_proxy_to_profile()
+
+                entry = manifest.profiles.get(profile_name)
+                if entry is None:
+                    entry = self._scan_entry(profile_name=profile_name)
+                self._update_manifest(entry=entry.model_copy(update={"proxy": proxy}))
 
     def count(self) -> int:
         """
@@ -70,13 +591,13 @@ class BrowserProfileStorage:
         :return: The number of browser profiles in the storage.
         """
 
-        return len(os.listdir(self.storage_dir))
+        return len(self.manifest().profiles)
 
     def new(self, profile_name: Union[str, None] = None, fingerprint_raw: Union[str, None] = None) -> BrowserProfile:
         """
         Create a new browser profile.
 
-        :param profile_name: The name of the browser profile.
+        :param profile_name: The name of the browser profile. Defaults to a random name, a UUID in a sharded storage.
         :param fingerprint_raw: The fingerprint raw string.
 
         :return: BrowserProfile instance.
@@ -84,28 +605,19 @@ class BrowserProfileStorage:
         :raises FingerprintKeyEmptyError: If the fingerprint key is empty.
         """
 
-        if self.fingerprint_key is None and fingerprint_raw is None:
-            raise FingerprintError("fingerprint_key is required.")
-
-        if fingerprint_raw is not None and self.fingerprint_key is not None:
-            raise FingerprintError("fingerprint_key and fingerprint_raw cannot be used together.")
+        self._check_fingerprint_source(fingerprint_raw=fingerprint_raw)
 
-        if profile_name is None:
-            profile_dir = DirectoryPath(tempfile.mkdtemp(dir=str(self.storage_dir)))
-        else:
-            profile_dir = self.storage_dir.joinpath(profile_name)
-            if profile_dir.exists():
-                raise BrowserProfileStorageExistsError(f"Browser profile already exists: {profile_dir}")
-            profile_dir.mkdir(parents=False)
-
-        browser_profile = BrowserProfile(profile_dir=profile_dir)
+        browser_profile = BrowserProfile(profile_dir=self._make_profile_dir(profile_name=profile_name))
 
         if fingerprint_raw is None:
             if self.fingerprint_key is None:  # is this dead code?
                 raise FingerprintError("fingerprint_key is required.")
 
             request_data = BasFingerprintRequest(key=self.fingerprint_key)
-            fingerprint_raw = get_fingerprint(request_data)
+            if self.fingerprint_pool is not None:
+                fingerprint_raw = self.fingerprint_pool.get(request_data)
+            else:
+                fingerprint_raw = get_fingerprint(request_data)
 
         browser_profile.fingerprint_raw = fingerprint_raw
 
@@ -113,35 +625,233 @@ class BrowserProfileStorage:
 
         return browser_profile
 
+    def _check_fingerprint_source(self, fingerprint_raw: Union[str, None]) -> None:
+        """Check that new profiles get their fingerprint either from the fingerprint key or from fingerprint_raw."""
+
+        if self.fingerprint_key is None and fingerprint_raw is None:
+            raise FingerprintError("fingerprint_key is required.")
+
+        if fingerprint_raw is not None and self.fingerprint_key is not None:
+            raise FingerprintError("fingerprint_key and fingerprint_raw cannot be used together.")
+
+    def _make_profile_dir(self, profile_name: Union[str, None]) -> DirectoryPath:
+        """
+        Create the directory of a new profile.
+
+        :param profile_name: The name of the browser profile, None for a random name.
+        :return: The path of the profile directory.
+
+        :raises BrowserProfileStorageExistsError: If the profile already exists.
+        """
+
+        if profile_name is None and self.layout == BrowserProfileStorageLayoutEnum.FLAT:
+            return DirectoryPath(tempfile.mkdtemp(dir=str(self.storage_dir)))
+
+        profile_dir = self.profile_dir(profile_name=profile_name or uuid.uuid4().hex)
+        if profile_dir.exists():
+            raise BrowserProfileStorageExistsError(f"Browser profile already exists: {profile_dir}")
+        profile_dir.parent.mkdir(parents=True, exist_ok=True)
+        profile_dir.mkdir(parents=False)
+
+        return profile_dir
+
+    def _new_profile(self, fingerprint_raw: str, proxy: Union[BasActionBrowserProxy, None]) -> BrowserProfile:
+        """
+        Create and save a new profile, its directory is removed again if that fails. Called from worker threads.
+
+        The files are written without the lock, nobody else knows the new directory yet, only the manifest update holds
+        the lock.
+        """
+
+        profile_dir = self._make_profile_dir(profile_name=None)
+
+        try:
+            browser_profile = BrowserProfile(profile_dir=profile_dir, proxy=proxy)
+            browser_profile.fingerprint_raw = fingerprint_raw
+            self._write_profile_files(browser_profile=browser_profile)
+
+            with self._lock.write():
+                self._update_manifest(entry=self._scan_entry(profile_name=profile_dir.name))
+        except BaseException:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+
+        return browser_profile
+
+    async def new_many_async(
+        self,
+        n: int,
+        concurrency: int = 10,
+        proxy_factory: Union[Callable[[], Union[BasActionBrowserProxy, None]], None] = None,
+        fingerprint_raw: Union[str, None] = None,
+    ) -> BrowserProfileBatchResult:
+        """
+        Create many browser profiles concurrently.
+
+        Up to concurrency fingerprints are fetched at once with one FingerprintClient, which reuses its connections and
+        retries transient errors, and the profiles are written in worker threads while further fingerprints are fetched.
+        Fingerprints in the fingerprint pool are used first. A profile that fails is reported in the result, the others
+        are created anyway.
+
+        :param n: The number of profiles to create.
+        :param concurrency: The maximum number of profiles created at once.
+        :param proxy_factory: Called once per profile, returns the proxy of the profile.
+        :param fingerprint_raw: The fingerprint of all profiles, instead of fetching one per profile.
+
+        :return: BrowserProfileBatchResult instance.
+
+        :raises FingerprintError: If neither or both of the fingerprint key and fingerprint_raw are given.
+        """
+
+        self._check_fingerprint_source(fingerprint_raw=fingerprint_raw)
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1: {concurrency}")
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with FingerprintClient(concurrency=concurrency) as client:
+
+            async def _create() -> BrowserProfile:
+                async with semaphore:
+                    profile_fingerprint_raw = fingerprint_raw
+                    if profile_fingerprint_raw is None:
+                        if self.fingerprint_key is None:
+                            raise FingerprintError("fingerprint_key is required.")
+                        request_data = BasFingerprintRequest(key=self.fingerprint_key)
+                        if self.fingerprint_pool is not None:
+                            # The pool lists, renames and reads files, keep it off the event loop.
+                            profile_fingerprint_raw = await asyncio.to_thread(self.fingerprint_pool.pop, request_data)
+                        if profile_fingerprint_raw is None:
+                            profile_fingerprint_raw = await client.get_fingerprint(request_data)
+
+                    proxy = proxy_factory() if proxy_factory is not None else None
+
+                    return await asyncio.to_thread(self._new_profile, profile_fingerprint_raw, proxy)
+
+            outcomes = await asyncio.gather(*(_create() for _ in range(n)), return_exceptions=True)
+
+        result = BrowserProfileBatchResult()
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning("Failed to create browser profile %d of %d: %r", index + 1, n, outcome)
+                failure = BrowserProfileBatchFailure(index=index, error_type=type(outcome).__name__, error=str(outcome))
+                result.failures.append(failure)
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                result.profiles.append(outcome)
+
+        return result
+
+    def new_many(
+        self,
+        n: int,
+        concurrency: int = 10,
+        proxy_factory: Union[Callable[[], Union[BasActionBrowserProxy, None]], None] = None,
+        fingerprint_raw: Union[str, None] = None,
+    ) -> BrowserProfileBatchResult:
+        """
+        Create many browser profiles concurrently, see new_many_async(). Do not call it from a running event loop.
+
+        :param n: The number of profiles to create.
+        :param concurrency: The maximum number of profiles created at once.
+        :param proxy_factory: Called once per profile, returns the proxy of the profile.
+        :param fingerprint_raw: The fingerprint of all profiles, instead of fetching one per profile.
+
+        :return: BrowserProfileBatchResult instance.
+        """
+
+        return asyncio.run(
+            self.new_many_async(
+                n=n, concurrency=concurrency, proxy_factory=proxy_factory, fingerprint_raw=fingerprint_raw
+            )
+        )
+
     def save(self, browser_profile: BrowserProfile) -> None:
         """
-        Save the browser profile to disk.
+        Save the browser profile to disk and update its manifest entry.
+
+        Profiles outside the storage directory are saved, but they are not part of the manifest.
 
         :param browser_profile: BrowserProfile instance.
         :return: None.
         """
 
+        with self._lock.write():
+            self._write_profile_files(browser_profile=browser_profile)
+
+            profile_name = self._profile_name_of(profile_dir=browser_profile.profile_dir)
+            if profile_name is not None:
+                self._update_manifest(entry=self._scan_entry(profile_name=profile_name))
+
+    def _write_profile_files(self, browser_profile: BrowserProfile) -> None:
+        """Write the fingerprint and the proxy of a profile. The caller must hold the write lock."""
+
         sub_dir = browser_profile.profile_dir.joinpath(STORAGE_SUBDIR)
         sub_dir.mkdir(parents=True, exist_ok=True)
 
         fingerprint_filename = sub_dir.joinpath(_fingerprint_raw_filename)
+        fingerprint_ref_filename = sub_dir.joinpath(_fingerprint_ref_filename)
         proxy_filename = sub_dir.joinpath(_proxy_filename)
 
-        if browser_profile.fingerprint_raw is not None:
-            fingerprint_filename.open("w", encoding="utf-8").write(browser_profile.fingerprint_raw)
+        # Only a fingerprint set in memory is written, one read from disk is not read just to write it back.
+        fingerprint_raw = browser_profile.fingerprint_raw_in_memory
+        if fingerprint_raw is not None:
+            if self.blob_store is not None:
+                self._save_fingerprint_blob(browser_profile=browser_profile, fingerprint_raw=fingerprint_raw)
+            else:
+                with atomic_open(fingerprint_filename) as f:
+                    f.write(fingerprint_raw)
+                browser_profile.use_fingerprint_file(fingerprint_filename)
+        elif browser_profile.fingerprint_file_path is not None and not fingerprint_filename.exists():
+            # Loaded from another profile directory.
+            with browser_profile.fingerprint_mmap() as mapped:
+                if mapped is not None:
+                    if self.blob_store is not None:
+                        self._save_fingerprint_blob(browser_profile=browser_profile, fingerprint_raw=mapped)
+                    else:
+                        with atomic_open(fingerprint_filename, mode="wb") as f:
+                            f.write(mapped)
+                        browser_profile.use_fingerprint_file(fingerprint_filename)
+        elif browser_profile.fingerprint_blob_ref is not None and not fingerprint_ref_filename.exists():
+            # Loaded from another profile directory, the blob is shared.
+            with atomic_open(fingerprint_ref_filename, mode="wb") as f:
+                f.write(browser_profile.fingerprint_blob_ref.model_dump_json().encode("utf-8"))
 
         if browser_profile.proxy is not None:
-            proxy_filename = sub_dir.joinpath(proxy_filename)
-            proxy_filename.open("w", encoding="utf-8").write(json.dumps(jsonable_encoder(browser_profile.proxy)))
+            with atomic_open(proxy_filename) as f:
+                f.write(json.dumps(jsonable_encoder(browser_profile.proxy)))
+
+    def _save_fingerprint_blob(
+        self, browser_profile: BrowserProfile, fingerprint_raw: Union[str, bytes, mmap.mmap]
+    ) -> None:
+        """
+        Put a fingerprint into the blob store and make the profile refer to it. The caller must hold the write lock.
+
+        A fingerprint file left by an earlier save is removed, it would take precedence over the blob.
+        """
+
+        assert self.blob_store is not None
+
+        sub_dir = browser_profile.profile_dir.joinpath(STORAGE_SUBDIR)
+        blob_ref = self.blob_store.ref(fingerprint_hash=self.blob_store.put(fingerprint_raw=fingerprint_raw))
+
+        with atomic_open(sub_dir.joinpath(_fingerprint_ref_filename), mode="wb") as f:
+            f.write(blob_ref.model_dump_json().encode("utf-8"))
+
+        sub_dir.joinpath(_fingerprint_raw_filename).unlink(missing_ok=True)
+        browser_profile.use_fingerprint_blob(blob_ref)
 
     def load(self, profile_name: str) -> BrowserProfile:
         """
         Load a browser profile from disk.
 
+        The fingerprint is not read here, BrowserProfile.fingerprint_raw reads it on access.
+
         :param profile_name: The name of the browser profile.
         :return: BrowserProfile instance.
         """
-        profile_dir = self.storage_dir.joinpath(profile_name)
+        profile_dir = self.profile_dir(profile_name=profile_name)
 
         if not profile_dir.exists():
             raise FileNotFoundError(f"Browser profile not found: {profile_dir}")
@@ -152,29 +862,350 @@ class BrowserProfileStorage:
 
         sub_dir = profile_dir.joinpath(STORAGE_SUBDIR)
 
-        fingerprint_filename = sub_dir.joinpath(_fingerprint_raw_filename)
-        if fingerprint_filename.exists():
-            fingerprint_raw = fingerprint_filename.open("r", encoding="utf-8").read()
-            browser_profile.fingerprint_raw = fingerprint_raw
+        with self._lock.read():
+            # The fingerprint is read only when it is accessed.
+            fingerprint_filename = sub_dir.joinpath(_fingerprint_raw_filename)
+            fingerprint_ref_filename = sub_dir.joinpath(_fingerprint_ref_filename)
+            if fingerprint_filename.exists():
+                browser_profile.use_fingerprint_file(fingerprint_filename)
+            elif fingerprint_ref_filename.exists():
+                browser_profile.use_fingerprint_blob(
+                    FingerprintBlobRef.model_validate_json(fingerprint_ref_filename.read_bytes())
+                )
 
-        proxy_filename = sub_dir.joinpath(_proxy_filename)
-        if proxy_filename.exists():
-            _proxy = json.loads(proxy_filename.open("r", encoding="utf-8").read())
-            browser_profile.proxy = BasActionBrowserProxy(**_proxy)
+            proxy_filename = sub_dir.joinpath(_proxy_filename)
+            if proxy_filename.exists():
+                _proxy = json.loads(proxy_filename.open("r", encoding="utf-8").read())
+                browser_profile.proxy = BasActionBrowserProxy(**_proxy)
 
         return browser_profile
 
+    @staticmethod
+    def _profile_signature(profile_entry: os.DirEntry) -> Tuple:
+        """
+        Get the signature of a profile, it changes when the profile is saved.
+
+        The signature consists of the modification times and sizes of the profile directory and the stored files, which
+        scandir() returns without opening any file.
+
+        :param profile_entry: The profile directory entry.
+        :return: The signature.
+        """
+
+        signature: List[Tuple] = [(profile_entry.name, profile_entry.stat().st_mtime_ns)]
+
+        try:
+            with os.scandir(os.path.join(profile_entry.path, STORAGE_SUBDIR)) as it:
+                for entry in it:
+                    if entry.name in _profile_signature_filenames:
+                        stat = entry.stat()
+                        signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            pass
+
+        return tuple(sorted(signature))
+
     def load_all(self) -> List[BrowserProfile]:
         """
         Load all browser profiles from disk.
 
+        Profiles are kept in memory by name. Calling it again loads only the profiles that are new or were changed since
+        the last call and drops the removed ones, the other profiles are returned as they are.
+
         :return: List[BrowserProfile].
         """
-        if self._profiles is None:
-            self._profiles = []
 
-        for profile_name in os.listdir(self.storage_dir):
-            browser_profile = self.load(profile_name=profile_name)
-            self._profiles.append(browser_profile)
+        with self._lock.read():
+            profile_names = set()
+
+            for entry in self._iter_profile_entries():
+                profile_names.add(entry.name)
+
+                signature = self._profile_signature(entry)
+                if self._profile_signatures.get(entry.name) == signature:
+                    continue
+
+                try:
+                    self._profiles[entry.name] = self.load(profile_name=entry.name)
+                except FileNotFoundError:
+                    # Removed in the meantime, e.g. by another process.
+                    profile_names.discard(entry.name)
+                    continue
+                self._profile_signatures[entry.name] = signature
+
+            for profile_name in set(self._profiles) - profile_names:
+                del self._profiles[profile_name]
+                del self._profile_signatures[profile_name]
+
+        return list(self._profiles.values())
+
+    def materialize(self, profile_name: str) -> FilePath:
+        """
+        Write the fingerprint file of a profile whose fingerprint is in the blob store, BAS reads the file.
+
+        The reference to the blob is kept, saving the profile again with a blob store removes the file.
+
+        :param profile_name: The name of the browser profile.
+        :return: The path of the fingerprint file.
+
+        :raises FileNotFoundError: If the profile has no fingerprint.
+        """
+
+        sub_dir = self.profile_dir(profile_name=profile_name).joinpath(STORAGE_SUBDIR)
+        fingerprint_filename = sub_dir.joinpath(_fingerprint_raw_filename)
+        fingerprint_ref_filename = sub_dir.joinpath(_fingerprint_ref_filename)
+
+        with self._lock.write():
+            if fingerprint_filename.exists():
+                return fingerprint_filename
+            if not fingerprint_ref_filename.exists():
+                raise FileNotFoundError(f"Browser profile has no fingerprint: {sub_dir.parent}")
+
+            blob_ref = FingerprintBlobRef.model_validate_json(fingerprint_ref_filename.read_bytes())
+            blob_store = FingerprintBlobStore(store_dir=blob_ref.store_dir)
+            data = blob_store.get_bytes(fingerprint_hash=blob_ref.fingerprint_hash)
+
+            with atomic_open(fingerprint_filename, mode="wb") as f:
+                f.write(data)
+
+        return fingerprint_filename
+
+    def pack_fingerprints(self) -> int:
+        """
+        Move the fingerprint files of all profiles into the blob store.
+
+        :return: The number of moved fingerprints.
+
+        :raises ValueError: If the storage has no blob store.
+        """
+
+        if self.blob_store is None:
+            raise ValueError("blob_store is required.")
+
+        packed = 0
+
+        with self._lock.write():
+            for profile_name in self._profile_names():
+                browser_profile = BrowserProfile(profile_dir=self.profile_dir(profile_name=profile_name))
+                fingerprint_filename = browser_profile.profile_dir.joinpath(STORAGE_SUBDIR, _fingerprint_raw_filename)
+                if not fingerprint_filename.exists():
+                    continue
+
+                browser_profile.use_fingerprint_file(fingerprint_filename)
+                with browser_profile.fingerprint_mmap() as mapped:
+                    self._save_fingerprint_blob(browser_profile=browser_profile, fingerprint_raw=mapped or b"")
+
+                self._update_manifest(entry=self._scan_entry(profile_name=profile_name))
+                packed += 1
+
+        if packed:
+            logger.debug("Moved %d fingerprints of %s into %s", packed, self.storage_dir, self.blob_store.store_dir)
+
+        return packed
+
+    def fingerprint_stats(self) -> FingerprintBlobStoreStats:
+        """
+        Get the deduplication and compression statistics of the fingerprints of this storage.
+
+        Blobs of other storages sharing the blob store are included in the blob counts and sizes.
+
+        :return: FingerprintBlobStoreStats instance.
+
+        :raises ValueError: If the storage has no blob store.
+        """
+
+        if self.blob_store is None:
+            raise ValueError("blob_store is required.")
+
+        references = [entry.fingerprint_hash for entry in self.entries() if entry.fingerprint_hash is not None]
+        return self.blob_store.stats(references=references)
+
+    def migrate_to_sharded(self) -> int:
+        """
+        Move the profile directories of a flat storage into shard directories.
+
+        Profile names stay the same, only the paths of the profile directories change. Paths kept elsewhere, e.g. in
+        the tasks file, must be updated, resolve them by name with profile_dir(). The storage is marked as sharded
+        first, run it again if it was interrupted. Do not use the storage from other processes while it runs.
+
+        :return: The number of moved profiles.
+        """
+
+        moved = 0
+
+        with self._lock.write():
+            if self.layout == BrowserProfileStorageLayoutEnum.FLAT:
+                flat_names = self._profile_names()
+                self._write_layout(layout=BrowserProfileStorageLayoutEnum.SHARDED)
+            else:
+                # Profiles left in the storage directory by an interrupted migration.
+                with os.scandir(self.storage_dir) as it:
+                    flat_names = [entry.name for entry in it if entry.is_dir() and not _shard_name_re.match(entry.name)]
+
+            for profile_name in flat_names:
+                profile_dir = self.profile_dir(profile_name=profile_name)
+                profile_dir.parent.mkdir(parents=True, exist_ok=True)
+                os.rename(self.storage_dir.joinpath(profile_name), profile_dir)
+                moved += 1
+
+            self._profiles = {}
+            self._profile_signatures = {}
+
+        if moved:
+            logger.info("Moved %d profiles of %s into shard directories", moved, self.storage_dir)
+
+        return moved
+
+    def _read_catalog(self) -> FingerprintCatalog:
+        """Read the fingerprint catalog, it is kept in memory and read again only if the file changed."""
+
+        identity = file_identity(self.catalog_file_path, with_digest=False)
+        if identity is None:
+            return FingerprintCatalog()
+        if self._catalog is not None and identity == self._catalog_identity:
+            return self._catalog
+
+        with self.catalog_file_path.open(mode="rb") as f:
+            catalog = FingerprintCatalog(data=FingerprintCatalogData.model_validate_json(f.read()))
+
+        self._catalog = catalog
+        self._catalog_identity = identity
+
+        return catalog
+
+    def fingerprint_catalog(self, refresh: bool = True) -> FingerprintCatalog:
+        """
+        Get the catalog of the fingerprint attributes of the profiles, to select profiles by screen size, browser
+        version, platform or tags, e.g. fingerprint_catalog().query(width=1920, height=1080, min_browser_version=120).
+
+        Refreshing it reads only the fingerprints of the profiles that are new or changed since the last refresh,
+        according to the manifest.
+
+        :param refresh: Bring the catalog up to date with the manifest first.
+        :return: FingerprintCatalog instance.
+        """
+
+        with self._lock.read():
+            catalog = self._read_catalog()
+
+        if not refresh:
+            return catalog
+
+        known: Dict[str, FingerprintAttributes] = {row.fingerprint_hash: row.attributes for row in catalog.rows()}
+        current = {row.profile_name: row.fingerprint_hash for row in catalog.rows()}
+
+        rows = []
+        changed = False
+        for entry in self.entries():
+            if entry.fingerprint_hash is None:
+                continue
+
+            if current.pop(entry.profile_name, None) != entry.fingerprint_hash:
+                changed = True
+
+            attributes = known.get(entry.fingerprint_hash)
+            if attributes is None:
+                try:
+                    fingerprint_raw = self.load(profile_name=entry.profile_name).fingerprint_raw
+                    if fingerprint_raw is None:
+                        continue
+                    attributes = parse_fingerprint_attributes(fingerprint_raw)
+                except (FileNotFoundError, ValueError) as exc:
+                    logger.warning("Skipping the fingerprint of %s in the catalog: %r", entry.profile_name, exc)
+                    continue
+                known[entry.fingerprint_hash] = attributes
+
+            row = FingerprintCatalogRow(
+                profile_name=entry.profile_name, fingerprint_hash=entry.fingerprint_hash, attributes=attributes
+            )
+            rows.append(row)
+
+        if not changed and not current:
+            return catalog
+
+        catalog = FingerprintCatalog.build(rows)
+
+        with self._lock.write():
+            with atomic_open(self.catalog_file_path, mode="wb") as f:
+                f.write(catalog.data.model_dump_json().encode("utf-8"))
+            self._catalog = catalog
+            self._catalog_identity = file_identity(self.catalog_file_path, with_digest=False)
+
+        return catalog
+
+    def proxy_check(self, profile_name: str) -> Union[ProxyCheckResult, None]:
+        """
+        Get the result of the last check of the proxy of a profile, see check_proxies().
+
+        :param profile_name: The name of the browser profile.
+        :return: ProxyCheckResult instance, or None if the proxy was not checked.
+        """
+
+        file_path = self.profile_dir(profile_name=profile_name).joinpath(STORAGE_SUBDIR, _proxy_check_filename)
+
+        try:
+            return ProxyCheckResult.model_validate_json(file_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except ValidationError as exc:
+            logger.warning("Ignoring the invalid proxy check result of %s: %r", profile_name, exc)
+            return None
+
+    async def check_proxies_async(
+        self, checker: Union[ProxyHealthChecker, None] = None, force: bool = False
+    ) -> Dict[str, ProxyCheckResult]:
+        """
+        Check the proxies of all profiles concurrently, and save the result of every profile in its directory.
+
+        Results saved by earlier checks are used until they are older than the ttl of the checker.
+
+        :param checker: The checker to use. Defaults to a ProxyHealthChecker with default settings.
+        :param force: Check the proxies even if they have a recent result.
+
+        :return: Profile name -> result, for the profiles with a proxy.
+        """
+
+        if checker is None:
+            checker = ProxyHealthChecker()
+
+        entries = self.entries(has_proxy=True)
+        proxies = [entry.proxy for entry in entries if entry.proxy is not None]
+
+        saved: Dict[str, Union[ProxyCheckResult, None]] = {}
+        for entry in entries:
+            saved[entry.profile_name] = self.proxy_check(profile_name=entry.profile_name)
+            result = saved[entry.profile_name]
+            if result is not None and result.proxy == entry.proxy:
+                checker.remember(result)
+
+        results = await checker.check_many_async(proxies, force=force)
+
+        checked: Dict[str, ProxyCheckResult] = {}
+        for entry, result in zip(entries, results):
+            checked[entry.profile_name] = result
+            if saved[entry.profile_name] == result:
+                continue
+
+            sub_dir = self.profile_dir(profile_name=entry.profile_name).joinpath(STORAGE_SUBDIR)
+            try:
+                with atomic_open(sub_dir.joinpath(_proxy_check_filename), mode="wb") as f:
+                    f.write(result.model_dump_json().encode("utf-8"))
+            except FileNotFoundError:
+                logger.warning("Browser profile removed while checking its proxy: %s", entry.profile_name)
+
+        return checked
+
+    def check_proxies(
+        self, checker: Union[ProxyHealthChecker, None] = None, force: bool = False
+    ) -> Dict[str, ProxyCheckResult]:
+        """
+        Check the proxies of all profiles concurrently, see check_proxies_async(). Do not call it from a running event
+        loop.
+
+        :param checker: The checker to use. Defaults to a ProxyHealthChecker with default settings.
+        :param force: Check the proxies even if they have a recent result.
+
+        :return: Profile name -> result, for the profiles with a proxy.
+        """
 
-        return self._profiles
+        return asyncio.run(self.check_proxies_async(checker=checker, force=force))
@@ -1,10 +1,20 @@
 """Module for interacting with the BAS fingerprint API."""
 
+from .attributes import FingerprintAttributes, parse_fingerprint_attributes
+from .client import FingerprintClient, LatencyHistogram, TokenBucket
 from .fingerprint import FingerprintRequestException, get_fingerprint
 from .models import BasFingerprintRequest
+from .pool import FingerprintPool, FingerprintPoolMetrics
 
 __all__ = [
     "BasFingerprintRequest",
+    "FingerprintAttributes",
+    "FingerprintClient",
+    "FingerprintPool",
+    "FingerprintPoolMetrics",
     "FingerprintRequestException",
+    "LatencyHistogram",
+    "TokenBucket",
     "get_fingerprint",
+    "parse_fingerprint_attributes",
 ]
@@ -0,0 +1,82 @@
+"""
+Attributes of a fingerprint.
+
+A fingerprint is a large JSON document, most of which only matters to the browser. The few attributes profiles are
+selected by, the screen size, the browser version and the platform, are extracted into a small typed model.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Union
+
+from pydantic import BaseModel, Field
+
+from pybas_automation import default_model_config
+
+_browser_version_re = re.compile(r"(?:Chrome|Chromium|CriOS)/(\d+)")
+
+# Substring of the user agent -> platform, the first match wins.
+_ua_platforms = (
+    ("Windows", "Windows"),
+    ("Android", "Android"),
+    ("iPhone", "iOS"),
+    ("iPad", "iOS"),
+    ("Mac OS X", "macOS"),
+    ("Macintosh", "macOS"),
+    ("Linux", "Linux"),
+)
+
+
+class FingerprintAttributes(BaseModel):
+    """Attributes of a fingerprint profiles are selected by."""
+
+    model_config = default_model_config
+
+    width: int = Field(default=0, ge=0)
+    height: int = Field(default=0, ge=0)
+    # Major version of the browser, 0 if the user agent has none.
+    browser_version: int = Field(default=0, ge=0)
+    # Platform of the user agent, e.g. "Windows", empty if unknown.
+    platform: str = Field(default="")
+    # Tags of the fingerprint, e.g. ["Microsoft Windows", "Chrome"].
+    tags: List[str] = Field(default_factory=list)
+
+
+def _platform(user_agent: str) -> str:
+    """Return the platform of a user agent."""
+
+    for needle, platform in _ua_platforms:
+        if needle in user_agent:
+            return platform
+
+    return ""
+
+
+def parse_fingerprint_attributes(fingerprint_raw: Union[str, bytes, Dict[str, Any]]) -> FingerprintAttributes:
+    """
+    Extract the attributes of a fingerprint.
+
+    :param fingerprint_raw: The fingerprint raw string, or the decoded fingerprint.
+    :return: FingerprintAttributes instance.
+
+    :raises ValueError: If the fingerprint is not a JSON object.
+    """
+
+    data = json.loads(fingerprint_raw) if isinstance(fingerprint_raw, (str, bytes)) else fingerprint_raw
+    if not isinstance(data, dict):
+        raise ValueError("The fingerprint is not a JSON object.")
+
+    user_agent = data.get("ua") or data.get("userAgent") or ""
+    match = _browser_version_re.search(user_agent)
+
+    tags = data.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tag for tag in tags.split(",") if tag]
+
+    return FingerprintAttributes(
+        width=int(data.get("width") or 0),
+        height=int(data.get("height") or 0),
+        browser_version=int(match.group(1)) if match else 0,
+        platform=_platform(user_agent),
+        tags=[str(tag) for tag in tags],
+    )
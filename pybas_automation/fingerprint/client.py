@@ -0,0 +1,280 @@
+"""
+Async fingerprint API client.
+
+FingerprintClient keeps its connections to the fingerprint API alive between requests, limits the number of requests in
+flight and their rate, and retries transient failures with jittered exponential backoff. Request latencies are recorded
+in a histogram.
+
+get_fingerprint() stays the synchronous way to fetch a single fingerprint.
+"""
+
+import asyncio
+import bisect
+import random
+import time
+from types import TracebackType
+from typing import Dict, List, Tuple, Type, Union
+
+import httpx
+from pydantic import BaseModel, Field
+
+from pybas_automation import default_model_config
+from pybas_automation.fingerprint.fingerprint import (
+    FINGERPRINT_TIMEOUT,
+    FingerprintRequestException,
+    _fingerprint_url,
+    _parse_fingerprint_response,
+)
+from pybas_automation.fingerprint.models import BasFingerprintRequest
+from pybas_automation.utils import get_logger
+
+logger = get_logger()
+
+# Responses worth retrying, the API is overloaded or restarting.
+_transient_status_codes = (429, 500, 502, 503, 504)
+
+# Upper bounds of the latency histogram buckets in seconds, the last bucket is unbounded.
+_latency_buckets: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencySnapshot(BaseModel):
+    """Latency histogram at one point in time."""
+
+    model_config = default_model_config
+
+    # Upper bound of the bucket in seconds ("+Inf" for the last one) -> number of requests.
+    buckets: Dict[str, int] = Field(default_factory=dict)
+    count: int = Field(default=0, ge=0)
+    total: float = Field(default=0.0, ge=0)
+
+    @property
+    def mean(self) -> float:
+        """Mean latency in seconds."""
+        return self.total / self.count if self.count else 0.0
+
+
+class LatencyHistogram:
+    """Histogram of request latencies with fixed buckets."""
+
+    bounds: Tuple[float, ...]
+
+    _counts: List[int]
+    _count: int
+    _total: float
+
+    def __init__(self, bounds: Tuple[float, ...] = _latency_buckets) -> None:
+        """
+        Initialize LatencyHistogram.
+
+        :param bounds: Ascending upper bounds of the buckets in seconds.
+        """
+
+        self.bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._count = 0
+        self._total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record the latency of a request."""
+
+        self._counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self._count += 1
+        self._total += seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a latency quantile, as the upper bound of the bucket it falls into.
+
+        :param q: The quantile, between 0 and 1.
+        :return: The latency in seconds, infinity if it is in the last bucket, 0 if nothing was recorded.
+        """
+
+        if self._count == 0:
+            return 0.0
+
+        rank = q * self._count
+        seen = 0
+        for bound, count in zip(self.bounds, self._counts):
+            seen += count
+            if seen >= rank:
+                return bound
+
+        return float("inf")
+
+    def snapshot(self) -> LatencySnapshot:
+        """Return the current state of the histogram."""
+
+        labels = [str(bound) for bound in self.bounds] + ["+Inf"]
+        return LatencySnapshot(buckets=dict(zip(labels, self._counts)), count=self._count, total=self._total)
+
+
+class TokenBucket:
+    """Rate limiter allowing rate requests per second on average and bursts of up to capacity requests."""
+
+    rate: float
+    capacity: float
+
+    _tokens: float
+    _updated_at: float
+    _lock: asyncio.Lock
+
+    def __init__(self, rate: float, capacity: Union[float, None] = None) -> None:
+        """
+        Initialize TokenBucket.
+
+        :param rate: Tokens added per second.
+        :param capacity: Maximum number of tokens. Defaults to rate, at least 1.
+        """
+
+        if rate <= 0:
+            raise ValueError(f"rate must be positive: {rate}")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FingerprintClient:
+    """
+    Async client of the fingerprint API.
+
+    Use it as an async context manager, the connections are closed on exit:
+
+        async with FingerprintClient(concurrency=10, rate=5) as client:
+            fingerprint_raw = await client.get_fingerprint(BasFingerprintRequest(key=key))
+    """
+
+    base_url: Union[str, None]
+    concurrency: int
+    retries: int
+    backoff: float
+    max_backoff: float
+    timeout: float
+    latency: LatencyHistogram
+
+    _client: Union[httpx.AsyncClient, None]
+    _semaphore: asyncio.Semaphore
+    _rate_limiter: Union[TokenBucket, None]
+
+    def __init__(
+        self,
+        base_url: Union[str, None] = None,
+        concurrency: int = 10,
+        rate: Union[float, None] = None,
+        burst: Union[float, None] = None,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        timeout: float = FINGERPRINT_TIMEOUT,
+    ) -> None:
+        """
+        Initialize FingerprintClient.
+
+        :param base_url: The fingerprint API URL. Defaults to FINGERPRINT_BASE_URL.
+        :param concurrency: The maximum number of requests in flight, and of kept-alive connections.
+        :param rate: The maximum number of requests per second, None for no limit.
+        :param burst: The number of requests that may be sent at once within the rate limit. Defaults to rate.
+        :param retries: The number of retries of a request that failed with a transient error.
+        :param backoff: The base delay of the retries in seconds, doubled with every retry.
+        :param max_backoff: The maximum delay of a retry in seconds.
+        :param timeout: The timeout of a request in seconds.
+        """
+
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1: {concurrency}")
+
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.latency = LatencyHistogram()
+
+        self._client = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._rate_limiter = TokenBucket(rate=rate, capacity=burst) if rate is not None else None
+
+    def __repr__(self) -> str:
+        """Return a string representation of the FingerprintClient."""
+        return f"<FingerprintClient concurrency={self.concurrency} retries={self.retries}>"
+
+    async def __aenter__(self) -> "FingerprintClient":
+        """Open the connection pool."""
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Union[Type[BaseException], None],
+        exc_val: Union[BaseException, None],
+        exc_tb: Union[TracebackType, None],
+    ) -> None:
+        """Close the connection pool."""
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Return the delay before a retry, with full jitter so that clients retrying together spread out."""
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    async def get_fingerprint(self, request_data: BasFingerprintRequest) -> str:
+        """
+        Get a fingerprint.
+
+        :param request_data: The fingerprint request.
+        :return: The fingerprint raw string.
+
+        :raises FingerprintRequestException: If the request fails, after the retries for transient errors.
+        :raises RuntimeError: If the client is not open.
+        """
+
+        if self._client is None:
+            raise RuntimeError("FingerprintClient is not open, use it as an async context manager.")
+
+        url = _fingerprint_url(request_data, base_url=self.base_url)
+
+        for attempt in range(self.retries + 1):
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+
+            async with self._semaphore:
+                started = time.monotonic()
+                try:
+                    response = await self._client.get(url)
+                except httpx.TransportError as exc:
+                    error: Union[Exception, str] = exc
+                else:
+                    self.latency.observe(time.monotonic() - started)
+                    if response.status_code not in _transient_status_codes:
+                        return _parse_fingerprint_response(response)
+                    error = f"HTTP {response.status_code}"
+
+            if attempt < self.retries:
+                delay = self._retry_delay(attempt=attempt)
+                logger.debug("Fingerprint request failed (%s), retrying in %.2fs", error, delay)
+                await asyncio.sleep(delay)
+
+        raise FingerprintRequestException(f"Failed to get fingerprint after {self.retries + 1} attempts: {error}")
@@ -2,6 +2,7 @@
 Functions for getting fingerprints from the fingerprint API.
 """
 
+from typing import Union
 from urllib.parse import urlencode
 
 import httpx
@@ -10,24 +11,28 @@ from pybas_automation.fingerprint.models import BasFingerprintRequest
 
 FINGERPRINT_BASE_URL = "https://fingerprints.bablosoft.com/prepare?version=5"
 
+# Timeout of a fingerprint request in seconds.
+FINGERPRINT_TIMEOUT = 10
+
 
 class FingerprintRequestException(Exception):
     """Raised when a fingerprint request fails."""
 
 
-def get_fingerprint(
-    request_data: BasFingerprintRequest,
-) -> str:
-    """Get a fingerprint for the given fingerprint key."""
+def _fingerprint_url(request_data: BasFingerprintRequest, base_url: Union[str, None] = None) -> str:
+    """Build the fingerprint API URL of a request, base_url defaults to FINGERPRINT_BASE_URL."""
 
     json_data = dict(request_data.model_dump())
 
     json_data["tags"] = ",".join(request_data.tags)
     json_data["returnpc"] = "true"
 
-    url = f"{FINGERPRINT_BASE_URL}&{urlencode(json_data)}"
+    return f"{base_url or FINGERPRINT_BASE_URL}&{urlencode(json_data)}"
+
+
+def _parse_fingerprint_response(response: httpx.Response) -> str:
+    """Check a fingerprint API response and return the fingerprint."""
 
-    response = httpx.get(url, timeout=10)
     if response.status_code != 200:
         raise FingerprintRequestException(f"Failed to get fingerprint: {response.text}")
 
@@ -36,3 +41,12 @@ def get_fingerprint(
         raise FingerprintRequestException(f"Failed to get fingerprint: {response_json_data}")
 
     return response.text.strip()
+
+
+def get_fingerprint(
+    request_data: BasFingerprintRequest,
+) -> str:
+    """Get a fingerprint for the given fingerprint key."""
+
+    response = httpx.get(_fingerprint_url(request_data), timeout=FINGERPRINT_TIMEOUT)
+    return _parse_fingerprint_response(response)
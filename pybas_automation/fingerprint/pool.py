@@ -0,0 +1,375 @@
+"""
+Fingerprint prefetch pool.
+
+Fetching a fingerprint takes a request to the fingerprint API, which is the slowest step of creating a profile. The
+pool keeps fingerprints fetched in advance on disk, one directory per set of request parameters, and a background
+thread refills it to a target depth. Taking a fingerprint from the pool is a file rename and read.
+
+The pool directory can be shared by several processes, a fingerprint is handed out only once.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Union
+
+from pydantic import BaseModel, DirectoryPath, Field
+
+from pybas_automation import default_model_config
+from pybas_automation.fingerprint.client import FingerprintClient
+from pybas_automation.fingerprint.fingerprint import get_fingerprint
+from pybas_automation.fingerprint.models import BasFingerprintRequest
+from pybas_automation.fingerprint.settings import _pool_dir, _pool_refill_interval, _pool_target_depth
+from pybas_automation.utils import atomic_open, create_storage_dir_in_app_data, get_logger
+
+logger = get_logger()
+
+_params_filename = "params.json"
+_fingerprint_prefix = "fp-"
+_fingerprint_suffix = ".json"
+
+
+class FingerprintPoolMetrics(BaseModel):
+    """Metrics of a FingerprintPool since it was created."""
+
+    model_config = default_model_config
+
+    # Fingerprints taken from the pool, and requests the pool had no fingerprint for.
+    hits: int = Field(default=0, ge=0)
+    misses: int = Field(default=0, ge=0)
+
+    # Fingerprints fetched into the pool, and failed fetches.
+    refilled: int = Field(default=0, ge=0)
+    refill_errors: int = Field(default=0, ge=0)
+
+    # Seconds since the pool was created.
+    uptime: float = Field(default=0.0, ge=0)
+
+    # Pool key -> number of fingerprints in the pool.
+    depth: Dict[str, int] = Field(default_factory=dict)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the requests served from the pool."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def refill_rate(self) -> float:
+        """Fingerprints fetched into the pool per second."""
+        return self.refilled / self.uptime if self.uptime else 0.0
+
+
+def pool_key(request_data: BasFingerprintRequest) -> str:
+    """
+    Get the pool key of a fingerprint request, requests with the same parameters share fingerprints.
+
+    The fingerprint key is not part of the pool key, it is not stored.
+
+    :param request_data: The fingerprint request.
+    :return: The pool key.
+    """
+
+    params = request_data.model_dump_json(exclude={"key"})
+    return hashlib.sha256(params.encode("utf-8")).hexdigest()[:16]
+
+
+class FingerprintPool:
+    """On-disk pool of prefetched fingerprints, refilled in the background."""
+
+    pool_dir: DirectoryPath
+    target_depth: int
+    refill_concurrency: int
+    refill_interval: float
+
+    _metrics_lock: threading.Lock
+    _hits: int
+    _misses: int
+    _refilled: int
+    _refill_errors: int
+    _created_at: float
+
+    # Requests the background refiller keeps filled, by pool key.
+    _refill_requests: Dict[str, BasFingerprintRequest]
+    _refill_thread: Union[threading.Thread, None]
+    _stop_event: threading.Event
+    _wakeup_event: threading.Event
+
+    def __init__(
+        self,
+        pool_dir: Union[DirectoryPath, None] = None,
+        target_depth: int = _pool_target_depth,
+        refill_concurrency: int = 4,
+        refill_interval: float = _pool_refill_interval,
+    ) -> None:
+        """
+        Initialize FingerprintPool. If the pool_dir is not provided, the default directory will be used.
+
+        :param pool_dir: The directory to keep the fingerprints in.
+        :param target_depth: The number of fingerprints to keep per request.
+        :param refill_concurrency: The maximum number of fingerprints fetched at once.
+        :param refill_interval: Seconds between the checks of the background refiller.
+
+        :raises ValueError: If the pool_dir is not a directory.
+        """
+
+        if pool_dir is None:
+            self.pool_dir = create_storage_dir_in_app_data(storage_dir=_pool_dir)
+        else:
+            if not os.path.isdir(pool_dir):
+                raise ValueError(f"pool_dir is not a directory: {pool_dir}")
+            self.pool_dir = DirectoryPath(pool_dir)
+
+        self.target_depth = target_depth
+        self.refill_concurrency = refill_concurrency
+        self.refill_interval = refill_interval
+
+        self._metrics_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._refilled = 0
+        self._refill_errors = 0
+        self._created_at = time.monotonic()
+
+        self._refill_requests = {}
+        self._refill_thread = None
+        self._stop_event = threading.Event()
+        self._wakeup_event = threading.Event()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the FingerprintPool."""
+        return f"<FingerprintPool pool_dir={self.pool_dir} target_depth={self.target_depth}>"
+
+    def _key_dir(self, request_data: BasFingerprintRequest) -> DirectoryPath:
+        """Return the directory of the fingerprints of a request, it is created with a description of the request."""
+
+        key_dir = self.pool_dir.joinpath(pool_key(request_data))
+        if not key_dir.exists():
+            key_dir.mkdir(exist_ok=True)
+            with atomic_open(key_dir.joinpath(_params_filename), mode="wb") as f:
+                f.write(request_data.model_dump_json(exclude={"key"}).encode("utf-8"))
+
+        return key_dir
+
+    @staticmethod
+    def _fingerprint_names(key_dir: DirectoryPath) -> List[str]:
+        """List the fingerprint files of a pool directory, oldest first."""
+
+        try:
+            with os.scandir(key_dir) as it:
+                names = [
+                    entry.name
+                    for entry in it
+                    if entry.name.startswith(_fingerprint_prefix) and entry.name.endswith(_fingerprint_suffix)
+                ]
+        except FileNotFoundError:
+            return []
+
+        return sorted(names)
+
+    def put(self, request_data: BasFingerprintRequest, fingerprint_raw: str) -> None:
+        """
+        Add a fingerprint to the pool.
+
+        :param request_data: The request the fingerprint was fetched with.
+        :param fingerprint_raw: The fingerprint raw string.
+        """
+
+        key_dir = self._key_dir(request_data)
+        filename = f"{_fingerprint_prefix}{time.time_ns():020d}-{uuid.uuid4().hex[:8]}{_fingerprint_suffix}"
+
+        with atomic_open(key_dir.joinpath(filename), mode="w") as f:
+            f.write(fingerprint_raw)
+
+    def pop(self, request_data: BasFingerprintRequest) -> Union[str, None]:
+        """
+        Take a fingerprint out of the pool, the oldest first.
+
+        :param request_data: The fingerprint request.
+        :return: The fingerprint raw string, or None if the pool has no fingerprint for the request.
+        """
+
+        key_dir = self.pool_dir.joinpath(pool_key(request_data))
+
+        for name in self._fingerprint_names(key_dir):
+            claimed = key_dir.joinpath(f"claimed-{uuid.uuid4().hex}.tmp")
+            try:
+                # Renaming is atomic, so the fingerprint is handed out once even with several processes.
+                os.rename(key_dir.joinpath(name), claimed)
+            except FileNotFoundError:
+                continue
+
+            try:
+                fingerprint_raw = claimed.read_text(encoding="utf-8")
+            finally:
+                claimed.unlink()
+
+            with self._metrics_lock:
+                self._hits += 1
+            self._wakeup_event.set()
+
+            return fingerprint_raw
+
+        with self._metrics_lock:
+            self._misses += 1
+        self._wakeup_event.set()
+
+        return None
+
+    def get(self, request_data: BasFingerprintRequest) -> str:
+        """
+        Take a fingerprint out of the pool, or fetch one if the pool is empty.
+
+        :param request_data: The fingerprint request.
+        :return: The fingerprint raw string.
+
+        :raises FingerprintRequestException: If the pool is empty and the request fails.
+        """
+
+        fingerprint_raw = self.pop(request_data)
+        if fingerprint_raw is None:
+            fingerprint_raw = get_fingerprint(request_data)
+
+        return fingerprint_raw
+
+    def depth(self, request_data: BasFingerprintRequest) -> int:
+        """
+        Count the fingerprints in the pool for a request.
+
+        :param request_data: The fingerprint request.
+        :return: The number of fingerprints.
+        """
+
+        return len(self._fingerprint_names(self.pool_dir.joinpath(pool_key(request_data))))
+
+    async def refill_async(
+        self, request_data: BasFingerprintRequest, client: Union[FingerprintClient, None] = None
+    ) -> int:
+        """
+        Fetch fingerprints until the pool holds target_depth fingerprints for a request.
+
+        Failed fetches are counted in the metrics and not retried until the next refill.
+
+        :param request_data: The fingerprint request.
+        :param client: The open client to fetch with. Defaults to a new client.
+        :return: The number of fetched fingerprints.
+        """
+
+        missing = self.target_depth - self.depth(request_data)
+        if missing <= 0:
+            return 0
+
+        if client is None:
+            async with FingerprintClient(concurrency=self.refill_concurrency) as client:
+                return await self.refill_async(request_data=request_data, client=client)
+
+        semaphore = asyncio.Semaphore(self.refill_concurrency)
+
+        async def _fetch() -> bool:
+            async with semaphore:
+                try:
+                    fingerprint_raw = await client.get_fingerprint(request_data)
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.warning("Failed to refill the fingerprint pool: %r", exc)
+                    with self._metrics_lock:
+                        self._refill_errors += 1
+                    return False
+
+                await asyncio.to_thread(self.put, request_data, fingerprint_raw)
+                with self._metrics_lock:
+                    self._refilled += 1
+                return True
+
+        results = await asyncio.gather(*(_fetch() for _ in range(missing)))
+        return sum(results)
+
+    def refill(self, request_data: BasFingerprintRequest) -> int:
+        """
+        Fetch fingerprints until the pool holds target_depth fingerprints for a request, see refill_async().
+
+        :param request_data: The fingerprint request.
+        :return: The number of fetched fingerprints.
+        """
+
+        return asyncio.run(self.refill_async(request_data=request_data))
+
+    async def _refill_all(self) -> None:
+        """Refill the pool for all requests of the background refiller, over one client."""
+
+        async with FingerprintClient(concurrency=self.refill_concurrency) as client:
+            for request_data in list(self._refill_requests.values()):
+                if self._stop_event.is_set():
+                    break
+                await self.refill_async(request_data=request_data, client=client)
+
+    def _refill_loop(self) -> None:
+        """Keep the pool filled until stop() is called. Runs in the background thread."""
+
+        while not self._stop_event.is_set():
+            self._wakeup_event.clear()
+
+            try:
+                asyncio.run(self._refill_all())
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Fingerprint pool refill failed: %r", exc)
+
+            # A pop() wakes the refiller up early.
+            self._wakeup_event.wait(timeout=self.refill_interval)
+
+    def start(self, requests: List[BasFingerprintRequest]) -> None:
+        """
+        Start refilling the pool in a background thread.
+
+        :param requests: The fingerprint requests to keep fingerprints for.
+
+        :raises RuntimeError: If the refiller is already running.
+        """
+
+        if self._refill_thread is not None:
+            raise RuntimeError("The fingerprint pool refiller is already running.")
+
+        self._refill_requests = {pool_key(request_data): request_data for request_data in requests}
+        self._stop_event.clear()
+        self._refill_thread = threading.Thread(target=self._refill_loop, name="fingerprint-pool-refill", daemon=True)
+        self._refill_thread.start()
+
+    def stop(self, timeout: Union[float, None] = None) -> None:
+        """
+        Stop the background refiller, fetches in progress are completed first.
+
+        :param timeout: Seconds to wait for the refiller to stop.
+        """
+
+        if self._refill_thread is None:
+            return
+
+        self._stop_event.set()
+        self._wakeup_event.set()
+        self._refill_thread.join(timeout=timeout)
+        self._refill_thread = None
+
+    def metrics(self) -> FingerprintPoolMetrics:
+        """
+        Get the metrics of the pool.
+
+        :return: FingerprintPoolMetrics instance, with the depth of every request in the pool directory.
+        """
+
+        depth = {}
+        with os.scandir(self.pool_dir) as it:
+            for entry in it:
+                if entry.is_dir():
+                    depth[entry.name] = len(self._fingerprint_names(DirectoryPath(entry.path)))
+
+        with self._metrics_lock:
+            return FingerprintPoolMetrics(
+                hits=self._hits,
+                misses=self._misses,
+                refilled=self._refilled,
+                refill_errors=self._refill_errors,
+                uptime=time.monotonic() - self._created_at,
+                depth=depth,
+            )
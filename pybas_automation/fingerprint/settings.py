@@ -0,0 +1,13 @@
+"""
+Settings for the fingerprint module.
+"""
+
+from pydantic import DirectoryPath
+
+# Default directory of FingerprintPool.
+_pool_dir = DirectoryPath("PyBASFingerprintPool")
+
+# Number of fingerprints FingerprintPool keeps per request by default.
+_pool_target_depth = 10
+# Seconds between the checks of the background refiller.
+_pool_refill_interval = 5.0
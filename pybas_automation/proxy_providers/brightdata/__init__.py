@@ -3,5 +3,6 @@ This package contains the BrightData proxy provider.
 """
 
 from .models import BrightdataCredentialsModel, BrightDataProxyModel
+from .session_pool import BrightDataSessionPool, BrightDataSessionPoolError
 
-__all__ = ["BrightdataCredentialsModel", "BrightDataProxyModel"]
+__all__ = ["BrightdataCredentialsModel", "BrightDataProxyModel", "BrightDataSessionPool", "BrightDataSessionPoolError"]
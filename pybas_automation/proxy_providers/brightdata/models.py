@@ -2,6 +2,8 @@
 BrightData proxy provider models
 """
 
+from typing import Union
+
 from pydantic import BaseModel, Field
 
 from pybas_automation import default_model_config
@@ -27,16 +29,17 @@ class BrightDataProxyModel(BaseModel):
     port: int = Field(default=22225)
     credentials: BrightdataCredentialsModel
 
-    def to_bas_proxy(self, keep_session: bool = True) -> BasActionBrowserProxy:
+    def to_bas_proxy(self, keep_session: bool = True, session_id: Union[str, None] = None) -> BasActionBrowserProxy:
         """
         Convert to BasActionBrowserProxy model.
 
         :param keep_session: If True, the proxy will be used with the same session to avoid ip changes.
+        :param session_id: The session to use with keep_session. Defaults to a new random session.
         """
 
         login = self.credentials.username
         if keep_session:
-            login = f"{login}-session-{random_string(10)}"
+            login = f"{login}-session-{session_id if session_id is not None else random_string(10)}"
 
         return BasActionBrowserProxy(
             server=self.hostname,
@@ -0,0 +1,340 @@
+"""
+BrightData session pool.
+
+The first request through a new BrightData session pays for setting up the session at the super proxy. The pool
+creates sessions in advance and warms them up with one cheap request each, sent concurrently, and hands out only
+sessions whose warm-up request succeeded. A background thread keeps the pool filled, and sessions older than max_age
+are replaced, so that handed out sessions are fresh.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Union
+
+from pydantic import BaseModel, Field
+
+from pybas_automation import default_model_config
+from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy
+from pybas_automation.browser_profile.proxy import ProxyHealthChecker
+from pybas_automation.proxy_providers.brightdata.models import BrightDataProxyModel
+from pybas_automation.proxy_providers.brightdata.settings import (
+    _session_max_age,
+    _session_max_failed_warms,
+    _session_pool_size,
+    _session_refill_interval,
+)
+from pybas_automation.utils import get_logger, random_string
+
+logger = get_logger()
+
+
+class BrightDataSessionPoolError(Exception):
+    """Raised when no session of the pool could be warmed up."""
+
+
+class BrightDataSession(BaseModel):
+    """A warm BrightData session."""
+
+    model_config = default_model_config
+
+    proxy: BasActionBrowserProxy
+
+    # External IP of the session and latency of the warm-up request.
+    ip: Union[str, None] = Field(default=None)
+    latency: Union[float, None] = Field(default=None, ge=0)
+
+    warmed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def age(self) -> float:
+        """Seconds since the session was warmed up."""
+        return (datetime.now(timezone.utc) - self.warmed_at).total_seconds()
+
+
+class BrightDataSessionPoolMetrics(BaseModel):
+    """Metrics of a BrightDataSessionPool since it was created."""
+
+    model_config = default_model_config
+
+    # Sessions warmed up, and sessions whose warm-up request failed.
+    warmed: int = Field(default=0, ge=0)
+    failed: int = Field(default=0, ge=0)
+    # Sessions handed out, and sessions replaced because of their age.
+    handed_out: int = Field(default=0, ge=0)
+    expired: int = Field(default=0, ge=0)
+
+    # Warm sessions in the pool now.
+    size: int = Field(default=0, ge=0)
+
+
+class BrightDataSessionPool:
+    """
+    Pool of warm BrightData sessions.
+
+        session_pool = BrightDataSessionPool(proxy=BrightDataProxyModel(credentials=credentials), size=20)
+        session_pool.start()
+        bas_proxy = session_pool.get(timeout=30)
+    """
+
+    proxy: BrightDataProxyModel
+    size: int
+    max_age: float
+    refill_interval: float
+    max_failed_warms: int
+    checker: ProxyHealthChecker
+
+    # Warm sessions, the most recently warmed last.
+    _sessions: Deque[BrightDataSession]
+    # Sessions being warmed up, they count towards the size of the pool.
+    _warming: int
+    _condition: threading.Condition
+    _metrics: BrightDataSessionPoolMetrics
+
+    _refill_thread: Union[threading.Thread, None]
+    _stop_event: threading.Event
+    _wakeup_event: threading.Event
+
+    def __init__(
+        self,
+        proxy: BrightDataProxyModel,
+        size: int = _session_pool_size,
+        max_age: float = _session_max_age,
+        concurrency: int = 10,
+        refill_interval: float = _session_refill_interval,
+        checker: Union[ProxyHealthChecker, None] = None,
+        max_failed_warms: int = _session_max_failed_warms,
+    ) -> None:
+        """
+        Initialize BrightDataSessionPool.
+
+        :param proxy: The BrightData proxy to create sessions of.
+        :param size: The number of warm sessions to keep.
+        :param max_age: Seconds a session is handed out for after it was warmed up.
+        :param concurrency: The maximum number of sessions warmed up at once.
+        :param refill_interval: Seconds between the checks of the background warmer.
+        :param checker: Warms up the sessions. Defaults to a ProxyHealthChecker with the given concurrency.
+        :param max_failed_warms: Warm-ups in a row that warm up no session, after which get() gives up.
+        """
+
+        if size < 1:
+            raise ValueError(f"size must be at least 1: {size}")
+
+        self.proxy = proxy
+        self.size = size
+        self.max_age = max_age
+        self.refill_interval = refill_interval
+        self.max_failed_warms = max_failed_warms
+        self.checker = checker if checker is not None else ProxyHealthChecker(concurrency=concurrency)
+
+        self._sessions = deque()
+        self._warming = 0
+        self._condition = threading.Condition()
+        self._metrics = BrightDataSessionPoolMetrics()
+
+        self._refill_thread = None
+        self._stop_event = threading.Event()
+        self._wakeup_event = threading.Event()
+
+    def __repr__(self) -> str:
+        """Return a string representation of the BrightDataSessionPool."""
+        return f"<BrightDataSessionPool size={self.size} warm={len(self)}>"
+
+    def __len__(self) -> int:
+        """Return the number of warm sessions in the pool."""
+
+        with self._condition:
+            self._expire()
+            return len(self._sessions)
+
+    def _expire(self) -> None:
+        """Drop the sessions older than max_age. The caller must hold the condition."""
+
+        fresh = [session for session in self._sessions if session.age < self.max_age]
+        if len(fresh) < len(self._sessions):
+            self._metrics.expired += len(self._sessions) - len(fresh)
+            self._sessions = deque(fresh)
+
+    async def warm_async(self, timeout: Union[float, None] = None) -> int:
+        """
+        Warm up new sessions until the pool holds size warm sessions. Sessions being warmed up by a concurrent call
+        count towards the size.
+
+        :param timeout: Seconds to wait for the warm-up requests, None to wait for them to complete.
+        :return: The number of sessions warmed up.
+        """
+
+        with self._condition:
+            self._expire()
+            needed = self.size - len(self._sessions) - self._warming
+            if needed <= 0:
+                return 0
+            self._warming += needed
+
+        try:
+            candidates = [
+                self.proxy.to_bas_proxy(keep_session=True, session_id=random_string(10)) for _ in range(needed)
+            ]
+            results = await self.checker.check_many_async(candidates, force=True, timeout=timeout)
+        except BaseException:
+            with self._condition:
+                self._warming -= needed
+                self._condition.notify_all()
+            raise
+
+        warmed = 0
+        with self._condition:
+            self._warming -= needed
+            for result in results:
+                if not result.ok:
+                    logger.debug("BrightData session failed to warm up: %s", result.error)
+                    self._metrics.failed += 1
+                    continue
+
+                session = BrightDataSession(
+                    proxy=result.proxy, ip=result.ip, latency=result.latency, warmed_at=result.checked_at
+                )
+                self._sessions.append(session)
+                self._metrics.warmed += 1
+                warmed += 1
+
+            self._condition.notify_all()
+
+        return warmed
+
+    def warm(self, timeout: Union[float, None] = None) -> int:
+        """
+        Warm up new sessions until the pool holds size warm sessions, see warm_async(). Do not call it from a running
+        event loop.
+
+        :param timeout: Seconds to wait for the warm-up requests, None to wait for them to complete.
+        :return: The number of sessions warmed up.
+        """
+
+        return asyncio.run(self.warm_async(timeout=timeout))
+
+    def pop(self) -> Union[BasActionBrowserProxy, None]:
+        """
+        Take a warm session out of the pool, the most recently warmed first.
+
+        :return: The proxy of the session, or None if the pool has no warm session.
+        """
+
+        with self._condition:
+            self._expire()
+            if not self._sessions:
+                return None
+
+            session = self._sessions.pop()
+            self._metrics.handed_out += 1
+
+        self._wakeup_event.set()
+
+        return session.proxy
+
+    def get(self, timeout: Union[float, None] = None) -> BasActionBrowserProxy:
+        """
+        Take a warm session out of the pool, waiting for one if the pool is empty. Without the background warmer, the
+        sessions are warmed up here.
+
+        :param timeout: Seconds to wait for a warm session, None to wait forever.
+        :return: The proxy of the session.
+
+        :raises TimeoutError: If no session was warmed up within the timeout.
+        :raises BrightDataSessionPoolError: If max_failed_warms warm-ups in a row warmed up no session, without the
+            background warmer.
+        """
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        failed_warms = 0
+
+        while True:
+            proxy = self.pop()
+            if proxy is not None:
+                return proxy
+
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("No warm BrightData session within the timeout.")
+
+            if self._refill_thread is None:
+                if self.warm(timeout=remaining) > 0:
+                    failed_warms = 0
+                    continue
+
+                with self._condition:
+                    if self._sessions:
+                        continue
+                    if self._warming:
+                        # Another caller is warming up the sessions.
+                        self._condition.wait(timeout=remaining)
+                        continue
+
+                failed_warms += 1
+                if failed_warms >= self.max_failed_warms:
+                    raise BrightDataSessionPoolError(f"No BrightData session warmed up in {failed_warms} warm-ups.")
+                continue
+
+            self._wakeup_event.set()
+            with self._condition:
+                if not self._sessions:
+                    self._condition.wait(timeout=remaining)
+
+    def _refill_loop(self) -> None:
+        """Keep the pool filled until stop() is called. Runs in the background thread."""
+
+        while not self._stop_event.is_set():
+            self._wakeup_event.clear()
+
+            try:
+                asyncio.run(self.warm_async())
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("BrightData session pool refill failed: %r", exc)
+
+            # A pop() wakes the warmer up early.
+            self._wakeup_event.wait(timeout=self.refill_interval)
+
+    def start(self) -> None:
+        """
+        Start warming up sessions in a background thread.
+
+        :raises RuntimeError: If the warmer is already running.
+        """
+
+        if self._refill_thread is not None:
+            raise RuntimeError("The BrightData session pool warmer is already running.")
+
+        self._stop_event.clear()
+        self._refill_thread = threading.Thread(target=self._refill_loop, name="brightdata-session-pool", daemon=True)
+        self._refill_thread.start()
+
+    def stop(self, timeout: Union[float, None] = None) -> None:
+        """
+        Stop the background warmer, warm-ups in progress are completed first.
+
+        :param timeout: Seconds to wait for the warmer to stop.
+        """
+
+        if self._refill_thread is None:
+            return
+
+        self._stop_event.set()
+        self._wakeup_event.set()
+        self._refill_thread.join(timeout=timeout)
+        self._refill_thread = None
+
+        with self._condition:
+            self._condition.notify_all()
+
+    def metrics(self) -> BrightDataSessionPoolMetrics:
+        """
+        Get the metrics of the pool.
+
+        :return: BrightDataSessionPoolMetrics instance.
+        """
+
+        with self._condition:
+            self._expire()
+            return self._metrics.model_copy(update={"size": len(self._sessions)})
@@ -0,0 +1,12 @@
+"""
+Settings for the BrightData proxy provider.
+"""
+
+# Number of warm sessions BrightDataSessionPool keeps by default.
+_session_pool_size = 10
+# Seconds a warm session is handed out for, older sessions are replaced.
+_session_max_age = 300.0
+# Seconds between the checks of the background warmer.
+_session_refill_interval = 5.0
+# Warm-ups in a row that warm up no session, after which BrightDataSessionPool.get() gives up.
+_session_max_failed_warms = 3
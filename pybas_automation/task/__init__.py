@@ -1,6 +1,16 @@
 """Task module for interacting with BAS actions."""
 
-from .models import BasTask
-from .storage import TaskDuplicateError, TaskStorage, TaskStorageModeEnum
+from .models import BasTask, TaskStatusEnum
+from .sqlite_storage import SqliteTaskStorage
+from .storage import TaskDuplicateError, TaskLeaseError, TaskStorage, TaskStorageBatch, TaskStorageModeEnum
 
-__all__ = ["BasTask", "TaskDuplicateError", "TaskStorage", "TaskStorageModeEnum"]
+__all__ = [
+    "BasTask",
+    "SqliteTaskStorage",
+    "TaskDuplicateError",
+    "TaskLeaseError",
+    "TaskStatusEnum",
+    "TaskStorage",
+    "TaskStorageBatch",
+    "TaskStorageModeEnum",
+]
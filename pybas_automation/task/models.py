@@ -1,5 +1,7 @@
 """Module for the BasTask model."""
 
+from datetime import datetime
+from enum import Enum
 from typing import Union
 from uuid import UUID, uuid4
 
@@ -9,6 +11,15 @@ from pybas_automation import default_model_config
 from pybas_automation.bas_actions.browser.browser_settings.models import BasActionBrowserSettings
 
 
+class TaskStatusEnum(str, Enum):
+    """Status of a task in the task queue."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class BasTask(BaseModel):
     """
     Represents a task for BAS (Browser Automation Studio).
@@ -28,3 +39,14 @@ class BasTask(BaseModel):
 
     # Browser settings associated with the task
     browser_settings: BasActionBrowserSettings = Field(default_factory=BasActionBrowserSettings)
+
+    # Queue state, updated by TaskStorage.claim(), heartbeat(), complete() and fail()
+    status: TaskStatusEnum = Field(default=TaskStatusEnum.PENDING)
+    # Worker holding the lease of a running task
+    worker_id: Union[str, None] = None
+    # The lease of a running task expires at this time unless the worker sends a heartbeat
+    lease_expires_at: Union[datetime, None] = None
+    # Number of times the task has been claimed
+    attempts: int = Field(default=0, ge=0)
+    # Reason of the last failure
+    error: Union[str, None] = None
@@ -0,0 +1,392 @@
+"""
+Task serializer module.
+
+Tasks are validated and encoded directly from and to bytes with cached pydantic TypeAdapters, without building
+intermediate dicts. Plain JSON documents, e.g. when scanning for a single task, are decoded with orjson when it is
+installed (the orjson extra), and the compact entries of a tasks file with a browser settings template are encoded
+with it.
+
+Very large task sets can be streamed with iter_decode_tasks() and write_tasks(), which keep only one task in memory
+at a time.
+
+With a browser settings template the tasks file holds the template as its first element, followed by the tasks with
+only the browser settings that differ from the template. Such a file is several times smaller, but BAS cannot read it,
+write the full form for BAS with write_tasks() without a template. The decoders accept both forms.
+"""
+
+import codecs
+import itertools
+import json
+import textwrap
+from enum import Enum
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+from pydantic import BaseModel, TypeAdapter
+
+from pybas_automation import default_model_config
+from pybas_automation.bas_actions.browser.browser_settings.template import BasActionBrowserSettingsTemplate
+from pybas_automation.task.models import BasTask
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None  # type: ignore
+
+# Indentation of the tasks file, kept for compatibility with files written by earlier versions.
+TASKS_FILE_INDENT = 4
+
+# Size of the chunks the tasks file is read in by iter_decode_tasks().
+_READ_CHUNK_SIZE = 64 * 1024
+
+_json_whitespace = " \t\n\r"
+
+# Key of the browser settings template element, and its id in the offset index.
+TEMPLATE_ENTRY_ID = "browser_settings_template"
+_template_entry_prefix = b'{"' + TEMPLATE_ENTRY_ID.encode("utf-8") + b'":'
+
+
+class TaskJournalOpEnum(str, Enum):
+    """Operation recorded in a journal record."""
+
+    SAVE = "save"
+    UPDATE = "update"
+
+
+class TaskJournalRecord(BaseModel):
+    """One record of the task journal."""
+
+    model_config = default_model_config
+
+    op: TaskJournalOpEnum
+    task: BasTask
+
+
+_task_adapter = TypeAdapter(BasTask)
+_task_list_adapter = TypeAdapter(List[BasTask])
+_journal_record_adapter = TypeAdapter(TaskJournalRecord)
+
+
+def decode_tasks(data: bytes) -> List[BasTask]:
+    """
+    Validate a JSON array of tasks.
+
+    :param data: The JSON document.
+    :return: List of tasks.
+    """
+
+    if _template_entry_prefix not in data[:64]:
+        return _task_list_adapter.validate_json(data)
+
+    items = loads_raw(data)
+    template = decode_template_entry(items[0])
+    return [decode_raw_task(task_data=task_data, template=template) for task_data in items[1:]]
+
+
+def encode_tasks(tasks: List[BasTask]) -> bytes:
+    """
+    Encode tasks as a JSON array in the layout of the tasks file.
+
+    :param tasks: The tasks to encode.
+    :return: The JSON document.
+    """
+
+    return _task_list_adapter.dump_json(tasks, indent=TASKS_FILE_INDENT)
+
+
+def iter_decode_tasks(f: IO[bytes], chunk_size: int = _READ_CHUNK_SIZE) -> Iterator[BasTask]:
+    """
+    Validate a JSON array of tasks one task at a time.
+
+    The file is read in chunks, so memory use does not depend on the number of tasks.
+
+    :param f: Binary file object positioned at the start of the JSON document.
+    :param chunk_size: Number of bytes to read at once.
+    :return: Iterator over the tasks.
+
+    :raises ValueError: If the document is not a JSON array of tasks.
+    """
+
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    json_decoder = json.JSONDecoder()
+
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False  # "[" was read
+    after_task = False  # a task was read, "," or "]" follows
+    after_comma = False  # "," was read, a task follows
+    template: Union[BasActionBrowserSettingsTemplate, None] = None
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _json_whitespace:
+            pos += 1
+
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of the tasks document.")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = text_decoder.decode(chunk, final=eof)
+            pos = 0
+            continue
+
+        char = buffer[pos]
+
+        if not started:
+            if char != "[":
+                raise ValueError("The tasks document is not a JSON array.")
+            started = True
+            pos += 1
+            continue
+
+        if char == "]" and not after_comma:
+            return
+
+        if after_task:
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in the tasks document, got {char!r}.")
+            after_task = False
+            after_comma = True
+            pos += 1
+            continue
+
+        try:
+            data, end = json_decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as exc:
+            if eof:
+                raise ValueError(f"Invalid task in the tasks document: {exc}") from exc
+            # The task is not complete yet, read on.
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + text_decoder.decode(chunk, final=eof)
+            pos = 0
+            continue
+
+        if template is None and not after_comma:
+            template = decode_template_entry(data)
+            if template is not None:
+                buffer = buffer[end:]
+                pos = 0
+                after_task = True
+                continue
+
+        yield decode_raw_task(task_data=data, template=template)
+
+        # Drop the consumed part of the buffer, so it holds at most one task and one chunk.
+        buffer = buffer[end:]
+        pos = 0
+        after_task = True
+        after_comma = False
+
+
+def write_task_entries(f: IO[bytes], entries: Iterable[Tuple[str, bytes]]) -> Dict[str, List[int]]:
+    """
+    Write encoded tasks as the JSON array of the tasks file, one entry at a time.
+
+    :param f: Binary file object to write to.
+    :param entries: Pairs of task id and the task encoded by encode_task_entry().
+    :return: Task id to [offset, length] mapping of the written entries.
+    """
+
+    offsets: Dict[str, List[int]] = {}
+    position = 2  # len(b"[\n")
+
+    for num, (task_id, entry) in enumerate(entries):
+        if num == 0:
+            f.write(b"[\n")
+        else:
+            f.write(b",\n")
+            position += 2
+        f.write(entry)
+        offsets[task_id] = [position, len(entry)]
+        position += len(entry)
+
+    f.write(b"\n]" if offsets else b"[]")
+
+    return offsets
+
+
+def write_tasks(
+    f: IO[bytes], tasks: Iterable[BasTask], template: Union[BasActionBrowserSettingsTemplate, None] = None
+) -> Dict[str, List[int]]:
+    """
+    Encode tasks to the JSON array of the tasks file, one task at a time.
+
+    Without a template the written document is the same as the one returned by encode_tasks(), but the tasks can come
+    from a generator.
+
+    :param f: Binary file object to write to.
+    :param tasks: The tasks to write.
+    :param template: Write only the differences of the browser settings from this template.
+    :return: Task id to [offset, length] mapping of the written tasks, and of the template if any.
+    """
+
+    if template is None:
+        return write_task_entries(f, ((str(task.task_id), encode_task_entry(task)) for task in tasks))
+
+    entries = itertools.chain(
+        [(TEMPLATE_ENTRY_ID, encode_template_entry(template))],
+        ((str(task.task_id), encode_delta_task_entry(task=task, template=template)) for task in tasks),
+    )
+    return write_task_entries(f, entries)
+
+
+def decode_task(data: bytes) -> BasTask:
+    """
+    Validate a single JSON encoded task.
+
+    :param data: The JSON document.
+    :return: The task.
+    """
+
+    return _task_adapter.validate_json(data)
+
+
+def encode_task_entry(task: BasTask) -> bytes:
+    """
+    Encode one task as an element of the tasks file array.
+
+    Joined with commas and newlines inside square brackets, the entries give the same document as encode_tasks(),
+    while the byte range of every task stays known for the offset index.
+
+    :param task: The task to encode.
+    :return: The encoded task.
+    """
+
+    data = _task_adapter.dump_json(task, indent=TASKS_FILE_INDENT)
+    return textwrap.indent(data.decode("utf-8"), " " * TASKS_FILE_INDENT).encode("utf-8")
+
+
+def encode_raw_task_entry(task_data: Any) -> bytes:
+    """
+    Encode one task given as plain JSON data as an element of the tasks file array.
+
+    :param task_data: The task data.
+    :return: The encoded task.
+    """
+
+    return textwrap.indent(json.dumps(task_data, indent=TASKS_FILE_INDENT), " " * TASKS_FILE_INDENT).encode("utf-8")
+
+
+def encode_template_entry(template: BasActionBrowserSettingsTemplate) -> bytes:
+    """
+    Encode a browser settings template as the first element of the tasks file array.
+
+    :param template: The template.
+    :return: The encoded template.
+    """
+
+    return b" " * TASKS_FILE_INDENT + dumps_raw({TEMPLATE_ENTRY_ID: template.to_data()})
+
+
+def decode_template_entry(data: Any) -> Union[BasActionBrowserSettingsTemplate, None]:
+    """
+    Decode the browser settings template element of the tasks file array.
+
+    :param data: The element as plain JSON data.
+    :return: The template, or None if the element is a task.
+    """
+
+    if isinstance(data, dict) and TEMPLATE_ENTRY_ID in data:
+        return BasActionBrowserSettingsTemplate.from_data(data[TEMPLATE_ENTRY_ID])
+
+    return None
+
+
+def encode_delta_task_entry(task: BasTask, template: BasActionBrowserSettingsTemplate) -> bytes:
+    """
+    Encode one task as an element of the tasks file array, with only the browser settings that differ from a template.
+
+    :param task: The task to encode.
+    :param template: The browser settings template.
+    :return: The encoded task.
+    """
+
+    data = task.model_dump(mode="json")
+    data["browser_settings"] = template.delta(data["browser_settings"])
+    return b" " * TASKS_FILE_INDENT + dumps_raw(data)
+
+
+def expand_raw_task(
+    task_data: Dict[str, Any], template: Union[BasActionBrowserSettingsTemplate, None]
+) -> Dict[str, Any]:
+    """
+    Apply the browser settings template to a task given as plain JSON data.
+
+    :param task_data: The task data, as stored in the tasks file.
+    :param template: The browser settings template of the tasks file, if any.
+    :return: The task data in the full form.
+    """
+
+    if template is None:
+        return task_data
+
+    return {**task_data, "browser_settings": template.expand_data(task_data.get("browser_settings", {}))}
+
+
+def decode_raw_task(task_data: Any, template: Union[BasActionBrowserSettingsTemplate, None] = None) -> BasTask:
+    """
+    Validate a task given as plain JSON data.
+
+    With a template, the browser settings sections the task does not change are shared with the template.
+
+    :param task_data: The task data, as stored in the tasks file.
+    :param template: The browser settings template of the tasks file, if any.
+    :return: The task.
+    """
+
+    if template is None:
+        return _task_adapter.validate_python(task_data)
+
+    browser_settings = template.expand(task_data.get("browser_settings", {}))
+    return _task_adapter.validate_python({**task_data, "browser_settings": browser_settings})
+
+
+def decode_journal_record(data: bytes) -> TaskJournalRecord:
+    """
+    Validate one line of the task journal.
+
+    :param data: The journal line.
+    :return: The journal record.
+    """
+
+    return _journal_record_adapter.validate_json(data)
+
+
+def encode_journal_record(record: TaskJournalRecord) -> bytes:
+    """
+    Encode a journal record as a single line, including the trailing newline.
+
+    :param record: The journal record.
+    :return: The encoded line.
+    """
+
+    return _journal_record_adapter.dump_json(record) + b"\n"
+
+
+def loads_raw(data: bytes) -> Any:
+    """
+    Decode a JSON document into plain Python objects without validation.
+
+    :param data: The JSON document.
+    :return: The decoded data.
+    """
+
+    if orjson is not None:
+        return orjson.loads(data)  # pylint: disable=no-member
+
+    return json.loads(data)
+
+
+def dumps_raw(data: Any) -> bytes:
+    """
+    Encode plain Python objects as a compact JSON document.
+
+    :param data: The data to encode.
+    :return: The JSON document.
+    """
+
+    if orjson is not None:
+        return orjson.dumps(data)  # pylint: disable=no-member
+
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
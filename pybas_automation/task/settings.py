@@ -9,3 +9,16 @@ _storage_dir = DirectoryPath("PyBASProfilesTasks")
 
 _task_filename = FilePath("tasks.json")
 _filelock_filename = FilePath("tasks.lock")
+# The journal lives next to the tasks file, e.g. "tasks.json" -> "tasks.journal".
+_journal_suffix = ".journal"
+# The offset index lives next to the tasks file, e.g. "tasks.json" -> "tasks.index".
+_index_suffix = ".index"
+
+# Number of journal records after which the journal is folded into the tasks file.
+_journal_compact_threshold = 1000
+
+_sqlite_filename = FilePath("tasks.sqlite3")
+# Seconds a connection waits for a concurrent writer before failing with "database is locked".
+_sqlite_busy_timeout = 30
+# Rows read from the database at a time when iterating over the tasks.
+_sqlite_fetch_size = 500
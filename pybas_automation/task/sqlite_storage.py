@@ -0,0 +1,308 @@
+"""
+SQLite task storage module.
+
+This module stores tasks in an SQLite database in WAL mode, so that many workers can read and update their own task
+concurrently, and exports the tasks file BAS reads on demand.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Iterator, List, Sequence, Union
+from uuid import UUID
+
+from pydantic import DirectoryPath, FilePath
+
+from pybas_automation.task.models import BasTask
+from pybas_automation.task.serializer import decode_task, write_tasks
+from pybas_automation.task.settings import (
+    _filelock_filename,
+    _sqlite_busy_timeout,
+    _sqlite_fetch_size,
+    _sqlite_filename,
+    _storage_dir,
+    _task_filename,
+)
+from pybas_automation.task.storage import TaskDuplicateError, TaskStorageModeEnum
+from pybas_automation.utils import ReadWriteFileLock, atomic_open, create_storage_dir_in_app_data, get_logger
+
+logger = get_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY NOT NULL,
+    data TEXT NOT NULL
+)
+"""
+
+
+class SqliteTaskStorage:
+    """
+    SqliteTaskStorage is responsible for storing tasks in an SQLite database.
+
+    It has the same API as TaskStorage, but every call goes to the database: lookups use the primary key on task_id
+    and updates rewrite a single row. Call save_all() to export the tasks file BAS reads.
+
+    An instance may be shared between threads, its calls take turns on the connection. Workers updating tasks at the
+    same time are faster with an instance each, SQLite serializes only their writes.
+    """
+
+    storage_dir: DirectoryPath
+    mode: TaskStorageModeEnum = TaskStorageModeEnum.READ
+    task_file_path: FilePath
+    db_file_path: FilePath
+
+    # None in read mode until the database exists.
+    _conn: Union[sqlite3.Connection, None]
+    # Serializes the use of the connection by the threads sharing the instance.
+    _conn_lock: threading.Lock
+    _lock: ReadWriteFileLock
+
+    def __init__(
+        self,
+        storage_dir: Union[None, DirectoryPath] = None,
+        task_filename: Union[None, FilePath] = None,
+        mode: Union[TaskStorageModeEnum, None] = None,
+        db_filename: Union[None, FilePath] = None,
+    ) -> None:
+        """
+        Initialize SqliteTaskStorage. If the storage_dir is not provided, the default storage directory will be used.
+
+        :returns: None
+
+        :param storage_dir: The directory to store the database and the tasks file.
+        :param task_filename: The filename of the exported tasks file.
+        :param mode: The mode to open the storage in. Defaults to read-only.
+        :param db_filename: The filename of the SQLite database.
+
+        :raises ValueError: If the storage_dir is not a directory. If the mode is not a valid value.
+        """
+
+        if storage_dir is None:
+            self.storage_dir = create_storage_dir_in_app_data(storage_dir=_storage_dir)
+        else:
+            if not os.path.isdir(storage_dir):
+                raise ValueError(f"storage_dir is not a directory: {storage_dir}")
+            self.storage_dir = DirectoryPath(storage_dir)
+
+        for filename in [task_filename, db_filename]:
+            if filename is not None and FilePath(filename).parent.__str__() != ".":
+                raise ValueError(f"filename is not a relative path: {filename}")
+
+        self.task_file_path = FilePath(os.path.join(self.storage_dir, task_filename or _task_filename))
+        self.db_file_path = FilePath(os.path.join(self.storage_dir, db_filename or _sqlite_filename))
+
+        # Set the mode of the task storage
+        match mode:
+            case None:
+                self.mode = TaskStorageModeEnum.READ
+            case TaskStorageModeEnum.READ:
+                self.mode = TaskStorageModeEnum.READ
+            case TaskStorageModeEnum.READ_WRITE:
+                self.mode = TaskStorageModeEnum.READ_WRITE
+            case _:
+                raise ValueError(f"mode is not a valid value: {mode}")
+
+        self._lock = ReadWriteFileLock(os.path.join(self.storage_dir, _filelock_filename))
+
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        if self.mode == TaskStorageModeEnum.READ_WRITE:
+            # Autocommit mode, transactions are opened explicitly where they are needed.
+            self._conn = sqlite3.connect(
+                self.db_file_path, timeout=_sqlite_busy_timeout, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the SqliteTaskStorage."""
+        return (
+            f"<SqliteTaskStorage storage_dir={self.storage_dir} db_file_path={self.db_file_path} "
+            f"task_file_path={self.task_file_path} mode={self.mode}>"
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+
+    def _connect(self) -> Union[sqlite3.Connection, None]:
+        """
+        Return the connection. In read mode the database is opened read-only on first use, nothing is written to it.
+        The caller must hold _conn_lock.
+
+        :return: The connection, None in read mode while the database does not exist.
+        """
+
+        if self._conn is None and os.path.exists(self.db_file_path):
+            uri = f"{Path(self.db_file_path).resolve().as_uri()}?mode=ro"
+            self._conn = sqlite3.connect(
+                uri, uri=True, timeout=_sqlite_busy_timeout, isolation_level=None, check_same_thread=False
+            )
+
+        return self._conn
+
+    def _query(self, sql: str, parameters: Sequence[Any] = ()) -> List[Any]:
+        """Run a query and return its rows, no rows in read mode while the database does not exist."""
+
+        with self._conn_lock:
+            conn = self._connect()
+            if conn is None:
+                return []
+            return conn.execute(sql, parameters).fetchall()
+
+    def _execute(self, sql: str, parameters: Sequence[Any] = ()) -> int:
+        """Run a statement in read-write mode and return the number of changed rows."""
+
+        with self._conn_lock:
+            if self._conn is None:
+                raise ValueError("Cannot store tasks in read mode.")
+            return self._conn.execute(sql, parameters).rowcount
+
+    def clear(self) -> bool:
+        """
+        Clear all tasks from the storage. This will also delete the exported tasks file.
+
+        :return: True if the tasks were cleared, False otherwise.
+
+        :raises ValueError: If the task storage is in read-only mode.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot clear tasks in read mode.")
+
+        cleared = self._execute("DELETE FROM tasks") > 0
+
+        with self._lock.write():
+            if os.path.exists(self.task_file_path):
+                self.task_file_path.unlink()
+                cleared = True
+
+        return cleared
+
+    def save(self, task: BasTask) -> None:
+        """
+        Save a task to the storage.
+
+        :return:  None
+
+        :param task: The task to save.
+
+        :raises ValueError: If the task storage is in read-only mode or if the task already exists.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot store tasks in read mode.")
+
+        data = task.model_dump_json()
+        try:
+            self._execute("INSERT INTO tasks (task_id, data) VALUES (?, ?)", (str(task.task_id), data))
+        except sqlite3.IntegrityError as exc:
+            raise TaskDuplicateError(f"Task with id {task.task_id} already exists.") from exc
+
+    def update(self, task: BasTask) -> None:
+        """
+        Update an existing task in the storage. Only the row of this task is rewritten.
+
+        :return: None
+
+        :param task: The task to update.
+
+        :raises ValueError: If the task storage is in read-only mode or if the task does not exist.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot store tasks in read mode.")
+
+        data = task.model_dump_json()
+        if self._execute("UPDATE tasks SET data = ? WHERE task_id = ?", (data, str(task.task_id))) == 0:
+            raise ValueError(f"Task with id {task.task_id} does not exist.")
+
+    def save_all(self) -> bool:
+        """
+        Export all tasks to the tasks file BAS reads.
+
+        The tasks are encoded one at a time straight from the database. The file is written to a temporary file first
+        and then renamed, so readers never see a partial file.
+
+        :return: True if the tasks were exported, False otherwise.
+
+        :raises ValueError: If the task storage is in read-only mode or if there are no tasks.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot store tasks in read mode.")
+
+        if self.count() == 0:
+            raise ValueError("No tasks to save.")
+
+        with self._lock.write():
+            with atomic_open(self.task_file_path, mode="wb") as f:
+                write_tasks(f, self.iter_tasks())
+
+        return True
+
+    def get(self, task_id: Union[UUID, str]) -> Union[BasTask, None]:
+        """
+        Get a task from the storage by its primary key.
+
+        :param task_id: The task id to get.
+
+        :return: The task if it exists, None otherwise.
+        """
+        rows = self._query("SELECT data FROM tasks WHERE task_id = ?", (str(task_id),))
+        if not rows:
+            return None
+
+        return decode_task(rows[0][0])
+
+    def get_all(self) -> Union[list[BasTask], None]:
+        """
+        Get all tasks from the storage in insertion order.
+
+        :return: A list of tasks if they exist, None otherwise.
+        """
+        rows = self._query("SELECT data FROM tasks ORDER BY rowid")
+        if not rows:
+            return None
+
+        return [decode_task(row[0]) for row in rows]
+
+    def iter_tasks(self) -> Iterator[BasTask]:
+        """
+        Iterate over the tasks in insertion order without loading them all into memory.
+
+        The rows are read in batches, the connection is not held between them.
+
+        :return: Iterator over the tasks.
+        """
+        last_rowid = 0
+        while True:
+            rows = self._query(
+                "SELECT rowid, data FROM tasks WHERE rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, _sqlite_fetch_size)
+            )
+
+            for last_rowid, data in rows:
+                yield decode_task(data)
+
+            if len(rows) < _sqlite_fetch_size:
+                return
+
+    def count(self) -> int:
+        """
+        Get the number of tasks in the storage.
+
+        :return:int The number of tasks in the storage.
+        """
+        rows = self._query("SELECT COUNT(*) FROM tasks")
+        return int(rows[0][0]) if rows else 0
+
+    def load_all(self) -> bool:
+        """
+        Check whether the storage holds any tasks.
+
+        Tasks are always read from the database, so there is nothing to load into memory.
+
+        :return: True if there are tasks, False otherwise.
+        """
+        return self.count() > 0
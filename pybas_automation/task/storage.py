@@ -1,18 +1,54 @@
 """Task storage module. This module is responsible for storing tasks to disk and loading tasks from disk into memory."""
 
+import io
+import itertools
 import json
 import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Set, Union
+from typing import IO, Any, Dict, Iterable, Iterator, List, Set, Tuple, Union
 from uuid import UUID
 
-import filelock
-from fastapi.encoders import jsonable_encoder
-from pydantic import DirectoryPath, FilePath
-
-from pybas_automation.task.models import BasTask
-from pybas_automation.task.settings import _filelock_filename, _storage_dir, _task_filename
-from pybas_automation.utils import create_storage_dir_in_app_data, get_logger
+from pydantic import DirectoryPath, FilePath, ValidationError
+
+from pybas_automation.bas_actions.browser.browser_settings.template import BasActionBrowserSettingsTemplate
+from pybas_automation.task.models import BasTask, TaskStatusEnum
+from pybas_automation.task.serializer import (
+    TEMPLATE_ENTRY_ID,
+    TaskJournalOpEnum,
+    TaskJournalRecord,
+    decode_journal_record,
+    decode_tasks,
+    decode_template_entry,
+    encode_delta_task_entry,
+    encode_journal_record,
+    encode_raw_task_entry,
+    encode_task_entry,
+    encode_template_entry,
+    expand_raw_task,
+    iter_decode_tasks,
+    loads_raw,
+    write_task_entries,
+    write_tasks,
+)
+from pybas_automation.task.settings import (
+    _filelock_filename,
+    _index_suffix,
+    _journal_compact_threshold,
+    _journal_suffix,
+    _storage_dir,
+    _task_filename,
+)
+from pybas_automation.utils import (
+    FileIdentity,
+    ReadWriteFileLock,
+    atomic_open,
+    create_storage_dir_in_app_data,
+    file_identity,
+    get_logger,
+    read_file_with_identity,
+)
 
 logger = get_logger()
 
@@ -28,22 +64,112 @@ class TaskDuplicateError(Exception):
     """Raised when a task already exists in the storage."""
 
 
+class TaskLeaseError(Exception):
+    """Raised when a worker does not hold the lease of a task, e.g. because it expired and was claimed again."""
+
+
+class TaskStorageBatch:
+    """
+    Collects inserts and updates in memory and commits them to the storage in one write.
+
+    Use TaskStorage.batch() to create a batch.
+    """
+
+    _storage: "TaskStorage"
+    _inserts: Dict[UUID, BasTask]
+    _updates: Dict[UUID, BasTask]
+
+    def __init__(self, storage: "TaskStorage") -> None:
+        """
+        Initialize TaskStorageBatch.
+
+        :param storage: The storage to commit to.
+        """
+
+        self._storage = storage
+        self._inserts = {}
+        self._updates = {}
+
+    def __len__(self) -> int:
+        """Return the number of pending inserts and updates."""
+        return len(self._inserts) + len(self._updates)
+
+    def save(self, task: BasTask) -> None:
+        """
+        Add a new task to the batch.
+
+        :param task: The task to save.
+
+        :raises TaskDuplicateError: If the task already exists in the storage or in the batch.
+        """
+
+        # pylint: disable=protected-access
+        if task.task_id in self._inserts or task.task_id in self._storage._tasks_unique_id:
+            raise TaskDuplicateError(f"Task with id {task.task_id} already exists.")
+
+        self._inserts[task.task_id] = task
+
+    def update(self, task: BasTask) -> None:
+        """
+        Add an update of an existing task to the batch.
+
+        :param task: The task to update.
+
+        :raises ValueError: If the task does not exist in the storage or in the batch.
+        """
+
+        if task.task_id in self._inserts:
+            self._inserts[task.task_id] = task
+            return
+
+        if task.task_id not in self._storage._tasks_unique_id:  # pylint: disable=protected-access
+            raise ValueError(f"Task with id {task.task_id} does not exist.")
+
+        self._updates[task.task_id] = task
+
+    def commit(self) -> None:
+        """Commit the pending inserts and updates to the storage and reset the batch."""
+
+        if not self:
+            return
+
+        self._storage._commit(  # pylint: disable=protected-access
+            inserts=list(self._inserts.values()), updates=list(self._updates.values())
+        )
+        self._inserts = {}
+        self._updates = {}
+
+
 class TaskStorage:
     """TaskStorage is responsible for storing tasks to disk and loading tasks from disk into memory."""
 
     storage_dir: DirectoryPath
     mode: TaskStorageModeEnum = TaskStorageModeEnum.READ
     task_file_path: FilePath
+    journal: bool = False
+    journal_file_path: FilePath
+    index_file_path: FilePath
+    compact_threshold: int = _journal_compact_threshold
+    settings_template: Union[BasActionBrowserSettingsTemplate, None] = None
 
     _tasks: Union[list[BasTask], None] = None
     _tasks_unique_id: Set[UUID]
-    _lock: filelock.FileLock
+    _journal_records: int = 0
+    # Identity of the files the tasks in memory were loaded from, see load_all()
+    _task_file_identity: Union[FileIdentity, None] = None
+    _journal_identity: Union[FileIdentity, None] = None
+    _journal_offset: int = 0
+    _lock: ReadWriteFileLock
 
     def __init__(
         self,
         storage_dir: Union[None, DirectoryPath] = None,
         task_filename: Union[None, FilePath] = None,
         mode: Union[TaskStorageModeEnum, None] = None,
+        journal: bool = False,
+        compact_threshold: Union[int, None] = None,
+        preload: bool = True,
+        settings_template: Union[BasActionBrowserSettingsTemplate, None] = None,
     ) -> None:
         """
         Initialize TaskStorage. If the storage_dir is not provided, the default storage directory will be used.
@@ -53,6 +179,11 @@ class TaskStorage:
         :param storage_dir: The directory to store the tasks file.
         :param task_filename: The filename of the tasks file.
         :param mode: The mode to open the tasks file in. Defaults to read-only.
+        :param journal: Append every save/update to a journal file instead of rewriting the tasks file.
+        :param compact_threshold: Number of journal records after which the journal is folded into the tasks file.
+        :param preload: Load all tasks into memory. Set to False if only load_one() and update() are needed.
+        :param settings_template: Store only the browser settings that differ from this template. BAS cannot read
+            such a tasks file, use export() to write the full form for BAS.
 
         :raises ValueError: If the storage_dir is not a directory. If the mode is not a valid value.
         """
@@ -84,10 +215,20 @@ class TaskStorage:
             case _:
                 raise ValueError(f"mode is not a valid value: {mode}")
 
+        self.journal = journal
+        self.journal_file_path = FilePath(self.task_file_path.with_suffix(_journal_suffix))
+        self.index_file_path = FilePath(self.task_file_path.with_suffix(_index_suffix))
+        if compact_threshold is not None:
+            if compact_threshold < 1:
+                raise ValueError(f"compact_threshold must be greater than 0, got: {compact_threshold}")
+            self.compact_threshold = compact_threshold
+        self.settings_template = settings_template
+
         self._tasks_unique_id = set()
-        self._lock = filelock.FileLock(os.path.join(self.storage_dir, _filelock_filename))
+        self._lock = ReadWriteFileLock(os.path.join(self.storage_dir, _filelock_filename))
 
-        self.load_all()
+        if preload:
+            self.load_all()
 
     def __repr__(self) -> str:
         """Return a string representation of the TaskStorage."""
@@ -106,19 +247,151 @@ class TaskStorage:
         if self._lock is None:
             raise ValueError("Lock is not initialized.")
 
-        with self._lock:
+        cleared = False
+
+        with self._lock.write():
             self._tasks = None
             self._tasks_unique_id = set()
-            if os.path.exists(self.task_file_path):
-                self.task_file_path.unlink()
-                return True
+            self._journal_records = 0
+            self._reset_cache()
+            for file_path in [self.task_file_path, self.journal_file_path, self.index_file_path]:
+                if os.path.exists(file_path):
+                    file_path.unlink()
+                    cleared = True
+
+        return cleared
+
+    def _write_tasks_file(self, tasks: Union[List[BasTask], None] = None) -> None:
+        """
+        Atomically write all tasks to the tasks file. The caller must hold the lock.
+
+        The tasks already include every journal record, so the journal is dropped afterwards.
+
+        :param tasks: The tasks to write, the tasks in memory by default. The caller puts them in memory afterwards.
+        """
+
+        if tasks is None:
+            tasks = self._tasks or []
+
+        self._write_entries(entries=((str(t.task_id), self._encode_entry(t)) for t in tasks))
+
+        # The file now holds exactly these tasks, there is no need to read it back. Every write replaces the file,
+        # which gives it a new inode, so its stat tells later writes apart without a digest.
+        self._task_file_identity = file_identity(self.task_file_path, with_digest=False)
+
+    def _encode_entry(self, task: BasTask) -> bytes:
+        """Encode a task as an element of the tasks file array, in the form of this storage."""
+
+        if self.settings_template is None:
+            return encode_task_entry(task)
+
+        return encode_delta_task_entry(task=task, template=self.settings_template)
+
+    def _write_entries(self, entries: Iterable[Tuple[str, bytes]]) -> None:
+        """
+        Atomically write encoded tasks to the tasks file together with its offset index.
+
+        The caller must hold the lock.
+
+        :param entries: Pairs of task id and the task encoded by _encode_entry(). The settings template, if any, is
+            written in front of them.
+        """
+
+        if self.settings_template is not None:
+            entries = itertools.chain([(TEMPLATE_ENTRY_ID, encode_template_entry(self.settings_template))], entries)
+
+        with atomic_open(self.task_file_path, mode="wb") as f:
+            offsets = write_task_entries(f, entries)
+
+        stat = os.stat(self.task_file_path)
+        with atomic_open(self.index_file_path) as f:
+            json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "tasks": offsets}, f)
+
+        if os.path.exists(self.journal_file_path):
+            self.journal_file_path.unlink()
+        self._journal_records = 0
+        self._reset_cache()
+
+    def _read_index(self) -> Union[Dict[str, List[int]], None]:
+        """
+        Read the offset index of the tasks file. The caller must hold the lock.
+
+        :return: Task id to [offset, length] mapping, or None if the index is missing or does not match the tasks file.
+        """
+
+        if not os.path.exists(self.index_file_path) or not os.path.exists(self.task_file_path):
+            return None
+
+        try:
+            with self.index_file_path.open(mode="r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        # The tasks file may have been written by something that does not maintain the index.
+        stat = os.stat(self.task_file_path)
+        if index.get("size") != stat.st_size or index.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+
+        return dict(index["tasks"])
+
+    def _read_template(
+        self, f: IO[bytes], index: Dict[str, List[int]]
+    ) -> Union[BasActionBrowserSettingsTemplate, None]:
+        """
+        Read the browser settings template of the tasks file through its offset index.
+
+        :param f: The tasks file opened in binary mode.
+        :param index: The valid offset index of the tasks file.
+
+        :return: The template, or None if the tasks file holds the full form.
+        """
+
+        if TEMPLATE_ENTRY_ID not in index:
+            return None
+
+        offset, length = index[TEMPLATE_ENTRY_ID]
+        f.seek(offset)
+        return decode_template_entry(loads_raw(f.read(length)))
 
-        return False
+    def _append_journal(self, records: List[Tuple[TaskJournalOpEnum, BasTask]]) -> None:
+        """
+        Append records to the journal in one write. The caller must hold the lock and call _compact_if_needed() once
+        the records are applied to the tasks in memory.
+        """
+
+        lines = [encode_journal_record(TaskJournalRecord(op=op, task=task)) for op, task in records]
+
+        with self.journal_file_path.open(mode="ab") as f:
+            start = f.tell()
+            f.write(b"".join(lines))
+            end = f.tell()
+
+        # The tasks in memory already include these records. Unless another process appended to the journal since it
+        # was last read, skip them on the next reload.
+        if self._tasks is not None and start == self._journal_offset:
+            identity = file_identity(self.journal_file_path, with_digest=False)
+            if identity is not None and (
+                (self._journal_identity is None and start == 0)
+                or (self._journal_identity is not None and self._journal_identity.inode == identity.inode)
+            ):
+                self._journal_identity = identity
+                self._journal_offset = end
+
+        self._journal_records += len(lines)
+
+    def _compact_if_needed(self) -> None:
+        """Compact the journal once it grows past the threshold. The caller must hold the lock."""
+
+        if self._journal_records >= self.compact_threshold:
+            self.compact()
 
     def save(self, task: BasTask) -> None:
         """
         Save a task to the storage.
 
+        In journal mode only one record is appended to the journal, otherwise the whole tasks file is rewritten.
+
         :return:  None
 
         :param task: The task to save.
@@ -131,49 +404,188 @@ class TaskStorage:
         if self._lock is None:
             raise ValueError("Lock is not initialized.")
 
-        with self._lock:
-            if self._tasks is None:
-                self._tasks = []
-            if task.task_id in self._tasks_unique_id:
-                raise TaskDuplicateError(f"Task with id {task.task_id} already exists.")
+        self._commit(inserts=[task], updates=[])
 
-            self._tasks.append(task)
-            self._tasks_unique_id.add(task.task_id)
+    def update(self, task: BasTask) -> None:
+        """
+        Update an existing task in the storage.
 
-            _tasks = jsonable_encoder(self._tasks)
+        In journal mode only one record is appended to the journal, otherwise the whole tasks file is rewritten.
 
-            with self.task_file_path.open(mode="w", encoding="utf-8") as f:
-                json.dump(_tasks, f, indent=4)
+        :return: None
 
-    def update(self, task: BasTask) -> None:
+        :param task: The task to update.
+
+        :raises ValueError: If the task storage is in read-only mode or if the task does not exist.
+        """
         if self.mode == TaskStorageModeEnum.READ:
             raise ValueError("Cannot store tasks in read mode.")
         if self._lock is None:
             raise ValueError("Lock is not initialized.")
         if self._tasks is None:
+            if os.path.exists(self.task_file_path) or os.path.exists(self.journal_file_path):
+                # Tasks were not loaded into memory, e.g. the task came from load_one().
+                self._update_one(task=task)
+                return
             raise ValueError("No tasks to update.")
 
-        with self._lock:
-            if task.task_id not in self._tasks_unique_id:
-                raise ValueError(f"Task with id {task.task_id} does not exist.")
-            found = False
+        self._commit(inserts=[], updates=[task])
+
+    def _update_one(self, task: BasTask) -> None:
+        """
+        Update a single task on disk without loading the other tasks into memory.
+
+        With a valid offset index only the bytes of this task are replaced in the tasks file, none of the other tasks
+        is decoded.
 
-            for num, t in enumerate(self._tasks):
-                if t.task_id == task.task_id:
-                    found = True
-                    self._tasks[num] = task
+        :param task: The task to update.
+
+        :raises ValueError: If the task does not exist.
+        """
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        task_id = str(task.task_id)
+
+        with self._lock.write():
+            if self.journal:
+                if self._find_raw(task_id=task_id) is None:
+                    raise ValueError(f"Task with id {task.task_id} does not exist.")
+                self._append_journal(records=[(TaskJournalOpEnum.UPDATE, task)])
+                self._compact_if_needed()
+                return
+
+            if os.path.exists(self.journal_file_path):
+                # Another process journaled changes, fold them in through the regular path.
+                self.load_all()
+                self.update(task=task)
+                return
+
+            index = self._read_index()
+            with self.task_file_path.open(mode="rb") as f:
+                data = f.read()
+
+            if index is None:
+                items = loads_raw(data)
+                template = decode_template_entry(items[0]) if items else None
+            else:
+                template = self._read_template(f=io.BytesIO(data), index=index)
+
+            if template != self.settings_template or (index is None and template is not None):
+                # The tasks file is in another form, e.g. written with another template, re-encode all tasks.
+                self.load_all()
+                self.update(task=task)
+                return
+
+            if index is None:
+                entries = [(str(t["task_id"]), encode_raw_task_entry(t)) for t in items]
+            else:
+                entries = []
+                for _id, (offset, length) in index.items():
+                    if _id == TEMPLATE_ENTRY_ID:
+                        continue
+                    end = offset + length
+                    entries.append((_id, data[offset:end]))
+
+            for num, (_id, _) in enumerate(entries):
+                if _id == task_id:
+                    entries[num] = (task_id, self._encode_entry(task))
                     break
-            if not found:
+            else:
                 raise ValueError(f"Task with id {task.task_id} does not exist.")
 
-            _tasks = jsonable_encoder(self._tasks)
+            self._write_entries(entries=entries)
+
+    @contextmanager
+    def batch(self) -> Iterator[TaskStorageBatch]:
+        """
+        Collect saves and updates and commit them with one lock acquisition and one write.
+
+        Nothing is written if the block raises.
+
+        Example::
+
+            with task_storage.batch() as batch:
+                for task in tasks:
+                    batch.save(task=task)
+
+        :return: TaskStorageBatch instance.
+
+        :raises ValueError: If the task storage is in read-only mode.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot store tasks in read mode.")
+
+        batch = TaskStorageBatch(storage=self)
+        yield batch
+        batch.commit()
+
+    def save_many(self, tasks: Iterable[BasTask]) -> None:
+        """
+        Save many tasks to the storage with one lock acquisition and one write.
+
+        :return: None
+
+        :param tasks: The tasks to save.
+
+        :raises ValueError: If the task storage is in read-only mode.
+        :raises TaskDuplicateError: If any of the tasks already exists. No task is saved in this case.
+        """
+
+        with self.batch() as batch:
+            for task in tasks:
+                batch.save(task=task)
+
+    def _commit(self, inserts: List[BasTask], updates: List[BasTask]) -> None:
+        """
+        Write inserts and updates, e.g. collected by a batch, in one go and then apply them to the tasks in memory.
+
+        The tasks in memory are left unchanged if the write fails.
+
+        :param inserts: New tasks.
+        :param updates: Updated versions of existing tasks.
+
+        :raises TaskDuplicateError: If any of the new tasks already exists.
+        :raises ValueError: If any of the updated tasks does not exist.
+        """
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        with self._lock.write():
+            # Check everything before touching the tasks in memory, so a failed commit changes nothing.
+            for task in inserts:
+                if task.task_id in self._tasks_unique_id:
+                    raise TaskDuplicateError(f"Task with id {task.task_id} already exists.")
+            for task in updates:
+                if task.task_id not in self._tasks_unique_id:
+                    raise ValueError(f"Task with id {task.task_id} does not exist.")
+
+            if self._tasks is None:
+                self._tasks = []
+
+            tasks = list(self._tasks)
+            if updates:
+                positions = {task.task_id: num for num, task in enumerate(tasks)}
+                for task in updates:
+                    tasks[positions[task.task_id]] = task
+            tasks.extend(inserts)
+
+            if self.journal:
+                records = [(TaskJournalOpEnum.SAVE, task) for task in inserts]
+                records.extend((TaskJournalOpEnum.UPDATE, task) for task in updates)
+                self._append_journal(records=records)
+            else:
+                self._write_tasks_file(tasks=tasks)
 
-            with self.task_file_path.open(mode="w", encoding="utf-8") as f:
-                json.dump(_tasks, f, indent=4)
+            self._tasks = tasks
+            self._tasks_unique_id.update(task.task_id for task in inserts)
+
+            if self.journal:
+                self._compact_if_needed()
 
     def save_all(self) -> bool:
         """
-        Save all tasks to the storage.
+        Save all tasks to the storage. The journal, if any, is folded into the tasks file.
 
         :return: True if the tasks were saved, False otherwise.
 
@@ -191,12 +603,259 @@ class TaskStorage:
         if self._lock is None:
             raise ValueError("Lock is not initialized.")
 
-        with self._lock:
-            with self.task_file_path.open(mode="w", encoding="utf-8") as f:
-                json.dump([t.model_dump(mode="json") for t in self._tasks], f, indent=4)
+        with self._lock.write():
+            self._write_tasks_file()
+
+        return True
+
+    def write_all(self, tasks: Iterable[BasTask]) -> int:
+        """
+        Replace all tasks in the storage, encoding them to the tasks file one at a time.
+
+        Unlike save_all() the tasks do not have to be in memory, e.g. they can come from a generator or from
+        iter_tasks() of another storage. The tasks in memory are dropped, use iter_tasks() or load_all() to read them.
+
+        :param tasks: The tasks to write.
+
+        :return: The number of written tasks.
+
+        :raises ValueError: If the task storage is in read-only mode.
+        :raises TaskDuplicateError: If a task id occurs more than once, the storage is left unchanged then.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot store tasks in read mode.")
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        seen: Set[UUID] = set()
+
+        def entries() -> Iterator[Tuple[str, bytes]]:
+            for task in tasks:
+                if task.task_id in seen:
+                    raise TaskDuplicateError(f"Task with id {task.task_id} already exists.")
+                seen.add(task.task_id)
+                yield str(task.task_id), self._encode_entry(task)
+
+        with self._lock.write():
+            self._write_entries(entries=entries())
+            self._tasks = None
+            self._tasks_unique_id = set()
+
+        return len(seen)
+
+    def export(self, file_path: FilePath) -> int:
+        """
+        Write all tasks in the full form BAS reads to another file, one task at a time.
+
+        Use it to hand the tasks to BAS when the storage keeps only the differences from a settings template.
+
+        :param file_path: The file to write, it is replaced atomically.
+
+        :return: The number of exported tasks.
+        """
+
+        with atomic_open(file_path, mode="wb") as f:
+            return len(write_tasks(f, self.iter_tasks()))
+
+    def compact(self) -> bool:
+        """
+        Fold the journal into the tasks file, which is the snapshot BAS reads.
+
+        Records appended by other processes are picked up as well, because the snapshot and the journal are re-read
+        from disk before writing.
+
+        :return: True if the journal was compacted, False if there was nothing to compact.
+
+        :raises ValueError: If the task storage is in read-only mode.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot compact tasks in read mode.")
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        with self._lock.write():
+            if not os.path.exists(self.journal_file_path):
+                return False
+
+            self.load_all()
+            self._write_tasks_file()
+
+        logger.debug("Journal compacted into %s", self.task_file_path)
 
         return True
 
+    def claim(
+        self, worker_id: str, lease_seconds: float = 300, max_attempts: Union[int, None] = None
+    ) -> Union[BasTask, None]:
+        """
+        Claim the next pending task for a worker.
+
+        Running tasks whose lease has expired, e.g. because their worker crashed, are claimed again. The storage is
+        re-read from disk under the write lock, so concurrent workers never claim the same task.
+
+        :param worker_id: Unique identifier of the worker.
+        :param lease_seconds: The lease expires after this many seconds unless the worker sends a heartbeat.
+        :param max_attempts: Tasks with an expired lease that were claimed this many times are marked as failed
+            instead of being claimed again.
+
+        :return: The claimed task, or None if there is no task to claim.
+
+        :raises ValueError: If the task storage is in read-only mode.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot claim tasks in read mode.")
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        now = datetime.now(timezone.utc)
+
+        with self._lock.write():
+            if not self.load_all() or self._tasks is None:
+                return None
+
+            expired = []
+            claimed = None
+
+            for task in self._tasks:
+                if task.status == TaskStatusEnum.RUNNING:
+                    if task.lease_expires_at is None or task.lease_expires_at > now:
+                        continue
+                    if max_attempts is not None and task.attempts >= max_attempts:
+                        expired.append(
+                            task.model_copy(
+                                update={
+                                    "status": TaskStatusEnum.FAILED,
+                                    "worker_id": None,
+                                    "lease_expires_at": None,
+                                    "error": f"Lease expired after {task.attempts} attempts.",
+                                }
+                            )
+                        )
+                        continue
+                elif task.status != TaskStatusEnum.PENDING:
+                    continue
+
+                claimed = task.model_copy(
+                    update={
+                        "status": TaskStatusEnum.RUNNING,
+                        "worker_id": worker_id,
+                        "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                        "attempts": task.attempts + 1,
+                    }
+                )
+                break
+
+            # The tasks in memory are replaced by the changed copies only once they are written.
+
+            with self.batch() as batch:
+                for task in expired + ([claimed] if claimed else []):
+                    batch.update(task=task)
+
+        return claimed
+
+    def _get_leased(self, task_id: Union[UUID, str], worker_id: str) -> BasTask:
+        """
+        Re-read the storage and return a running task leased by the worker. The caller must hold the write lock.
+
+        :raises ValueError: If the task does not exist.
+        :raises TaskLeaseError: If the task is not running or leased by another worker.
+        """
+
+        self.load_all()
+
+        task = self.get(task_id=UUID(str(task_id)))
+        if task is None:
+            raise ValueError(f"Task with id {task_id} does not exist.")
+        if task.status != TaskStatusEnum.RUNNING or task.worker_id != worker_id:
+            raise TaskLeaseError(f"Task with id {task_id} is not leased by worker {worker_id}.")
+
+        return task
+
+    def heartbeat(self, task_id: Union[UUID, str], worker_id: str, lease_seconds: float = 300) -> BasTask:
+        """
+        Extend the lease of a running task.
+
+        :param task_id: The task id.
+        :param worker_id: Unique identifier of the worker holding the lease.
+        :param lease_seconds: The lease expires after this many seconds from now.
+
+        :return: The updated task.
+
+        :raises ValueError: If the task storage is in read-only mode or if the task does not exist.
+        :raises TaskLeaseError: If the worker does not hold the lease of the task.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot store tasks in read mode.")
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        with self._lock.write():
+            task = self._get_leased(task_id=task_id, worker_id=worker_id).model_copy(
+                update={"lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)}
+            )
+            self.update(task=task)
+
+        return task
+
+    def complete(self, task_id: Union[UUID, str], worker_id: str) -> BasTask:
+        """
+        Mark a running task as done and release its lease.
+
+        :param task_id: The task id.
+        :param worker_id: Unique identifier of the worker holding the lease.
+
+        :return: The updated task.
+
+        :raises ValueError: If the task storage is in read-only mode or if the task does not exist.
+        :raises TaskLeaseError: If the worker does not hold the lease of the task.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot store tasks in read mode.")
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        with self._lock.write():
+            task = self._get_leased(task_id=task_id, worker_id=worker_id).model_copy(
+                update={"status": TaskStatusEnum.DONE, "worker_id": None, "lease_expires_at": None, "error": None}
+            )
+            self.update(task=task)
+
+        return task
+
+    def fail(
+        self, task_id: Union[UUID, str], worker_id: str, error: Union[str, None] = None, requeue: bool = False
+    ) -> BasTask:
+        """
+        Mark a running task as failed and release its lease.
+
+        :param task_id: The task id.
+        :param worker_id: Unique identifier of the worker holding the lease.
+        :param error: Reason of the failure.
+        :param requeue: Put the task back to pending, so it is claimed again.
+
+        :return: The updated task.
+
+        :raises ValueError: If the task storage is in read-only mode or if the task does not exist.
+        :raises TaskLeaseError: If the worker does not hold the lease of the task.
+        """
+        if self.mode == TaskStorageModeEnum.READ:
+            raise ValueError("Cannot store tasks in read mode.")
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        with self._lock.write():
+            task = self._get_leased(task_id=task_id, worker_id=worker_id).model_copy(
+                update={
+                    "status": TaskStatusEnum.PENDING if requeue else TaskStatusEnum.FAILED,
+                    "worker_id": None,
+                    "lease_expires_at": None,
+                    "error": error,
+                }
+            )
+            self.update(task=task)
+
+        return task
+
     def get(self, task_id: UUID) -> Union[BasTask, None]:
         """
         Get a task from the storage.
@@ -224,6 +883,45 @@ class TaskStorage:
             return None
         return self._tasks
 
+    def iter_tasks(self) -> Iterator[BasTask]:
+        """
+        Iterate over the tasks on disk without loading them all into memory.
+
+        The tasks file is decoded one task at a time and the journal records are applied on the fly, so memory use
+        stays flat no matter how many tasks there are, apart from the raw bytes of the tasks file. The tasks in memory
+        are neither used nor changed.
+
+        The files are read under the shared lock when iter_tasks() is called, the lock is released before the first
+        task is decoded. The tasks can be written back while iterating, to this storage or another one in the same
+        directory, e.g. other_storage.write_all(tasks=task_storage.iter_tasks()).
+
+        :return: Iterator over the tasks, in the same order as get_all().
+        """
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        data = None
+        with self._lock.read():
+            # The journal is bounded by the compaction threshold, so its latest records are kept in memory.
+            journal: Dict[UUID, BasTask] = {}
+            if os.path.exists(self.journal_file_path):
+                for _, record in self._iter_journal():
+                    if record is not None:
+                        journal[record.task.task_id] = record.task
+
+            if os.path.exists(self.task_file_path):
+                data = self.task_file_path.read_bytes()
+
+        def _iter() -> Iterator[BasTask]:
+            if data is not None:
+                for task in iter_decode_tasks(io.BytesIO(data)):
+                    yield journal.pop(task.task_id, task)
+
+            # Tasks saved after the last compaction.
+            yield from journal.values()
+
+        return _iter()
+
     def count(self) -> int:
         """
         Get the number of tasks in the storage.
@@ -234,35 +932,218 @@ class TaskStorage:
             return 0
         return len(self._tasks)
 
-    def load_all(self) -> bool:
+    def _find_raw(self, task_id: str) -> Union[Dict[str, Any], None]:
+        """
+        Find the latest stored version of a task as plain JSON data in the full form. The caller must hold the read or
+        write lock.
+
+        The journal is checked first, then the tasks file through the offset index. Without a valid index the tasks
+        file is parsed into plain dicts, which is still much cheaper than validating every task.
+
+        :param task_id: The task id to find.
+
+        :return: The task data if it exists, None otherwise.
+        """
+
+        if os.path.exists(self.journal_file_path):
+            found = None
+            with self.journal_file_path.open(mode="rb") as f:
+                for line in f:
+                    try:
+                        record = loads_raw(line)
+                    except ValueError:
+                        continue
+                    if record["task"].get("task_id") == task_id:
+                        found = record["task"]
+            if found is not None:
+                return dict(found)
+
+        if not os.path.exists(self.task_file_path):
+            return None
+
+        index = self._read_index()
+        if index is not None:
+            if task_id not in index:
+                return None
+            offset, length = index[task_id]
+            with self.task_file_path.open(mode="rb") as f:
+                template = self._read_template(f=f, index=index)
+                f.seek(offset)
+                return expand_raw_task(task_data=dict(loads_raw(f.read(length))), template=template)
+
+        with self.task_file_path.open(mode="rb") as f:
+            items = loads_raw(f.read())
+
+        template = decode_template_entry(items[0]) if items else None
+        for task_data in items[1:] if template is not None else items:
+            if task_data.get("task_id") == task_id:
+                return expand_raw_task(task_data=dict(task_data), template=template)
+
+        return None
+
+    def load_one(self, task_id: Union[UUID, str]) -> Union[BasTask, None]:
+        """
+        Load a single task from disk without loading and validating the other tasks.
+
+        This is the fast path for workers, use it together with preload=False.
+
+        :param task_id: The task id to load.
+
+        :return: The task if it exists, None otherwise.
+
+        :raises ValueError: If the task_id is not a valid UUID.
+        """
+        if self._lock is None:
+            raise ValueError("Lock is not initialized.")
+
+        task_id = str(UUID(str(task_id)))
+
+        with self._lock.read():
+            task_data = self._find_raw(task_id=task_id)
+
+        if task_data is None:
+            return None
+
+        return BasTask(**task_data)
+
+    def _iter_journal(self, offset: int = 0) -> Iterator[Tuple[int, Union[TaskJournalRecord, None]]]:
+        """
+        Read the journal records. The caller must hold the lock.
+
+        A truncated last record, left behind by a process killed in the middle of a write, is not read. Corrupted
+        records are skipped.
+
+        :param offset: Byte offset of the first record to read.
+
+        :return: Iterator over pairs of the byte offset after a record and the record, None for skipped records.
+        """
+
+        with self.journal_file_path.open(mode="rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Either truncated or still being written, it is read by a later reload once complete.
+                    break
+                offset += len(line)
+
+                line = line.strip()
+                if not line:
+                    yield offset, None
+                    continue
+                try:
+                    record = decode_journal_record(line)
+                except ValidationError as exc:
+                    if exc.errors()[0]["type"] != "json_invalid":
+                        raise
+                    logger.warning("Skipping corrupted journal record in %s", self.journal_file_path)
+                    yield offset, None
+                    continue
+
+                yield offset, record
+
+    def _replay_journal(self, offset: int = 0) -> int:
+        """
+        Apply the journal records on top of the tasks in memory. The caller must hold the lock.
+
+        :param offset: Byte offset of the first record to apply, records before it are already applied.
+
+        :return: The number of applied records.
+        """
+
+        if self._tasks is None:
+            self._tasks = []
+
+        positions = {task.task_id: num for num, task in enumerate(self._tasks)}
+        applied = 0
+
+        for offset, record in self._iter_journal(offset=offset):
+            if record is None:
+                continue
+
+            task = record.task
+            if task.task_id in positions:
+                self._tasks[positions[task.task_id]] = task
+            else:
+                positions[task.task_id] = len(self._tasks)
+                self._tasks.append(task)
+                self._tasks_unique_id.add(task.task_id)
+            applied += 1
+
+        self._journal_offset = offset
+
+        return applied
+
+    def _reset_cache(self) -> None:
+        """Forget the identity of the files the tasks in memory were loaded from."""
+
+        self._task_file_identity = None
+        self._journal_identity = None
+        self._journal_offset = 0
+
+    def load_all(self, force: bool = False) -> bool:
         """
         Load all tasks from the storage into memory.
 
+        If a journal exists, its records are applied on top of the tasks file. Files that did not change since the
+        last load are not read again, and records appended to the journal since then are applied incrementally.
+
+        :param force: Reload everything even if the files did not change.
+
         :return: True if the tasks were loaded, False otherwise.
 
         :raises ValueError: If the task storage is in read-only mode.
         """
 
-        # Check if the task file exists.
-        if not os.path.exists(self.task_file_path):
+        # Check if the task file or the journal exists.
+        if not os.path.exists(self.task_file_path) and not os.path.exists(self.journal_file_path):
+            self._reset_cache()
             return False
 
         # Ensure the lock has been initialized.
         if self._lock is None:
             raise ValueError("Lock is not initialized.")
 
-        with self._lock:  # Acquire the lock.
-            with self.task_file_path.open(mode="r", encoding="utf-8") as f:
-                tasks_from_file = json.load(f)
-
-            # Clear existing tasks in memory.
+        with self._lock.read():  # Acquire the shared lock, other readers are not blocked.
+            if not force and self._tasks is not None and self._is_task_file_unchanged():
+                journal_identity = file_identity(self.journal_file_path, with_digest=False)
+
+                if journal_identity is None and self._journal_identity is None:
+                    return True
+
+                # A journal created since the last load is read from the start, an existing one from where it was left.
+                if journal_identity is not None and (
+                    self._journal_identity is None
+                    or (
+                        journal_identity.inode == self._journal_identity.inode
+                        and journal_identity.size >= self._journal_offset
+                    )
+                ):
+                    if journal_identity.size > self._journal_offset:
+                        # Only the appending process counts its records, they may include records of this one.
+                        self._replay_journal(offset=self._journal_offset)
+                    self._journal_identity = journal_identity
+                    return True
+
+            # Validate the tasks straight from the file contents.
+            self._reset_cache()
             self._tasks = []
-            self._tasks_unique_id = set()
+            if os.path.exists(self.task_file_path):
+                data, self._task_file_identity = read_file_with_identity(self.task_file_path)
+                self._tasks = decode_tasks(data)
 
-            # Populate tasks from the file into memory.
-            for task_data in tasks_from_file:
-                task = BasTask(**task_data)
-                self._tasks.append(task)
-                self._tasks_unique_id.add(task.task_id)
+            self._tasks_unique_id = {task.task_id for task in self._tasks}
+
+            self._journal_records = 0
+            if os.path.exists(self.journal_file_path):
+                self._journal_identity = file_identity(self.journal_file_path, with_digest=False)
+                self._journal_records = self._replay_journal()
 
         return True
+
+    def _is_task_file_unchanged(self) -> bool:
+        """Check whether the tasks file is the one the tasks in memory were loaded from."""
+
+        if self._task_file_identity is None:
+            return not os.path.exists(self.task_file_path)
+
+        return self._task_file_identity.matches(self.task_file_path)
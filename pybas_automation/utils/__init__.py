@@ -1,7 +1,24 @@
 """Collection of utility functions."""
 
-from .filesystem import create_storage_dir_in_app_data
+from .filesystem import (
+    FileIdentity,
+    atomic_open,
+    create_storage_dir_in_app_data,
+    file_identity,
+    read_file_with_identity,
+)
 from .logger import get_logger
+from .rwlock import ReadWriteFileLock
 from .utils import random_string, timing
 
-__all__ = ["create_storage_dir_in_app_data", "get_logger", "timing", "random_string"]
+__all__ = [
+    "atomic_open",
+    "create_storage_dir_in_app_data",
+    "file_identity",
+    "FileIdentity",
+    "get_logger",
+    "ReadWriteFileLock",
+    "timing",
+    "random_string",
+    "read_file_with_identity",
+]
@@ -2,9 +2,19 @@
 Filesystem utilities.
 """
 
+import hashlib
 import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Iterator, Tuple, Union
 
-from pydantic import DirectoryPath
+from pydantic import BaseModel, DirectoryPath, FilePath
+
+from pybas_automation import default_model_config
+
+# Files modified within this window before being read may change again without changing their mtime.
+_racy_mtime_window_ns = 2 * 1_000_000_000
 
 
 def create_storage_dir_in_app_data(storage_dir: DirectoryPath) -> DirectoryPath:
@@ -29,3 +39,137 @@ def create_storage_dir_in_app_data(storage_dir: DirectoryPath) -> DirectoryPath:
         os.mkdir(storage_dir)
 
     return DirectoryPath(storage_dir)
+
+
+@contextmanager
+def atomic_open(file_path: FilePath, mode: str = "w") -> Iterator[IO[Any]]:
+    """
+    Open a temporary file next to file_path and rename it over file_path once the block succeeds.
+
+    Readers never see a partially written file, and the original file is kept if the block raises.
+
+    :param file_path: The file to replace.
+    :param mode: "w" for text or "wb" for binary.
+    :return: The opened temporary file.
+    """
+
+    if mode not in ["w", "wb"]:
+        raise ValueError(f"mode is not a valid value: {mode}")
+
+    fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode=mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(tmp_filename, file_path)
+    except BaseException:
+        os.unlink(tmp_filename)
+        raise
+
+
+class FileIdentity(BaseModel):
+    """
+    Identity of a file on disk, used to detect whether it changed since it was read.
+
+    Timestamps have a limited resolution, so a file modified right before it was read may change again without
+    changing its mtime. For such files the content digest is recorded as well. Once the mtime is older than that
+    window, a change would move the mtime, so the digest is checked one last time and dropped.
+    """
+
+    model_config = default_model_config
+
+    inode: int
+    size: int
+    mtime_ns: int
+    digest: Union[str, None] = None
+
+    def matches(self, file_path: FilePath) -> bool:
+        """
+        Check whether the file still has this identity.
+
+        :param file_path: The file to check.
+        :return: True if the file did not change, False otherwise.
+        """
+
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return False
+
+        if (stat.st_ino, stat.st_size, stat.st_mtime_ns) != (self.inode, self.size, self.mtime_ns):
+            return False
+        if self.digest is None:
+            return True
+
+        if _file_digest(file_path) != self.digest:
+            return False
+        if not _is_racy(stat):
+            self.digest = None
+
+        return True
+
+
+def _is_racy(stat: os.stat_result) -> bool:
+    """Check whether the file was modified so recently that it may change again without changing its mtime."""
+    return time.time_ns() - stat.st_mtime_ns < _racy_mtime_window_ns
+
+
+def _file_digest(file_path: FilePath) -> str:
+    """Return the BLAKE2 digest of the file contents."""
+
+    digest = hashlib.blake2b()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def file_identity(
+    file_path: FilePath, with_digest: Union[bool, None] = None, data: Union[bytes, None] = None
+) -> Union[FileIdentity, None]:
+    """
+    Get the identity of a file.
+
+    :param file_path: The file.
+    :param with_digest: Include the content digest. By default, it is included only for recently modified files.
+    :param data: The contents of the file, e.g. just written. The digest is computed from them instead of the file.
+    :return: FileIdentity instance, or None if the file does not exist.
+    """
+
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+
+    if with_digest is None:
+        with_digest = _is_racy(stat)
+
+    digest = None
+    if with_digest:
+        digest = _file_digest(file_path) if data is None else hashlib.blake2b(data).hexdigest()
+
+    return FileIdentity(inode=stat.st_ino, size=stat.st_size, mtime_ns=stat.st_mtime_ns, digest=digest)
+
+
+def read_file_with_identity(file_path: FilePath) -> Tuple[bytes, FileIdentity]:
+    """
+    Read a file and get the identity of the read contents.
+
+    The digest of a recently modified file is computed from the read bytes, the file is not read twice.
+
+    :param file_path: The file.
+    :return: The file contents and their FileIdentity.
+
+    :raises FileNotFoundError: If the file does not exist.
+    """
+
+    with open(file_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+
+    return data, FileIdentity(
+        inode=stat.st_ino,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        digest=hashlib.blake2b(data).hexdigest() if _is_racy(stat) else None,
+    )
@@ -0,0 +1,217 @@
+"""
+Reader-writer file lock.
+
+Readers hold a shared lock and run in parallel, writers hold an exclusive lock, both across processes and across the
+threads of a process. The file is locked with flock() on POSIX and LockFileEx() on Windows.
+"""
+
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Union
+
+if sys.platform == "win32":  # pragma: no cover - Windows
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    class _Overlapped(ctypes.Structure):
+        _fields_ = [
+            ("Internal", ctypes.c_void_p),
+            ("InternalHigh", ctypes.c_void_p),
+            ("Offset", wintypes.DWORD),
+            ("OffsetHigh", wintypes.DWORD),
+            ("hEvent", wintypes.HANDLE),
+        ]
+
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _LOCKFILE_EXCLUSIVE_LOCK = 0x2
+
+    def _lock_fd(fd: int, exclusive: bool) -> None:
+        """Lock the first byte of the file, shared or exclusive, waiting for other holders."""
+
+        flags = _LOCKFILE_EXCLUSIVE_LOCK if exclusive else 0
+        handle = wintypes.HANDLE(msvcrt.get_osfhandle(fd))
+        if not _kernel32.LockFileEx(handle, flags, 0, 1, 0, ctypes.byref(_Overlapped())):
+            raise ctypes.WinError(ctypes.get_last_error())
+
+    def _unlock_fd(fd: int) -> None:
+        """Unlock the first byte of the file."""
+
+        handle = wintypes.HANDLE(msvcrt.get_osfhandle(fd))
+        if not _kernel32.UnlockFileEx(handle, 0, 1, 0, ctypes.byref(_Overlapped())):
+            raise ctypes.WinError(ctypes.get_last_error())
+
+else:
+    import fcntl
+
+    def _lock_fd(fd: int, exclusive: bool) -> None:
+        """Lock the file, shared or exclusive, waiting for other holders."""
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def _unlock_fd(fd: int) -> None:
+        """Unlock the file."""
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class ReadWriteFileLock:
+    """
+    Inter-process lock with a shared (read) and an exclusive (write) mode.
+
+    The threads of a process share the lock of an instance: they read in parallel, and a writing thread waits for the
+    reading threads of the instance as well as for other processes. A waiting writer keeps new readers out.
+
+    The lock is reentrant within a thread: a read lock requested while holding the write lock is a no-op. Upgrading
+    a held read lock to a write lock is not supported, because two upgrading readers would deadlock.
+
+    Using the lock as a context manager takes the write lock, like filelock.FileLock.
+    """
+
+    lock_file: str
+
+    _condition: threading.Condition
+    # Thread id -> depth of the read locks it holds.
+    _read_depth: Dict[int, int]
+    # Thread holding the write lock, and the depth of its write locks.
+    _writer: Union[int, None]
+    _write_depth: int
+    _writers_waiting: int
+    # The locked file, open while a thread of the instance holds the lock.
+    _fd: Union[int, None]
+
+    def __init__(self, lock_file: Union[str, os.PathLike]) -> None:
+        """
+        Initialize ReadWriteFileLock.
+
+        :param lock_file: Path to the lock file. It is created if it does not exist.
+        """
+
+        self.lock_file = os.fspath(lock_file)
+
+        self._condition = threading.Condition()
+        self._read_depth = {}
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._fd = None
+
+    def __repr__(self) -> str:
+        """Return a string representation of the ReadWriteFileLock."""
+        return (
+            f"<ReadWriteFileLock lock_file={self.lock_file} readers={len(self._read_depth)} "
+            f"exclusive={self._writer is not None}>"
+        )
+
+    @property
+    def is_locked(self) -> bool:
+        """Return True if the lock is held by a thread of this instance."""
+        return self._writer is not None or bool(self._read_depth)
+
+    def _lock_file(self, exclusive: bool) -> None:
+        """
+        Lock the file. The caller must hold the condition and no thread of the instance may hold the lock, so the
+        wait only holds up threads that would wait anyway.
+        """
+
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _lock_fd(fd, exclusive=exclusive)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def _unlock_file(self) -> None:
+        """Unlock the file. The caller must hold the condition."""
+
+        if self._fd is not None:
+            try:
+                _unlock_fd(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._condition.notify_all()
+
+    def _acquire(self, exclusive: bool) -> None:
+        me = threading.get_ident()
+
+        with self._condition:
+            if self._writer == me:
+                if exclusive:
+                    self._write_depth += 1
+                else:
+                    self._read_depth[me] = self._read_depth.get(me, 0) + 1
+                return
+
+            if me in self._read_depth:
+                if exclusive:
+                    raise RuntimeError("Cannot upgrade a read lock to a write lock.")
+                self._read_depth[me] += 1
+                return
+
+            if not exclusive:
+                while self._writer is not None or self._writers_waiting:
+                    self._condition.wait()
+                if not self._read_depth:
+                    self._lock_file(exclusive=False)
+                self._read_depth[me] = 1
+                return
+
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._read_depth:
+                    self._condition.wait()
+                self._lock_file(exclusive=True)
+            finally:
+                self._writers_waiting -= 1
+                self._condition.notify_all()
+
+            self._writer = me
+            self._write_depth = 1
+
+    def _release(self, exclusive: bool) -> None:
+        me = threading.get_ident()
+
+        with self._condition:
+            if exclusive:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._writer = None
+                    self._unlock_file()
+                return
+
+            self._read_depth[me] -= 1
+            if self._read_depth[me] == 0:
+                del self._read_depth[me]
+                if not self._read_depth and self._writer is None:
+                    self._unlock_file()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the shared lock for the duration of the block."""
+
+        self._acquire(exclusive=False)
+        try:
+            yield
+        finally:
+            self._release(exclusive=False)
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the exclusive lock for the duration of the block."""
+
+        self._acquire(exclusive=True)
+        try:
+            yield
+        finally:
+            self._release(exclusive=True)
+
+    def __enter__(self) -> "ReadWriteFileLock":
+        """Acquire the write lock."""
+        self._acquire(exclusive=True)
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Release the write lock."""
+        self._release(exclusive=True)
@@ -0,0 +1,63 @@
+"""
+Benchmark encoding and decoding of the tasks file.
+
+Compares the previous approach (json.load + BasTask(**data), jsonable_encoder + json.dump) with the
+pybas_automation.task.serializer module, which validates and encodes bytes with cached TypeAdapters.
+
+Usage: python scripts/benchmark_task_serializer.py [1000 10000 100000]
+"""
+
+import json
+import os
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../")))
+
+from pybas_automation.task import BasTask  # noqa: E402
+from pybas_automation.task.serializer import decode_tasks, encode_tasks  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark(size):
+    tasks = [BasTask() for _ in range(size)]
+    data = encode_tasks(tasks)
+    repeat = 3 if size <= 10_000 else 1
+
+    results = {
+        "decode_old": best_of(lambda: [BasTask(**t) for t in json.loads(data)], repeat),
+        "decode_new": best_of(lambda: decode_tasks(data), repeat),
+        "encode_old": best_of(lambda: json.dumps(jsonable_encoder(tasks), indent=4).encode("utf-8"), repeat),
+        "encode_new": best_of(lambda: encode_tasks(tasks), repeat),
+    }
+
+    print(
+        f"{size:>7} tasks, {len(data) / 1024 / 1024:7.1f} MiB | "
+        f"decode {results['decode_old']:7.3f}s -> {results['decode_new']:7.3f}s "
+        f"(x{results['decode_old'] / results['decode_new']:.1f}) | "
+        f"encode {results['encode_old']:7.3f}s -> {results['encode_new']:7.3f}s "
+        f"(x{results['encode_old'] / results['encode_new']:.1f})"
+    )
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        benchmark(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Move the browser profiles of a flat BrowserProfileStorage into shard directories.
+
+Stop the workers first, and regenerate the tasks afterwards, as the paths of the profile directories change. Running it
+again completes an interrupted migration.
+
+Usage: python scripts/migrate_profiles_to_sharded.py [storage_dir]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../")))
+
+from pybas_automation.browser_profile import BrowserProfileStorage  # noqa: E402
+
+
+def main():
+    storage_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    browser_profile_storage = BrowserProfileStorage(storage_dir=storage_dir)
+
+    started = time.perf_counter()
+    moved = browser_profile_storage.migrate_to_sharded()
+
+    print(f"Moved {moved} profiles of {browser_profile_storage.storage_dir} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
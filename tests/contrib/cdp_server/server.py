@@ -0,0 +1,146 @@
+"""
+Local stand-in for the DevTools WebSocket endpoint of a browser, for tests that do not need a real browser.
+
+Commands are answered concurrently, each after the configured latency, so responses may arrive out of order:
+
+- Browser.getVersion, Target.getTargets and Target.attachToTarget return canned results.
+- Test.fail answers with a CDP error.
+- Test.sleep answers after params["seconds"].
+- Test.emit sends params["count"] events named params["method"] before answering, of the session of the command.
+- Any other command returns an empty result.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Union
+
+import websockets
+from websockets.server import WebSocketServerProtocol
+
+
+class CDPServer:
+    """Stand-in DevTools server running in a thread with its own event loop."""
+
+    port: int
+    latency: float
+
+    connections: int
+    methods: List[str]
+    # Session id of every command, None for commands to the browser.
+    session_ids: List[Union[str, None]]
+    # Commands being answered now, and the most at any time.
+    in_flight: int
+    max_in_flight: int
+
+    def __init__(self, port: int, latency: float = 0.0) -> None:
+        """
+        Initialize CDPServer.
+
+        :param port: The port to listen on.
+        :param latency: Seconds to wait before every response.
+        """
+
+        self.port = port
+        self.latency = latency
+        self.connections = 0
+        self.methods = []
+        self.session_ids = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._stop: Union[asyncio.Future, None] = None
+        self._thread: Union[threading.Thread, None] = None
+        self._started = threading.Event()
+
+    @property
+    def ws_url(self) -> str:
+        """The WebSocket URL of the browser."""
+        return f"ws://127.0.0.1:{self.port}/devtools/browser/stand-in"
+
+    def result(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the result of a command."""
+
+        if method == "Browser.getVersion":
+            return {"protocolVersion": "1.3", "product": "Chrome/120.0.6099.5", "userAgent": "Mozilla/5.0"}
+        if method == "Target.getTargets":
+            return {"targetInfos": [{"targetId": "1", "type": "page", "url": "about:blank", "attached": True}]}
+        if method == "Target.attachToTarget":
+            return {"sessionId": f"session-{params.get('targetId')}"}
+
+        return {}
+
+    async def _answer(self, ws: WebSocketServerProtocol, message: Dict[str, Any]) -> None:
+        method = message["method"]
+        params = message.get("params") or {}
+
+        self.methods.append(method)
+        self.session_ids.append(message.get("sessionId"))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency + (params.get("seconds", 0) if method == "Test.sleep" else 0))
+
+            if method == "Test.emit":
+                for num in range(params.get("count", 1)):
+                    event = {"method": params.get("method", "Test.event"), "params": {"num": num}}
+                    if "sessionId" in message:
+                        event["sessionId"] = message["sessionId"]
+                    await ws.send(json.dumps(event))
+
+            if method == "Test.fail":
+                response: Dict[str, Any] = {"id": message["id"], "error": {"code": -32601, "message": "Failed"}}
+            else:
+                response = {"id": message["id"], "result": self.result(method, params)}
+            if "sessionId" in message:
+                response["sessionId"] = message["sessionId"]
+
+            await ws.send(json.dumps(response))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.in_flight -= 1
+
+    async def _handler(self, ws: WebSocketServerProtocol) -> None:
+        self.connections += 1
+        tasks = set()
+        try:
+            async for raw in ws:
+                task = asyncio.create_task(self._answer(ws, json.loads(raw)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _serve(self) -> None:
+        self._stop = asyncio.get_running_loop().create_future()
+        async with websockets.serve(self._handler, "127.0.0.1", self.port, max_size=None):  # type: ignore
+            self._started.set()
+            await self._stop
+
+    def start(self) -> None:
+        """Start serving in a thread."""
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._serve())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="cdp-server", daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=5)
+
+    def stop(self) -> None:
+        """Stop serving, open connections are closed."""
+
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set_result, None)
+            self._stop = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,136 @@
+"""
+Local stand-in for the fingerprint API, for tests that must not call the paid API.
+
+Every request returns a new fingerprint in the format of the fingerprint API. Screen sizes and browser versions cycle
+through a few values, within the bounds of the request.
+"""
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+SCREEN_SIZES: List[Tuple[int, int]] = [(1920, 1080), (1366, 768), (1536, 864), (1440, 900)]
+BROWSER_VERSIONS: List[int] = [118, 119, 120, 121]
+
+
+class FingerprintServer:
+    """Stand-in fingerprint API server running in a thread."""
+
+    port: int
+    latency: float
+    fail_every: int
+
+    requests: int
+    paths: List[str]
+    # Requests being answered now, and the most at any time.
+    in_flight: int
+    max_in_flight: int
+
+    def __init__(self, port: int, latency: float = 0.0, fail_every: int = 0) -> None:
+        """
+        Initialize FingerprintServer.
+
+        :param port: The port to listen on.
+        :param latency: Seconds to wait before every response.
+        :param fail_every: Answer every n-th request with HTTP 503, 0 to never fail.
+        """
+
+        self.port = port
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.paths = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._server: Union[ThreadingHTTPServer, None] = None
+        self._thread: Union[threading.Thread, None] = None
+
+    @property
+    def base_url(self) -> str:
+        """The URL to use instead of FINGERPRINT_BASE_URL."""
+        return f"http://127.0.0.1:{self.port}/prepare?version=5"
+
+    def fingerprint(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Build the next fingerprint for a request."""
+
+        num = next(self._counter)
+        max_width = int(query.get("max_width", ["1920"])[0])
+        max_height = int(query.get("max_height", ["1080"])[0])
+        min_browser_version = int(query.get("min_browser_version", ["117"])[0])
+
+        sizes = [size for size in SCREEN_SIZES if size[0] <= max_width and size[1] <= max_height] or SCREEN_SIZES
+        width, height = sizes[num % len(sizes)]
+        versions = [version for version in BROWSER_VERSIONS if version >= min_browser_version] or BROWSER_VERSIONS
+        version = versions[num % len(versions)]
+        tags = query.get("tags", ["Microsoft Windows,Chrome"])[0].split(",")
+
+        return {
+            "valid": True,
+            "width": width,
+            "height": height,
+            "availWidth": width,
+            "availHeight": height - 40,
+            "ua": (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                f"Chrome/{version}.0.0.0 Safari/537.36"
+            ),
+            "tags": tags,
+            "perfectcanvas": {"seed": num},
+        }
+
+    def start(self) -> None:
+        """Start serving in a thread."""
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                with server._lock:
+                    server.requests += 1
+                    server.paths.append(self.path)
+                    num = server.requests
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                with server._lock:
+                    server.in_flight -= 1
+
+                if server.fail_every and num % server.fail_every == 0:
+                    status, body = 503, b"Service Unavailable"
+                else:
+                    query = parse_qs(urlparse(self.path).query)
+                    status, body = 200, json.dumps(server.fingerprint(query)).encode("utf-8")
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fingerprint-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving."""
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,140 @@
+"""
+Local stand-in for an HTTP proxy, for tests that must not go through real proxies.
+
+The proxy does not forward requests, it answers every plain HTTP request itself like an external IP service would,
+e.g. https://lumtest.com/myip.json. The external IP is derived from the proxy username, so that every session of a
+rotating proxy gets its own IP.
+"""
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Set, Union
+
+
+def external_ip(username: str) -> str:
+    """Return the external IP of the proxy for a username."""
+
+    digest = hashlib.sha256(username.encode("utf-8")).digest()
+    return f"10.{digest[0]}.{digest[1]}.{digest[2]}"
+
+
+class HTTPProxyServer:
+    """Stand-in HTTP proxy server running in a thread."""
+
+    port: int
+    password: Union[str, None]
+    latency: float
+    fail_every: int
+    # Usernames whose requests fail with HTTP 502.
+    failing: Set[str]
+
+    requests: int
+    usernames: List[str]
+    # Requests being answered now, and the most at any time.
+    in_flight: int
+    max_in_flight: int
+
+    def __init__(self, port: int, password: Union[str, None] = None, latency: float = 0.0, fail_every: int = 0) -> None:
+        """
+        Initialize HTTPProxyServer.
+
+        :param port: The port to listen on.
+        :param password: The proxy password, any username is accepted with it. None to accept requests without one.
+        :param latency: Seconds to wait before every response.
+        :param fail_every: Answer every n-th request with HTTP 502, 0 to never fail.
+        """
+
+        self.port = port
+        self.password = password
+        self.latency = latency
+        self.fail_every = fail_every
+        self.failing = set()
+        self.requests = 0
+        self.usernames = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self._lock = threading.Lock()
+        self._server: Union[ThreadingHTTPServer, None] = None
+        self._thread: Union[threading.Thread, None] = None
+
+    def answer(self, username: str) -> Dict[str, Any]:
+        """Build the external IP response for a username."""
+
+        return {
+            "ip": external_ip(username),
+            "country": "US",
+            "asn": {"asnum": 64512, "org_name": "Stand-in Proxy"},
+            "geo": {"city": "Ashburn", "region": "VA", "region_name": "Virginia", "tz": "America/New_York"},
+        }
+
+    def start(self) -> None:
+        """Start serving in a thread."""
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, status: int, body: bytes, headers: Union[Dict[str, str], None] = None) -> None:
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _credentials(self) -> Union[List[str], None]:
+                authorization = self.headers.get("Proxy-Authorization", "")
+                if not authorization.startswith("Basic "):
+                    return None
+                return base64.b64decode(authorization[6:]).decode("utf-8").split(":", 1)
+
+            def do_GET(self) -> None:  # noqa: N802
+                credentials = self._credentials()
+                username = credentials[0] if credentials else ""
+
+                with server._lock:
+                    server.requests += 1
+                    server.usernames.append(username)
+                    num = server.requests
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                with server._lock:
+                    server.in_flight -= 1
+
+                if server.password is not None and (credentials is None or credentials[1] != server.password):
+                    self._respond(407, b"Proxy Authentication Required", {"Proxy-Authenticate": 'Basic realm="proxy"'})
+                elif username in server.failing or (server.fail_every and num % server.fail_every == 0):
+                    self._respond(502, b"Bad Gateway")
+                else:
+                    self._respond(200, json.dumps(server.answer(username)).encode("utf-8"))
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # Connections beyond the listen backlog are retried by the client after a second.
+            request_queue_size = 128
+
+        self._server = Server(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="http-proxy-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving."""
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
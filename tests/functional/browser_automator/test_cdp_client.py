@@ -0,0 +1,224 @@
+import asyncio
+import time
+from typing import List
+
+import pytest
+
+from pybas_automation.browser_automator import CDPClient
+from pybas_automation.browser_automator.cdp_client import (
+    CDPCommandError,
+    CDPConnectionClosedError,
+    CDPEventOverflowEnum,
+)
+from pybas_automation.browser_automator.models import CDPCommand, WebsocketUrl, WsUrlModel
+from tests.contrib.cdp_server.server import CDPServer
+
+
+def _ws_endpoint(cdp_server: CDPServer) -> WsUrlModel:
+    return WsUrlModel(ws_url=WebsocketUrl(cdp_server.ws_url))
+
+
+class TestCDPClient:
+    @pytest.mark.asyncio
+    async def test_send_command(self, cdp_server: CDPServer) -> None:
+        """
+        Test sending commands over one connection.
+
+        This test checks:
+        - All commands share one connection
+        - Concurrent commands get their own responses, even out of order
+        - Errors are raised per command
+        """
+
+        cdp_server.latency = 0.2
+
+        async with CDPClient(_ws_endpoint(cdp_server)) as cdp_client:
+            data = await cdp_client.send_command("Browser.getVersion")
+            assert "Chrome/" in data["product"]
+            assert await cdp_client.send_command("DOMStorage.enable") == {}
+
+            started = time.monotonic()
+            results = await asyncio.gather(
+                cdp_client.send_command("Test.sleep", params={"seconds": 0.3}),
+                cdp_client.send_command("Target.getTargets"),
+                *(cdp_client.send_command("Browser.getVersion") for _ in range(20)),
+            )
+            assert time.monotonic() - started < 1
+            assert cdp_server.max_in_flight > 20
+            assert results[0] == {}
+            assert results[1]["targetInfos"][0]["attached"] is True
+            assert all("Chrome/" in result["product"] for result in results[2:])
+
+            with pytest.raises(CDPCommandError):
+                await cdp_client.send_command("Test.fail")
+
+        assert cdp_server.connections == 1
+        assert cdp_client.connected is False
+
+        with pytest.raises(RuntimeError):
+            await cdp_client.send_command("Browser.getVersion")
+
+    @pytest.mark.asyncio
+    async def test_send_many(self, cdp_server: CDPServer) -> None:
+        """
+        Test sending a batch of commands at once.
+
+        This test checks:
+        - The commands are written without waiting for the responses
+        - The results are in the order of the commands, a failed command does not fail the others
+        - The commands go to the given session
+        """
+
+        cdp_server.latency = 0.2
+
+        async with CDPClient(_ws_endpoint(cdp_server)) as cdp_client:
+            data = await cdp_client.send_command("Target.attachToTarget", params={"targetId": "1", "flatten": True})
+            session_id = data["sessionId"]
+
+            commands = [
+                CDPCommand(method="Network.setCacheDisabled", params={"cacheDisabled": False}),
+                CDPCommand(method="Test.fail"),
+                CDPCommand(method="DOMStorage.enable"),
+            ] + [CDPCommand(method="Browser.getVersion") for _ in range(10)]
+
+            started = time.monotonic()
+            results = await cdp_client.send_many(commands, session_id=session_id)
+            assert time.monotonic() - started < 0.4
+
+            assert [result.method for result in results] == [command.method for command in commands]
+            assert results[0].ok is True
+            assert results[0].result == {}
+            assert results[1].ok is False
+            assert results[1].error_type == "CDPCommandError"
+            assert results[1].result is None
+            assert all(result.ok and "Chrome/" in result.result["product"] for result in results[3:])  # type: ignore
+
+        assert cdp_server.session_ids[0] is None
+        assert cdp_server.session_ids[1:] == [session_id] * len(commands)
+
+    @pytest.mark.asyncio
+    async def test_connection_closed(self, cdp_server: CDPServer) -> None:
+        """Test commands waiting for a response fail when the connection is closed."""
+
+        cdp_client = CDPClient(_ws_endpoint(cdp_server), timeout=5)
+        await cdp_client.connect()
+
+        task = asyncio.create_task(cdp_client.send_command("Test.sleep", params={"seconds": 10}))
+        await asyncio.sleep(0.1)
+        await cdp_client.close()
+
+        with pytest.raises(CDPConnectionClosedError):
+            await task
+
+    @pytest.mark.asyncio
+    async def test_events(self, cdp_server: CDPServer) -> None:
+        """Test subscribers get the events matching their patterns and session."""
+
+        async with CDPClient(_ws_endpoint(cdp_server)) as cdp_client:
+            network = cdp_client.events("Network.*")
+            page = cdp_client.events("Page.loadEventFired", session_id="session-1")
+
+            await cdp_client.send_command("Test.emit", params={"method": "Network.requestWillBeSent", "count": 3})
+            await cdp_client.send_command("Test.emit", params={"method": "Runtime.consoleAPICalled", "count": 3})
+            await cdp_client.send_command("Test.emit", params={"method": "Page.loadEventFired"})
+            await cdp_client.send_command(
+                "Test.emit", params={"method": "Page.loadEventFired", "count": 2}, session_id="session-1"
+            )
+            # The events are handed out in the background, the response to a later command comes after them.
+            await cdp_client.send_command("Browser.getVersion")
+            await asyncio.sleep(0.1)
+
+            network.close()
+            assert [(event.method, event.params["num"]) async for event in network] == []
+
+            await cdp_client.send_command("Test.emit", params={"method": "Network.dataReceived"})
+            await asyncio.sleep(0.1)
+
+        events = [event async for event in page]
+        assert [(event.method, event.session_id) for event in events] == [("Page.loadEventFired", "session-1")] * 2
+        assert page.closed
+        assert cdp_client.events_dropped == 0
+
+    @pytest.mark.asyncio
+    async def test_events_overflow(self, cdp_server: CDPServer) -> None:
+        """Test a full queue drops the oldest events, or holds up the events while the backlog has room."""
+
+        async with CDPClient(_ws_endpoint(cdp_server)) as cdp_client:
+            async with cdp_client.events("Test.drop", maxsize=10) as dropping, cdp_client.events(
+                "Test.block", maxsize=10, overflow=CDPEventOverflowEnum.BLOCK
+            ) as blocking:
+                await cdp_client.send_command("Test.emit", params={"method": "Test.drop", "count": 100})
+                await cdp_client.send_command("Test.emit", params={"method": "Test.block", "count": 100})
+
+                # Commands are answered while the blocking subscriber does not take its events.
+                start = time.perf_counter()
+                result = await cdp_client.send_command("Browser.getVersion")
+                assert result["product"]
+                assert time.perf_counter() - start < 1
+
+                received = []
+                async for event in blocking:
+                    received.append(event.params["num"])
+                    if len(received) == 100:
+                        break
+                assert received == list(range(100))
+                assert blocking.dropped == 0
+
+                assert dropping.dropped == 90
+                for num in range(90, 100):
+                    kept = await dropping.get()
+                    assert kept is not None
+                    assert kept.params["num"] == num
+
+            assert dropping.closed and blocking.closed
+            assert await dropping.get() is None
+
+            with pytest.raises(RuntimeError):
+                CDPClient(_ws_endpoint(cdp_server)).events("Network.*")
+
+    @pytest.mark.asyncio
+    async def test_events_backlog(self, cdp_server: CDPServer) -> None:
+        """Test events beyond the backlog are dropped, also for blocking subscribers, and counted on them."""
+
+        async with CDPClient(_ws_endpoint(cdp_server), event_backlog=50) as cdp_client:
+            blocking = cdp_client.events("Test.block", maxsize=10, overflow=CDPEventOverflowEnum.BLOCK)
+            other_session = cdp_client.events("Test.*", session_id="session-9")
+            other_method = cdp_client.events("Network.*")
+
+            await cdp_client.send_command("Test.emit", params={"method": "Test.block", "count": 200})
+            assert blocking.dropped > 0
+            assert blocking.dropped == cdp_client.events_dropped
+            assert other_session.dropped == 0 and other_method.dropped == 0
+
+            # The events kept are the first ones, in order.
+            received = []
+            for _ in range(200 - blocking.dropped):
+                event = await asyncio.wait_for(blocking.get(), timeout=5)
+                assert event is not None
+                received.append(event.params["num"])
+            assert received == list(range(200 - blocking.dropped))
+
+    @pytest.mark.asyncio
+    async def test_events_connection_lost(self, cdp_server: CDPServer) -> None:
+        """Test subscriptions end when the connection to the browser is lost, after their queued events."""
+
+        async with CDPClient(_ws_endpoint(cdp_server)) as cdp_client:
+            subscription = cdp_client.events("Network.*")
+            await cdp_client.send_command("Test.emit", params={"method": "Network.requestWillBeSent", "count": 3})
+
+            async def consume() -> List[int]:
+                return [event.params["num"] async for event in subscription]
+
+            consumer = asyncio.create_task(consume())
+            await asyncio.sleep(0.1)
+            assert not consumer.done()
+
+            # The server waits for the client to answer its close frame.
+            await asyncio.to_thread(cdp_server.stop)
+            assert await asyncio.wait_for(consumer, timeout=5) == [0, 1, 2]
+            assert subscription.closed
+            assert await subscription.get() is None
+            assert not cdp_client.connected
+
+            with pytest.raises(RuntimeError):
+                cdp_client.events("Network.*")
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from pybas_automation.browser_profile import BrowserProfile, BrowserProfileStorage, FingerprintBlobStore
+from pybas_automation.browser_profile.blob_store import FingerprintBlobNotFoundError
+from pybas_automation.browser_profile.storage import fingerprint_hash
+
+
+class TestFingerprintBlobStore:
+    def test_blob_store(self, fingerprint_str: str) -> None:
+        """
+        Test storing fingerprints in the blob store.
+
+        This test checks:
+        - A fingerprint is stored once under its hash, compressed
+        - Statistics count references and sizes
+        - Unreferenced blobs are pruned
+        """
+
+        blob_store = FingerprintBlobStore()
+
+        fingerprint_hash_1 = blob_store.put(fingerprint_raw=fingerprint_str)
+        assert fingerprint_hash_1 == fingerprint_hash(fingerprint_str)
+        assert blob_store.put(fingerprint_raw=fingerprint_str.encode("utf-8")) == fingerprint_hash_1
+        assert blob_store.exists(fingerprint_hash=fingerprint_hash_1) is True
+        assert blob_store.get(fingerprint_hash=fingerprint_hash_1) == fingerprint_str
+
+        fingerprint_hash_2 = blob_store.put(fingerprint_raw='{"valid": true}')
+        assert blob_store.get(fingerprint_hash=fingerprint_hash_2) == '{"valid": true}'
+
+        with pytest.raises(FingerprintBlobNotFoundError):
+            blob_store.get(fingerprint_hash=fingerprint_hash("missing"))
+
+        references = [fingerprint_hash_1] * 3 + [fingerprint_hash_2, fingerprint_hash("missing")]
+        stats = blob_store.stats(references=references)
+        assert stats.blobs == 2
+        assert stats.references == 4
+        assert stats.unique_bytes == len(fingerprint_str.encode("utf-8")) + len('{"valid": true}')
+        assert stats.logical_bytes == 3 * len(fingerprint_str.encode("utf-8")) + len('{"valid": true}')
+        assert stats.stored_bytes < stats.unique_bytes
+        assert stats.dedupe_ratio > 2
+        assert stats.compression_ratio > 1
+        assert stats.saved_bytes > 0
+
+        assert blob_store.prune(references=[fingerprint_hash_1]) == 1
+        assert blob_store.exists(fingerprint_hash=fingerprint_hash_2) is False
+        assert blob_store.exists(fingerprint_hash=fingerprint_hash_1) is True
+
+        # A missing store directory is noticed when a blob is read
+        missing_blob_store = FingerprintBlobStore(store_dir=blob_store.store_dir.joinpath("missing"))
+        assert missing_blob_store.exists(fingerprint_hash=fingerprint_hash_1) is False
+        with pytest.raises(FingerprintBlobNotFoundError):
+            missing_blob_store.get(fingerprint_hash=fingerprint_hash_1)
+        assert missing_blob_store.stats().blobs == 0
+
+        browser_profile = BrowserProfile()
+        browser_profile.use_fingerprint_blob(missing_blob_store.ref(fingerprint_hash=fingerprint_hash_1))
+        assert browser_profile.fingerprint_raw is None
+
+    def test_storage(self, fingerprint_str: str) -> None:
+        """
+        Test browser profile storages keeping their fingerprints in a shared blob store.
+
+        This test checks:
+        - Profiles refer to the blob, no fingerprint file is written
+        - Loaded profiles read the fingerprint from the blob store
+        - Fingerprint files are moved into the blob store and written back for BAS
+        """
+
+        blob_store = FingerprintBlobStore()
+
+        browser_profile_storage = BrowserProfileStorage(blob_store=blob_store)
+        browser_profile_1 = browser_profile_storage.new(fingerprint_raw=fingerprint_str, profile_name="cool_profile_1")
+        browser_profile_2 = browser_profile_storage.new(fingerprint_raw=fingerprint_str, profile_name="cool_profile_2")
+
+        fingerprint_filename = browser_profile_1.profile_dir.joinpath(".pybas", "fingerprint_raw.json")
+        assert fingerprint_filename.exists() is False
+        assert browser_profile_1.fingerprint_blob_ref is not None
+        assert browser_profile_1.fingerprint_blob_ref == browser_profile_2.fingerprint_blob_ref
+        assert browser_profile_1.fingerprint_raw == fingerprint_str
+
+        stats = browser_profile_storage.fingerprint_stats()
+        assert stats.blobs == 1
+        assert stats.references == 2
+        assert stats.dedupe_ratio == 2
+
+        # Another storage without a blob store reads the references too.
+        browser_profile = BrowserProfileStorage().load(profile_name="cool_profile_1")
+        assert browser_profile.fingerprint_file_path is None
+        assert browser_profile.fingerprint_raw == fingerprint_str
+        assert BrowserProfileStorage().entries()[0].fingerprint_hash == fingerprint_hash(fingerprint_str)
+
+        assert browser_profile_storage.materialize(profile_name="cool_profile_1") == fingerprint_filename
+        assert fingerprint_filename.read_text(encoding="utf-8") == fingerprint_str
+        assert browser_profile_storage.load(profile_name="cool_profile_1").fingerprint_file_path == fingerprint_filename
+
+        # Profiles saved without a blob store are moved into it.
+        BrowserProfileStorage().new(fingerprint_raw='{"valid": true}', profile_name="cool_profile_3")
+        assert browser_profile_storage.pack_fingerprints() == 2
+        assert fingerprint_filename.exists() is False
+        assert os.listdir(browser_profile_2.profile_dir.joinpath(".pybas")) == ["fingerprint_raw.ref.json"]
+        assert browser_profile_storage.load(profile_name="cool_profile_3").fingerprint_raw == '{"valid": true}'
+
+        stats = browser_profile_storage.fingerprint_stats()
+        assert stats.blobs == 2
+        assert stats.references == 3
@@ -1,9 +1,15 @@
 import json
 import os
+import shutil
+from typing import List
 
 import pytest
+from _pytest.monkeypatch import MonkeyPatch
 
-from pybas_automation.browser_profile import BrowserProfile, BrowserProfileStorage
+from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy
+from pybas_automation.browser_profile import BrowserProfile, BrowserProfileStorage, BrowserProfileStorageLayoutEnum
+from pybas_automation.browser_profile.models import BrowserProfileManifestEntry
+from pybas_automation.browser_profile.storage import fingerprint_hash, profile_shard
 
 
 @pytest.mark.vcr()
@@ -94,3 +100,245 @@ class TestBrowserProfileStorage:
         # Deserialize the serialized data back into a profile object
         deserialized = BrowserProfile(**json.loads(serialized))
         assert deserialized is not None
+        assert deserialized.fingerprint_raw == fingerprint_str
+
+    def test_manifest(self, fingerprint_str: str) -> None:
+        """
+        Test the manifest of the browser profile storage.
+
+        This test checks:
+        - Every save updates the manifest entry of the profile
+        - Profiles are counted, listed and filtered from the manifest
+        - Profiles added or removed by other means are picked up, without scanning the known profiles again
+        - The manifest is rebuilt from the profile directories when it is missing
+        """
+
+        browser_profile_storage = BrowserProfileStorage()
+        browser_profile_storage.manifest_compact_threshold = 3
+        assert browser_profile_storage.entries() == []
+        assert browser_profile_storage.manifest_file_path.exists() is False
+
+        for num in range(0, 5):
+            browser_profile_storage.new(fingerprint_raw=fingerprint_str, profile_name=f"cool_profile_{num}")
+
+        # A stray file is not a profile
+        browser_profile_storage.storage_dir.joinpath("stray.txt").write_text("stray", encoding="utf-8")
+
+        browser_profile = browser_profile_storage.load(profile_name="cool_profile_3")
+        browser_profile.proxy = BasActionBrowserProxy(server="127.0.0.1", port=8080)
+        browser_profile_storage.save(browser_profile=browser_profile)
+
+        assert browser_profile_storage.count() == 5
+        entries = browser_profile_storage.entries()
+        assert [entry.profile_name for entry in entries] == [f"cool_profile_{num}" for num in range(0, 5)]
+        assert entries[0].fingerprint_hash == fingerprint_hash(fingerprint_str)
+        assert entries[0].last_used_at is None
+
+        assert [entry.profile_name for entry in browser_profile_storage.entries(has_proxy=True)] == ["cool_profile_3"]
+        assert len(browser_profile_storage.entries(has_proxy=False)) == 4
+        assert len(browser_profile_storage.entries(fingerprint_hash=fingerprint_hash(fingerprint_str))) == 5
+        assert browser_profile_storage.entries(fingerprint_hash="unknown") == []
+
+        # Another storage instance sees the same manifest, and the profile it uses
+        new_browser_profile_storage = BrowserProfileStorage()
+        used_entry = new_browser_profile_storage.touch(profile_name="cool_profile_1")
+        assert used_entry.last_used_at is not None
+        assert used_entry.created_at == entries[1].created_at
+        with pytest.raises(FileNotFoundError):
+            new_browser_profile_storage.touch(profile_name="unknown_profile")
+
+        unused = browser_profile_storage.entries(unused_since=used_entry.last_used_at)
+        assert "cool_profile_1" not in [entry.profile_name for entry in unused]
+        assert len(unused) == 4
+
+        # Profiles added or removed by other means change the storage directory
+        storage_dir = browser_profile_storage.storage_dir
+        shutil.copytree(storage_dir.joinpath("cool_profile_0"), storage_dir.joinpath("copied_profile"))
+        shutil.rmtree(storage_dir.joinpath("cool_profile_2"))
+        new_browser_profile_storage = BrowserProfileStorage()
+        scanned: List[str] = []
+        scan_entry = new_browser_profile_storage._scan_entry  # pylint: disable=protected-access
+
+        def _scan_entry(profile_name: str) -> BrowserProfileManifestEntry:
+            scanned.append(profile_name)
+            return scan_entry(profile_name=profile_name)
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(new_browser_profile_storage, "_scan_entry", _scan_entry)
+        try:
+            assert [entry.profile_name for entry in new_browser_profile_storage.entries()] == [
+                "cool_profile_0",
+                "cool_profile_1",
+                "cool_profile_3",
+                "cool_profile_4",
+                "copied_profile",
+            ]
+        finally:
+            monkeypatch.undo()
+        assert scanned == ["copied_profile"]
+        assert new_browser_profile_storage.entries()[1].last_used_at == used_entry.last_used_at
+        assert browser_profile_storage.count() == 5
+
+        # The manifest is rebuilt from the profile directories, the timestamps are kept if possible
+        browser_profile_storage.manifest_file_path.unlink()
+        if browser_profile_storage.manifest_journal_file_path.exists():
+            browser_profile_storage.manifest_journal_file_path.unlink()
+        assert BrowserProfileStorage().count() == 5
+        assert BrowserProfileStorage().entries(has_proxy=True)[0].proxy == browser_profile.proxy
+
+    def test_load_all_refresh(self, fingerprint_str: str) -> None:
+        """
+        Test that load_all() keeps one instance per profile and refreshes only what changed.
+
+        This test checks:
+        - Calling load_all() again does not duplicate or reload the profiles
+        - Changed and new profiles are loaded again, removed ones are dropped
+        """
+
+        browser_profile_storage = BrowserProfileStorage()
+        for num in range(0, 3):
+            browser_profile_storage.new(fingerprint_raw=fingerprint_str, profile_name=f"cool_profile_{num}")
+
+        profiles = {os.path.basename(p.profile_dir): p for p in browser_profile_storage.load_all()}
+        assert len(profiles) == 3
+
+        reloaded = {os.path.basename(p.profile_dir): p for p in browser_profile_storage.load_all()}
+        assert len(reloaded) == 3
+        for profile_name, browser_profile in profiles.items():
+            assert reloaded[profile_name] is browser_profile
+
+        # Changed by another storage instance
+        other_browser_profile_storage = BrowserProfileStorage()
+        browser_profile = other_browser_profile_storage.load(profile_name="cool_profile_1")
+        browser_profile.proxy = BasActionBrowserProxy(server="127.0.0.1", port=8080)
+        other_browser_profile_storage.save(browser_profile=browser_profile)
+        other_browser_profile_storage.new(fingerprint_raw=fingerprint_str, profile_name="cool_profile_3")
+        shutil.rmtree(browser_profile_storage.storage_dir.joinpath("cool_profile_0"))
+
+        reloaded = {os.path.basename(p.profile_dir): p for p in browser_profile_storage.load_all()}
+        assert sorted(reloaded) == ["cool_profile_1", "cool_profile_2", "cool_profile_3"]
+        assert reloaded["cool_profile_1"] is not profiles["cool_profile_1"]
+        assert reloaded["cool_profile_1"].proxy == browser_profile.proxy
+        assert reloaded["cool_profile_2"] is profiles["cool_profile_2"]
+
+    def test_lazy_fingerprint(self, fingerprint_str: str) -> None:
+        """
+        Test that the fingerprint of a loaded profile is read only when it is accessed.
+
+        This test checks:
+        - Loading and saving a profile does not read or rewrite its fingerprint
+        - fingerprint_raw and fingerprint_mmap() read the fingerprint file on access
+        - A fingerprint set in memory is written on save
+        """
+
+        browser_profile_storage = BrowserProfileStorage()
+        browser_profile = browser_profile_storage.new(fingerprint_raw=fingerprint_str, profile_name="cool_profile")
+        fingerprint_filename = browser_profile.profile_dir.joinpath(".pybas", "fingerprint_raw.json")
+
+        # The fingerprint is dropped from memory once it is saved
+        assert browser_profile.fingerprint_file_path == fingerprint_filename
+        assert browser_profile.fingerprint_raw == fingerprint_str
+
+        profiles = BrowserProfileStorage().load_all()
+        assert len(profiles) == 1
+        browser_profile = profiles[0]
+        assert browser_profile.fingerprint_file_path == fingerprint_filename
+
+        mtime_ns = os.stat(fingerprint_filename).st_mtime_ns
+        browser_profile.proxy = BasActionBrowserProxy(server="127.0.0.1", port=8080)
+        browser_profile_storage.save(browser_profile=browser_profile)
+        assert os.stat(fingerprint_filename).st_mtime_ns == mtime_ns
+
+        with browser_profile.fingerprint_mmap() as mapped:
+            assert mapped is not None
+            assert bytes(mapped) == fingerprint_str.encode("utf-8")
+
+        # Always the current file contents
+        fingerprint_filename.write_text('{"valid": true}', encoding="utf-8")
+        assert browser_profile.fingerprint_raw == '{"valid": true}'
+
+        browser_profile.fingerprint_raw = fingerprint_str
+        assert browser_profile.model_dump(mode="json")["fingerprint_raw"] == fingerprint_str
+        assert fingerprint_str not in repr(browser_profile)
+        browser_profile_storage.save(browser_profile=browser_profile)
+        assert fingerprint_filename.read_text(encoding="utf-8") == fingerprint_str
+        assert browser_profile_storage.entries()[0].fingerprint_hash == fingerprint_hash(fingerprint_str)
+
+        with BrowserProfile().fingerprint_mmap() as mapped:
+            assert mapped is None
+
+    def test_sharded(self, fingerprint_str: str) -> None:
+        """
+        Test the sharded layout of the storage.
+
+        This test checks:
+        - Profiles are created in shard directories given by the hash of their name
+        - Profiles are loaded and listed by name
+        - A flat storage is migrated, and the layout is picked up by other instances
+        """
+
+        browser_profile_storage = BrowserProfileStorage()
+        browser_profile_storage.new(fingerprint_raw=fingerprint_str, profile_name="cool_profile_1")
+        browser_profile_storage.new(fingerprint_raw=fingerprint_str)
+        assert browser_profile_storage.layout == BrowserProfileStorageLayoutEnum.FLAT
+
+        with pytest.raises(ValueError):
+            BrowserProfileStorage(layout=BrowserProfileStorageLayoutEnum.SHARDED)
+
+        assert browser_profile_storage.migrate_to_sharded() == 2
+        assert browser_profile_storage.migrate_to_sharded() == 0
+        assert browser_profile_storage.layout == BrowserProfileStorageLayoutEnum.SHARDED
+
+        browser_profile_storage = BrowserProfileStorage()
+        assert browser_profile_storage.layout == BrowserProfileStorageLayoutEnum.SHARDED
+
+        profile_dir = browser_profile_storage.storage_dir.joinpath(*profile_shard("cool_profile_1"), "cool_profile_1")
+        assert browser_profile_storage.profile_dir(profile_name="cool_profile_1") == profile_dir
+        assert browser_profile_storage.load(profile_name="cool_profile_1").fingerprint_raw == fingerprint_str
+
+        browser_profile = browser_profile_storage.new(fingerprint_raw=fingerprint_str)
+        profile_name = browser_profile.profile_dir.name
+        assert len(profile_name) == 32
+        assert browser_profile.profile_dir == browser_profile_storage.profile_dir(profile_name=profile_name)
+
+        assert browser_profile_storage.count() == 3
+        assert sorted(browser_profile_storage.iter_profile_names()) == sorted(
+            entry.profile_name for entry in browser_profile_storage.entries()
+        )
+        assert len(browser_profile_storage.load_all()) == 3
+
+        manifest = browser_profile_storage.manifest()
+        assert browser_profile_storage.rebuild_manifest().profiles.keys() == manifest.profiles.keys()
+
+    def test_new_many(self, fingerprint_str: str) -> None:
+        """
+        Test creating many browser profiles concurrently.
+
+        This test checks:
+        - All profiles are created and added to the manifest
+        - A failing profile is reported and removed, the others are created anyway
+        """
+
+        calls: List[int] = []
+
+        def proxy_factory() -> BasActionBrowserProxy:
+            calls.append(len(calls))
+            if len(calls) % 5 == 0:
+                raise ValueError("no proxy left")
+            return BasActionBrowserProxy(server="127.0.0.1", port=8080 + len(calls))
+
+        browser_profile_storage = BrowserProfileStorage()
+        result = browser_profile_storage.new_many(
+            n=20, concurrency=4, proxy_factory=proxy_factory, fingerprint_raw=fingerprint_str
+        )
+
+        assert len(result.profiles) == 16
+        assert len(result.failures) == 4
+        assert result.failures[0].error_type == "ValueError"
+        assert result.failures[0].error == "no proxy left"
+
+        assert browser_profile_storage.count() == 16
+        # The manifest and the lock file, the journal was folded into the manifest when the profiles were counted
+        assert len(os.listdir(browser_profile_storage.storage_dir)) == 16 + 2
+        assert len({entry.proxy.port for entry in browser_profile_storage.entries() if entry.proxy is not None}) == 16
+        assert result.profiles[0].fingerprint_raw == fingerprint_str
@@ -0,0 +1,77 @@
+import json
+
+from pybas_automation.browser_profile import BrowserProfileStorage, FingerprintCatalog
+from pybas_automation.fingerprint import parse_fingerprint_attributes
+
+
+def _fingerprint(width: int, height: int, browser_version: int, tags: str = "Microsoft Windows,Chrome") -> str:
+    user_agent = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        f"Chrome/{browser_version}.0.0.0 Safari/537.36"
+    )
+    return json.dumps({"width": width, "height": height, "ua": user_agent, "tags": tags, "valid": True})
+
+
+class TestFingerprintCatalog:
+    def test_parse_fingerprint_attributes(self) -> None:
+        """Test extracting the attributes of a fingerprint."""
+
+        attributes = parse_fingerprint_attributes(_fingerprint(1920, 1080, 120))
+        assert attributes.width == 1920
+        assert attributes.height == 1080
+        assert attributes.browser_version == 120
+        assert attributes.platform == "Windows"
+        assert attributes.tags == ["Microsoft Windows", "Chrome"]
+
+        attributes = parse_fingerprint_attributes({"valid": True})
+        assert attributes.browser_version == 0
+        assert attributes.platform == ""
+
+    def test_catalog(self) -> None:
+        """
+        Test the fingerprint catalog of a browser profile storage.
+
+        This test checks:
+        - Profiles are selected by screen size, browser version, platform and tags
+        - The catalog is stored next to the profiles and read back
+        - Refreshing parses only new and changed fingerprints
+        """
+
+        browser_profile_storage = BrowserProfileStorage()
+        sizes = [(1920, 1080), (1366, 768), (1920, 1080), (1536, 864)]
+        for num, (width, height) in enumerate(sizes):
+            browser_profile_storage.new(
+                fingerprint_raw=_fingerprint(width, height, 118 + num), profile_name=f"cool_profile_{num}"
+            )
+
+        catalog = browser_profile_storage.fingerprint_catalog()
+        assert len(catalog) == 4
+        assert browser_profile_storage.catalog_file_path.exists() is True
+
+        assert catalog.query(width=1920, height=1080) == ["cool_profile_0", "cool_profile_2"]
+        assert catalog.query(width=1920, height=1080, min_browser_version=120) == ["cool_profile_2"]
+        assert catalog.query(min_browser_version=119, max_browser_version=120) == ["cool_profile_1", "cool_profile_2"]
+        assert catalog.query(height=768) == ["cool_profile_1"]
+        assert catalog.query(platform="Windows", tags=["Chrome"]) == [f"cool_profile_{num}" for num in range(4)]
+        assert catalog.query(platform="macOS") == []
+        assert catalog.query(tags=["Firefox"]) == []
+        assert catalog.row("cool_profile_3").attributes.width == 1536
+        assert "cool_profile_4" not in catalog
+
+        # Another storage reads the stored catalog.
+        stored = BrowserProfileStorage().fingerprint_catalog(refresh=False)
+        assert isinstance(stored, FingerprintCatalog)
+        assert stored.data == catalog.data
+
+        # Nothing changed, the catalog is not rewritten.
+        assert browser_profile_storage.fingerprint_catalog() is catalog
+
+        browser_profile = browser_profile_storage.load(profile_name="cool_profile_0")
+        browser_profile.fingerprint_raw = _fingerprint(2560, 1440, 121)
+        browser_profile_storage.save(browser_profile=browser_profile)
+        browser_profile_storage.new(fingerprint_raw=_fingerprint(1920, 1080, 122), profile_name="cool_profile_4")
+
+        catalog = browser_profile_storage.fingerprint_catalog()
+        assert len(catalog) == 5
+        assert catalog.query(width=1920, height=1080, min_browser_version=120) == ["cool_profile_2", "cool_profile_4"]
+        assert catalog.query(width=2560) == ["cool_profile_0"]
@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy
+from pybas_automation.browser_profile import BrowserProfileStorage
+from pybas_automation.browser_profile.proxy import ProxyHealthChecker
+from tests.contrib.http_proxy.server import HTTPProxyServer, external_ip
+
+
+def _proxy(port: int, login: str, password: str = "test_pass") -> BasActionBrowserProxy:
+    return BasActionBrowserProxy(server="127.0.0.1", port=port, login=login, password=password)
+
+
+class TestProxyHealthChecker:
+    def test_check_many(self, http_proxy_server: HTTPProxyServer) -> None:
+        """
+        Test checking many proxies concurrently.
+
+        This test checks:
+        - Proxies are checked concurrently, within the concurrency limit
+        - External IP, geo and latency are reported, failures carry their reason
+        - Results are cached for the ttl
+        """
+
+        http_proxy_server.latency = 0.2
+        http_proxy_server.failing.add("user_3")
+        proxies = [_proxy(http_proxy_server.port, login=f"user_{num}") for num in range(20)]
+        proxies.append(_proxy(http_proxy_server.port, login="user_20", password="wrong_pass"))
+
+        checker = ProxyHealthChecker(concurrency=10, ttl=60)
+        started = time.monotonic()
+        results = checker.check_many(proxies)
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 2
+        assert http_proxy_server.requests == 21
+        assert http_proxy_server.max_in_flight <= 10
+
+        assert [result.proxy for result in results] == proxies
+        assert results[0].ok is True
+        assert results[0].ip == external_ip("user_0")
+        assert results[0].country == "US"
+        assert results[0].geo["city"] == "Ashburn"
+        assert results[0].latency is not None and results[0].latency >= 0.2
+
+        assert results[3].ok is False
+        assert results[3].error is not None and "Bad Gateway" in results[3].error
+        assert results[20].ok is False
+        assert results[20].error is not None and "Proxy Authentication Required" in results[20].error
+
+        # Cached results are returned without checking again, unless forced.
+        assert checker.check_many(proxies[:5]) == results[:5]
+        assert http_proxy_server.requests == 21
+        checker.check_many(proxies[:5], force=True)
+        assert http_proxy_server.requests == 26
+
+        checker.ttl = 0
+        assert checker.cached(proxies[0]) is None
+
+    def test_check_proxies(self, http_proxy_server: HTTPProxyServer) -> None:
+        """
+        Test checking the proxies of the profiles of a storage.
+
+        This test checks:
+        - A profile without a proxy is skipped
+        - The results are saved in the profile directories and used by the next check within the ttl
+        - Expired results are checked again
+        """
+
+        browser_profile_storage = BrowserProfileStorage()
+        for num in range(5):
+            browser_profile_storage.new(fingerprint_raw='{"valid": true}', profile_name=f"cool_profile_{num}")
+            if num == 0:
+                continue
+            browser_profile = browser_profile_storage.load(profile_name=f"cool_profile_{num}")
+            browser_profile.proxy = _proxy(http_proxy_server.port, login=f"user_{num}")
+            browser_profile_storage.save(browser_profile=browser_profile)
+
+        results = browser_profile_storage.check_proxies()
+        assert sorted(results) == [f"cool_profile_{num}" for num in range(1, 5)]
+        assert all(result.ok for result in results.values())
+        assert http_proxy_server.requests == 4
+
+        saved = browser_profile_storage.proxy_check(profile_name="cool_profile_1")
+        assert saved is not None
+        assert saved.ip == external_ip("user_1")
+        assert browser_profile_storage.proxy_check(profile_name="cool_profile_0") is None
+
+        # A new checker picks up the saved results.
+        assert BrowserProfileStorage().check_proxies() == results
+        assert http_proxy_server.requests == 4
+
+        # An expired result is checked again.
+        saved.checked_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        profile_dir = browser_profile_storage.profile_dir(profile_name="cool_profile_1")
+        profile_dir.joinpath(".pybas", "proxy_check.json").write_text(saved.model_dump_json(), encoding="utf-8")
+
+        results = BrowserProfileStorage().check_proxies()
+        assert http_proxy_server.requests == 5
+        assert results["cool_profile_1"].is_fresh(ttl=60) is True
@@ -0,0 +1,90 @@
+import itertools
+import json
+
+from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy
+from pybas_automation.browser_profile import BrowserProfileStorage, ProxyPool
+from tests.contrib.http_proxy.server import HTTPProxyServer
+
+
+class TestProxyPool:
+    def test_proxy_pool(self, http_proxy_server: HTTPProxyServer) -> None:
+        """
+        Test keeping profiles on healthy proxy sessions.
+
+        This test checks:
+        - Profiles on healthy sessions keep them
+        - Failing and slow sessions are rotated in bulk, the proxy files and the manifest are updated
+        - The health of the sessions is kept across pools
+        - Pools saving to the same storage merge their records
+        """
+
+        sessions = itertools.count()
+
+        def proxy_factory() -> BasActionBrowserProxy:
+            return BasActionBrowserProxy(
+                server="127.0.0.1", port=http_proxy_server.port, login=f"new_{next(sessions)}", password="test_pass"
+            )
+
+        browser_profile_storage = BrowserProfileStorage()
+        for num in range(5):
+            browser_profile_storage.new(fingerprint_raw='{"valid": true}', profile_name=f"cool_profile_{num}")
+        browser_profile_storage.set_proxies(
+            proxies={
+                f"cool_profile_{num}": BasActionBrowserProxy(
+                    server="127.0.0.1", port=http_proxy_server.port, login=f"user_{num}", password="test_pass"
+                )
+                for num in range(5)
+            }
+        )
+        old_proxies = {entry.profile_name: entry.proxy for entry in browser_profile_storage.entries()}
+
+        http_proxy_server.failing.update({"user_1", "user_2"})
+
+        proxy_pool = ProxyPool(storage=browser_profile_storage, proxy_factory=proxy_factory)
+        rotated = proxy_pool.refresh()
+        assert sorted(rotated) == ["cool_profile_1", "cool_profile_2"]
+
+        entries = {entry.profile_name: entry for entry in BrowserProfileStorage().entries()}
+        for profile_name, proxy in rotated.items():
+            assert entries[profile_name].proxy == proxy
+            profile_dir = browser_profile_storage.profile_dir(profile_name=profile_name)
+            proxy_data = json.loads(profile_dir.joinpath(".pybas", "proxy.json").read_text(encoding="utf-8"))
+            assert proxy_data["login"] == proxy.login
+        for profile_name in ["cool_profile_0", "cool_profile_3", "cool_profile_4"]:
+            assert entries[profile_name].proxy == old_proxies[profile_name]
+
+        # A slow session is rotated, the health recorded by an earlier pool counts.
+        slow_proxy = old_proxies["cool_profile_3"]
+        assert slow_proxy is not None
+        proxy_pool.record(proxy=slow_proxy, ok=True, latency=60)
+        proxy_pool.save()
+
+        proxy_pool = ProxyPool(storage=browser_profile_storage, proxy_factory=proxy_factory, max_latency=5)
+        stats = proxy_pool.stats(slow_proxy)
+        assert stats is not None
+        assert stats.requests == 2
+        assert proxy_pool.is_healthy(slow_proxy) is False
+        assert proxy_pool.assign(profile_name="cool_profile_0") == old_proxies["cool_profile_0"]
+        assert list(proxy_pool.rotate_failing()) == ["cool_profile_3"]
+
+        # A session that fails once after a success is given time to recover, one that keeps failing is rotated.
+        failing_proxy = old_proxies["cool_profile_4"]
+        assert failing_proxy is not None
+        proxy_pool.record(proxy=failing_proxy, ok=False)
+        assert proxy_pool.is_healthy(failing_proxy) is True
+        proxy_pool.record(proxy=failing_proxy, ok=False)
+        assert proxy_pool.is_healthy(failing_proxy) is False
+        assert proxy_pool.assign(profile_name="cool_profile_4") != failing_proxy
+
+        # Pools on the same storage do not overwrite each other's records.
+        other_pool = ProxyPool(storage=BrowserProfileStorage(), proxy_factory=proxy_factory)
+        other_proxy = BasActionBrowserProxy(server="127.0.0.1", port=http_proxy_server.port, login="other")
+        other_pool.record(proxy=other_proxy, ok=True, latency=1)
+        other_pool.save()
+        proxy_pool.record(proxy=slow_proxy, ok=True, latency=1)
+        proxy_pool.save()
+
+        saved_pool = ProxyPool(storage=browser_profile_storage, proxy_factory=proxy_factory)
+        assert saved_pool.stats(other_proxy) is not None
+        assert saved_pool.stats(slow_proxy) == proxy_pool.stats(slow_proxy)
+        assert saved_pool.stats(failing_proxy) is None
@@ -14,6 +14,9 @@ from playwright.sync_api import BrowserContext
 from pydantic import DirectoryPath
 
 from tests import FIXTURES_DIR, _find_free_port
+from tests.contrib.cdp_server.server import CDPServer
+from tests.contrib.fingerprint_server.server import FingerprintServer
+from tests.contrib.http_proxy.server import HTTPProxyServer
 
 # Patch asyncio to support nested asynchronous event loops.
 nest_asyncio.apply()
@@ -136,3 +139,53 @@ def brightdata_credentials() -> Dict[str, str]:
         raise ValueError("Both BRIGHTDATA_USERNAME and BRIGHTDATA_PASSWORD must be set.")
 
     return {"username": username, "password": password}
+
+
+@pytest.fixture(scope="function")
+def fingerprint_server(monkeypatch: pytest.MonkeyPatch) -> Generator[FingerprintServer, None, None]:
+    """
+    Start a local stand-in for the fingerprint API and send the fingerprint requests to it.
+
+    :return: The running FingerprintServer.
+    """
+
+    server = FingerprintServer(port=_find_free_port())
+    server.start()
+    monkeypatch.setattr("pybas_automation.fingerprint.fingerprint.FINGERPRINT_BASE_URL", server.base_url)
+
+    yield server
+
+    server.stop()
+
+
+@pytest.fixture(scope="function")
+def http_proxy_server(monkeypatch: pytest.MonkeyPatch) -> Generator[HTTPProxyServer, None, None]:
+    """
+    Start a local stand-in for an HTTP proxy and request the external IP through it over plain HTTP.
+
+    :return: The running HTTPProxyServer, with the password "test_pass".
+    """
+
+    server = HTTPProxyServer(port=_find_free_port(), password="test_pass")
+    server.start()
+    monkeypatch.setattr("pybas_automation.browser_profile.proxy.EXTERNAL_IP_URL", "http://lumtest.test/myip.json")
+
+    yield server
+
+    server.stop()
+
+
+@pytest.fixture(scope="function")
+def cdp_server() -> Generator[CDPServer, None, None]:
+    """
+    Start a local stand-in for the DevTools WebSocket endpoint of a browser.
+
+    :return: The running CDPServer.
+    """
+
+    server = CDPServer(port=_find_free_port())
+    server.start()
+
+    yield server
+
+    server.stop()
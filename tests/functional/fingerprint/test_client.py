@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from pybas_automation.fingerprint import (
+    BasFingerprintRequest,
+    FingerprintClient,
+    FingerprintRequestException,
+    LatencyHistogram,
+    get_fingerprint,
+)
+from tests.contrib.fingerprint_server.server import FingerprintServer
+
+
+class TestFingerprintClient:
+    def test_client(self, fingerprint_key: str, fingerprint_server: FingerprintServer) -> None:
+        """
+        Test fetching fingerprints concurrently with the async client.
+
+        This test checks:
+        - No more requests than the concurrency are in flight
+        - Transient errors are retried
+        - Latencies are recorded
+        """
+
+        fingerprint_server.latency = 0.05
+        fingerprint_server.fail_every = 4
+        request_data = BasFingerprintRequest(key=fingerprint_key)
+
+        async def fetch() -> list[str]:
+            async with FingerprintClient(concurrency=3, backoff=0.01) as client:
+                fingerprints = await asyncio.gather(*(client.get_fingerprint(request_data) for _ in range(12)))
+                assert client.latency.snapshot().count == fingerprint_server.requests
+                return fingerprints
+
+        fingerprints = asyncio.run(fetch())
+
+        assert len(set(fingerprints)) == 12
+        assert all(json.loads(fingerprint)["valid"] is True for fingerprint in fingerprints)
+        assert fingerprint_server.max_in_flight == 3
+        assert fingerprint_server.requests > 12
+
+        # The synchronous function still works.
+        fingerprint_server.fail_every = 0
+        assert json.loads(get_fingerprint(request_data))["valid"] is True
+
+    def test_rate_limit_and_retries(self, fingerprint_key: str, fingerprint_server: FingerprintServer) -> None:
+        """
+        Test the rate limit and giving up after the retries.
+
+        This test checks:
+        - Requests beyond the burst wait for the rate limit
+        - A request failing every time raises after the configured retries
+        """
+
+        request_data = BasFingerprintRequest(key=fingerprint_key)
+
+        async def fetch() -> float:
+            async with FingerprintClient(rate=20, burst=1) as client:
+                started = time.monotonic()
+                await asyncio.gather(*(client.get_fingerprint(request_data) for _ in range(6)))
+                return time.monotonic() - started
+
+        assert asyncio.run(fetch()) >= 5 / 20 * 0.9
+
+        fingerprint_server.fail_every = 1
+
+        async def fetch_failing() -> None:
+            async with FingerprintClient(retries=2, backoff=0.01) as client:
+                await client.get_fingerprint(request_data)
+
+        requests = fingerprint_server.requests
+        with pytest.raises(FingerprintRequestException):
+            asyncio.run(fetch_failing())
+        assert fingerprint_server.requests - requests == 3
+
+    def test_latency_histogram(self) -> None:
+        """Test the bucketing and the quantile estimate of the latency histogram."""
+
+        histogram = LatencyHistogram(bounds=(0.1, 1.0))
+        for seconds in (0.05, 0.05, 0.5, 2.0):
+            histogram.observe(seconds)
+
+        snapshot = histogram.snapshot()
+        assert snapshot.buckets == {"0.1": 2, "1.0": 1, "+Inf": 1}
+        assert snapshot.count == 4
+        assert snapshot.mean == pytest.approx(2.6 / 4)
+        assert histogram.quantile(0.5) == 0.1
+        assert histogram.quantile(0.75) == 1.0
+        assert histogram.quantile(1.0) == float("inf")
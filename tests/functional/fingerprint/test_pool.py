@@ -0,0 +1,89 @@
+import json
+import time
+
+from pybas_automation.browser_profile import BrowserProfileStorage
+from pybas_automation.fingerprint import BasFingerprintRequest, FingerprintPool
+from pybas_automation.fingerprint.pool import pool_key
+from tests.contrib.fingerprint_server.server import FingerprintServer
+
+
+class TestFingerprintPool:
+    def test_pool(self, fingerprint_key: str, fingerprint_server: FingerprintServer) -> None:
+        """
+        Test taking fingerprints from the pool and refilling it.
+
+        This test checks:
+        - Fingerprints are kept per request parameters, without the fingerprint key
+        - A fingerprint is handed out once, the pool falls back to the API when it is empty
+        - Hits, misses and refills are counted
+        """
+
+        fingerprint_pool = FingerprintPool(target_depth=3)
+        request_data = BasFingerprintRequest(key=fingerprint_key)
+        request_data_small = BasFingerprintRequest(key=fingerprint_key, max_width=1366, max_height=768)
+        assert pool_key(request_data) == pool_key(BasFingerprintRequest(key="b" * 64))
+        assert pool_key(request_data) != pool_key(request_data_small)
+
+        assert fingerprint_pool.pop(request_data) is None
+        assert fingerprint_pool.refill(request_data) == 3
+        assert fingerprint_pool.refill(request_data) == 0
+        assert fingerprint_pool.depth(request_data) == 3
+        assert fingerprint_pool.depth(request_data_small) == 0
+        assert fingerprint_server.requests == 3
+
+        params = fingerprint_pool.pool_dir.joinpath(pool_key(request_data), "params.json").read_text()
+        assert fingerprint_key not in params
+
+        fingerprints = [fingerprint_pool.pop(request_data) for _ in range(3)]
+        assert len(set(fingerprints)) == 3
+        assert fingerprint_pool.depth(request_data) == 0
+
+        fingerprint_raw = fingerprint_pool.get(request_data)
+        assert json.loads(fingerprint_raw)["valid"] is True
+        assert fingerprint_server.requests == 4
+
+        metrics = fingerprint_pool.metrics()
+        assert metrics.hits == 3
+        assert metrics.misses == 2
+        assert metrics.hit_rate == 3 / 5
+        assert metrics.refilled == 3
+        assert metrics.refill_rate > 0
+        assert metrics.depth == {pool_key(request_data): 0}
+
+    def test_background_refill(self, fingerprint_key: str, fingerprint_server: FingerprintServer) -> None:
+        """
+        Test the background refiller with a browser profile storage taking fingerprints from the pool.
+
+        This test checks:
+        - The refiller fills the pool up to the target depth and refills it after pops
+        - New profiles take their fingerprints from the pool
+        """
+
+        fingerprint_pool = FingerprintPool(target_depth=5, refill_interval=60)
+        request_data = BasFingerprintRequest(key=fingerprint_key)
+
+        def wait_for_depth(depth: int) -> None:
+            for _ in range(100):
+                if fingerprint_pool.depth(request_data) == depth:
+                    return
+                time.sleep(0.05)
+            raise AssertionError(f"pool depth is {fingerprint_pool.depth(request_data)}, expected {depth}")
+
+        fingerprint_pool.start(requests=[request_data])
+        try:
+            wait_for_depth(5)
+
+            browser_profile_storage = BrowserProfileStorage(
+                fingerprint_key=fingerprint_key, fingerprint_pool=fingerprint_pool
+            )
+            browser_profile = browser_profile_storage.new()
+            assert json.loads(browser_profile.fingerprint_raw or "")["valid"] is True
+            assert fingerprint_pool.metrics().hits == 1
+
+            # The pop wakes the refiller up before the refill interval.
+            wait_for_depth(5)
+            assert fingerprint_server.requests == 6
+        finally:
+            fingerprint_pool.stop(timeout=10)
+
+        assert fingerprint_pool.metrics().refilled == 6
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from pybas_automation.proxy_providers.brightdata import (
+    BrightdataCredentialsModel,
+    BrightDataProxyModel,
+    BrightDataSessionPool,
+    BrightDataSessionPoolError,
+)
+from tests.contrib.http_proxy.server import HTTPProxyServer
+
+
+@pytest.fixture(scope="function")
+def brightdata_proxy(http_proxy_server: HTTPProxyServer) -> BrightDataProxyModel:
+    """Return a BrightData proxy going through the local stand-in proxy."""
+
+    credentials = BrightdataCredentialsModel(username="brd-customer-test-zone-test", password="test_pass")
+    return BrightDataProxyModel(hostname="127.0.0.1", port=http_proxy_server.port, credentials=credentials)
+
+
+class TestBrightDataSessionPool:
+    def test_warm(self, http_proxy_server: HTTPProxyServer, brightdata_proxy: BrightDataProxyModel) -> None:
+        """
+        Test warming up BrightData sessions.
+
+        This test checks:
+        - Sessions are warmed up concurrently, only sessions whose warm-up succeeded are handed out
+        - Every session is handed out once
+        - Sessions older than max_age are replaced
+        """
+
+        http_proxy_server.latency = 0.2
+        http_proxy_server.fail_every = 4
+        session_pool = BrightDataSessionPool(proxy=brightdata_proxy, size=8, concurrency=8)
+
+        started = time.monotonic()
+        assert session_pool.warm() == 6
+        assert time.monotonic() - started < 1
+        assert http_proxy_server.max_in_flight > 1
+        assert len(session_pool) == 6
+
+        failed = {http_proxy_server.usernames[3], http_proxy_server.usernames[7]}
+        logins = set()
+        for _ in range(6):
+            bas_proxy = session_pool.pop()
+            assert bas_proxy is not None
+            assert bas_proxy.login is not None and "-session-" in bas_proxy.login
+            logins.add(bas_proxy.login)
+        assert len(logins) == 6
+        assert not logins & failed
+        assert session_pool.pop() is None
+
+        # Without the background warmer, get() warms up sessions.
+        assert session_pool.get(timeout=5).login not in logins
+
+        session_pool.max_age = 0
+        assert len(session_pool) == 0
+        metrics = session_pool.metrics()
+        assert metrics.handed_out == 7
+        assert metrics.failed >= 2
+        assert metrics.expired > 0
+
+    def test_get_bounded(self, http_proxy_server: HTTPProxyServer, brightdata_proxy: BrightDataProxyModel) -> None:
+        """
+        Test get() without the background warmer gives up.
+
+        This test checks:
+        - get() raises after max_failed_warms warm-ups in a row fail, also without a timeout
+        - A slow warm-up does not hold get() past its timeout
+        - Concurrent warm-ups do not fill the pool beyond its size
+        """
+
+        http_proxy_server.fail_every = 1
+        session_pool = BrightDataSessionPool(proxy=brightdata_proxy, size=4, max_failed_warms=3)
+        with pytest.raises(BrightDataSessionPoolError):
+            session_pool.get()
+        assert session_pool.metrics().failed == 12
+
+        http_proxy_server.fail_every = 0
+        http_proxy_server.latency = 3
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            session_pool.get(timeout=0.5)
+        assert time.monotonic() - started < 2
+
+        http_proxy_server.latency = 0.2
+        session_pool = BrightDataSessionPool(proxy=brightdata_proxy, size=4)
+        threads = [threading.Thread(target=session_pool.warm) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(session_pool) == 4
+        assert session_pool.metrics().warmed == 4
+
+    def test_background(self, http_proxy_server: HTTPProxyServer, brightdata_proxy: BrightDataProxyModel) -> None:
+        """Test keeping the pool filled in a background thread."""
+
+        session_pool = BrightDataSessionPool(proxy=brightdata_proxy, size=4, refill_interval=0.1)
+        session_pool.start()
+        try:
+            proxies = [session_pool.get(timeout=5) for _ in range(10)]
+            assert len({bas_proxy.login for bas_proxy in proxies}) == 10
+
+            deadline = time.monotonic() + 5
+            while len(session_pool) < 4 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert len(session_pool) == 4
+        finally:
+            session_pool.stop(timeout=5)
+
+        with pytest.raises(RuntimeError):
+            session_pool.start()
+            session_pool.start()
+        session_pool.stop(timeout=5)
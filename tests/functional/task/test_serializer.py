@@ -0,0 +1,124 @@
+import io
+import json
+
+import pytest
+
+from pybas_automation.bas_actions.browser.browser_settings.template import BasActionBrowserSettingsTemplate
+from pybas_automation.task import BasTask, serializer
+from pybas_automation.task.serializer import (
+    TEMPLATE_ENTRY_ID,
+    TaskJournalOpEnum,
+    TaskJournalRecord,
+    decode_journal_record,
+    decode_task,
+    decode_tasks,
+    dumps_raw,
+    encode_journal_record,
+    encode_raw_task_entry,
+    encode_task_entry,
+    encode_tasks,
+    iter_decode_tasks,
+    loads_raw,
+    write_tasks,
+)
+
+
+class TestSerializer:
+    def test_tasks(self) -> None:
+        """Test that tasks survive a round trip and keep the layout of the tasks file."""
+
+        tasks = [BasTask() for _ in range(0, 3)]
+        tasks[1].remote_debugging_port = 9022
+
+        data = encode_tasks(tasks)
+        assert decode_tasks(data) == tasks
+
+        # Same document as the one written by json.dump before
+        assert data.decode("utf-8") == json.dumps([t.model_dump(mode="json") for t in tasks], indent=4)
+
+        # The entries of the offset index join into the same document
+        entries = [encode_task_entry(t) for t in tasks]
+        assert b"[\n" + b",\n".join(entries) + b"\n]" == data
+        assert [encode_raw_task_entry(t.model_dump(mode="json")) for t in tasks] == entries
+        assert decode_task(entries[1]) == tasks[1]
+        assert loads_raw(entries[1]) == tasks[1].model_dump(mode="json")
+
+    def test_journal_record(self) -> None:
+        """Test that a journal record is one line and survives a round trip."""
+
+        record = TaskJournalRecord(op=TaskJournalOpEnum.UPDATE, task=BasTask())
+
+        line = encode_journal_record(record)
+        assert line.endswith(b"\n")
+        assert line.count(b"\n") == 1
+        assert decode_journal_record(line) == record
+
+    def test_streaming(self) -> None:
+        """Test that tasks are streamed from and to the same document as the one of encode_tasks()."""
+
+        tasks = [BasTask() for _ in range(0, 50)]
+        tasks[7].unique_process_id = "процесс"  # multibyte characters split across chunks
+        data = encode_tasks(tasks)
+
+        f = io.BytesIO()
+        offsets = write_tasks(f, iter(tasks))
+        assert f.getvalue() == data
+        offset, length = offsets[str(tasks[7].task_id)]
+        assert decode_task(data[offset : offset + length]) == tasks[7]  # noqa: E203
+
+        for chunk_size in [1, 7, 1024, 1024 * 1024]:
+            assert list(iter_decode_tasks(io.BytesIO(data), chunk_size=chunk_size)) == tasks
+
+        # Compact documents written by other programs
+        compact = json.dumps([t.model_dump(mode="json") for t in tasks], separators=(",", ":")).encode("utf-8")
+        assert list(iter_decode_tasks(io.BytesIO(compact), chunk_size=100)) == tasks
+
+        f = io.BytesIO()
+        assert write_tasks(f, []) == {}
+        assert f.getvalue() == encode_tasks([]) == b"[]"
+        assert list(iter_decode_tasks(io.BytesIO(b" [ ] "))) == []
+
+        for invalid in [b"", b"{}", b"[", data[:-1], data[:-1] + b",]", data.replace(b"},", b"}", 1)]:
+            with pytest.raises(ValueError):
+                list(iter_decode_tasks(io.BytesIO(invalid), chunk_size=100))
+
+    def test_settings_template(self) -> None:
+        """Test that tasks written as differences from a settings template are decoded in the full form."""
+
+        template = BasActionBrowserSettingsTemplate()
+        tasks = [BasTask() for _ in range(0, 10)]
+        tasks[3].browser_settings.rendering.maximum_fps = 20
+        tasks[4].browser_settings.command_line.append("--mute-audio")
+
+        f = io.BytesIO()
+        offsets = write_tasks(f, tasks, template=template)
+        data = f.getvalue()
+        assert TEMPLATE_ENTRY_ID in offsets
+        assert len(data) < len(encode_tasks(tasks)) / 2
+
+        assert decode_tasks(data) == tasks
+        for chunk_size in [1, 100, 1024 * 1024]:
+            assert list(iter_decode_tasks(io.BytesIO(data), chunk_size=chunk_size)) == tasks
+
+        decoded = decode_tasks(data)
+        assert decoded[3].browser_settings.rendering != decoded[2].browser_settings.rendering
+        assert decoded[4].browser_settings.rendering is decoded[2].browser_settings.rendering
+        assert decoded[4].browser_settings.command_line is not decoded[2].browser_settings.command_line
+
+    def test_without_orjson(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that the standard json module gives the same documents when orjson is not installed."""
+
+        template = BasActionBrowserSettingsTemplate()
+        tasks = [BasTask() for _ in range(0, 3)]
+        tasks[1].browser_settings.command_line.append("--lang=日本語")
+
+        f = io.BytesIO()
+        write_tasks(f, tasks, template=template)
+
+        monkeypatch.setattr(serializer, "orjson", None)
+        f_json = io.BytesIO()
+        write_tasks(f_json, tasks, template=template)
+
+        assert decode_tasks(f_json.getvalue()) == tasks
+        assert loads_raw(f_json.getvalue()) == loads_raw(f.getvalue())
+        assert loads_raw(dumps_raw({"a": [1, 2.5, None]})) == {"a": [1, 2.5, None]}
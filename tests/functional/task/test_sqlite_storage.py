@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+import pytest
+from pydantic import DirectoryPath
+
+from pybas_automation.task import SqliteTaskStorage, TaskDuplicateError, TaskStorage, TaskStorageModeEnum
+from tests.functional.task.test_storage import create_task
+
+
+class TestSqliteTaskStorage:
+    def test_basic(self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str) -> None:
+        """
+        Test basic functionality of SqliteTaskStorage.
+
+        This test checks:
+        - Saving, updating and retrieving tasks by id
+        - The correct handling of duplicate and unknown tasks
+        - Exporting the tasks file and reading it back with TaskStorage
+        """
+
+        task_storage = SqliteTaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+        assert task_storage.get_all() is None
+        assert task_storage.count() == 0
+        assert task_storage.load_all() is False
+
+        # Verify that exporting an empty storage raises a ValueError
+        with pytest.raises(ValueError):
+            task_storage.save_all()
+
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 10)]
+        for task in tasks:
+            task_storage.save(task=task)
+
+        assert task_storage.count() == 10
+        assert task_storage.load_all() is True
+        assert task_storage.get_all() == tasks
+        assert task_storage.get(task_id=tasks[3].task_id) == tasks[3]
+        assert task_storage.get(task_id=str(tasks[3].task_id)) == tasks[3]
+        assert task_storage.get(task_id=uuid4()) is None
+
+        with pytest.raises(TaskDuplicateError):
+            task_storage.save(task=tasks[0])
+
+        tasks[5].remote_debugging_port = 9022
+        task_storage.update(task=tasks[5])
+        task_saved = task_storage.get(task_id=tasks[5].task_id)
+        assert task_saved is not None
+        assert task_saved.remote_debugging_port == 9022
+
+        with pytest.raises(ValueError):
+            task_storage.update(task=create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str))
+
+        # The exported file is the one BAS reads, so TaskStorage must be able to load it
+        assert task_storage.save_all() is True
+        task_storage_json = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ)
+        assert task_storage_json.get_all() == task_storage.get_all()
+        assert list(task_storage_json.iter_tasks()) == list(task_storage.iter_tasks())
+
+        assert task_storage.clear() is True
+        assert task_storage.count() == 0
+        assert os.path.exists(task_storage.task_file_path) is False
+        assert task_storage.clear() is False
+
+        print(task_storage)  # repr
+        task_storage.close()
+
+    def test_read_mode(self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str) -> None:
+        """Test that the read-only mode of SqliteTaskStorage prohibits any write operations."""
+
+        # A read-only storage does not create the database, it is empty until the database exists
+        task_storage_read = SqliteTaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ)
+        assert task_storage_read.count() == 0
+        assert task_storage_read.get_all() is None
+        assert os.path.exists(task_storage_read.db_file_path) is False
+
+        task_storage_write = SqliteTaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+
+        task = create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str)
+        task_storage_write.save(task=task)
+
+        for func in [task_storage_read.clear, task_storage_read.save_all]:
+            with pytest.raises(ValueError):
+                func()
+        for func in [task_storage_read.save, task_storage_read.update]:  # type: ignore
+            with pytest.raises(ValueError):
+                func(task=task)  # type: ignore
+
+        assert task_storage_read.get(task_id=task.task_id) == task
+
+        # The database is opened read-only
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            task_storage_read._query("DELETE FROM tasks")  # pylint: disable=protected-access
+        assert task_storage_read.count() == 1
+
+    def test_concurrent_updates(
+        self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str
+    ) -> None:
+        """Test that workers with their own storage instance update their own tasks concurrently."""
+
+        task_storage = SqliteTaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 8)]
+        for task in tasks:
+            task_storage.save(task=task)
+
+        def worker(num: int) -> None:
+            worker_storage = SqliteTaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+            found_task = worker_storage.get(task_id=tasks[num].task_id)
+            assert found_task is not None
+            found_task.remote_debugging_port = 9000 + num
+            worker_storage.update(task=found_task)
+            worker_storage.close()
+
+        # Failed asserts in the workers are raised again by result().
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            for future in [executor.submit(worker, num) for num in range(0, len(tasks))]:
+                future.result()
+
+        assert task_storage.save_all() is True
+        with open(task_storage.task_file_path, encoding="utf-8") as f:
+            tasks_json = json.load(f)
+
+        assert [t["remote_debugging_port"] for t in tasks_json] == [9000 + num for num in range(0, len(tasks))]
+
+    def test_shared_instance(
+        self,
+        storage_dir: DirectoryPath,
+        profiles_dir: DirectoryPath,
+        fingerprint_str: str,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test that threads share one storage instance, and iterating over the tasks in batches."""
+
+        monkeypatch.setattr("pybas_automation.task.sqlite_storage._sqlite_fetch_size", 3)
+
+        task_storage = SqliteTaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 8)]
+
+        def worker(num: int) -> None:
+            task_storage.save(task=tasks[num])
+            found_task = task_storage.get(task_id=tasks[num].task_id)
+            assert found_task is not None
+            found_task.remote_debugging_port = 9000 + num
+            task_storage.update(task=found_task)
+            assert task_storage.count() >= 1
+
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            for future in [executor.submit(worker, num) for num in range(0, len(tasks))]:
+                future.result()
+
+        ports = {task.task_id: task.remote_debugging_port for task in task_storage.iter_tasks()}
+        assert ports == {task.task_id: 9000 + num for num, task in enumerate(tasks)}
@@ -1,16 +1,28 @@
+import json
 import os
 import tempfile
+import time
 from typing import List
 from uuid import UUID, uuid4
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
-from pydantic import DirectoryPath, FilePath
+from pydantic import DirectoryPath, FilePath, ValidationError
 
+from pybas_automation.bas_actions.browser.browser_settings.template import BasActionBrowserSettingsTemplate
 from pybas_automation.bas_actions.browser.proxy import BasActionBrowserProxy, BasActionBrowserProxyTypeEnum
+from pybas_automation.bas_actions.fingerprint_switcher.apply_fingerprint.models import BasActionApplyFingerprintModel
 from pybas_automation.browser_profile import BrowserProfileStorage
 from pybas_automation.browser_profile.models import BrowserProfile
-from pybas_automation.task import BasTask, TaskDuplicateError, TaskStorage, TaskStorageModeEnum
+from pybas_automation.task import (
+    BasTask,
+    TaskDuplicateError,
+    TaskLeaseError,
+    TaskStatusEnum,
+    TaskStorage,
+    TaskStorageModeEnum,
+)
+from pybas_automation.utils import filesystem
 
 
 def create_task(profiles_dir: DirectoryPath, fingerprint_str: str, with_proxy: bool = False) -> BasTask:
@@ -268,3 +280,468 @@ class TestTaskStorage:
         assert task_saved is not None
         assert task_saved.remote_debugging_port is not None
         assert task_saved.remote_debugging_port == 9022
+
+    def test_journal(self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str) -> None:
+        """
+        Test the journal mode of TaskStorage.
+
+        This test checks:
+        - Saves and updates are appended to the journal instead of rewriting the tasks file
+        - Tasks are loaded from the tasks file and the journal together
+        - The journal is folded into the tasks file once it reaches the compact threshold
+        """
+
+        task_storage = TaskStorage(
+            storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, journal=True, compact_threshold=5
+        )
+
+        # Save a few tasks, only the journal should be written
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 3)]
+        for task in tasks:
+            task_storage.save(task=task)
+
+        assert os.path.exists(task_storage.journal_file_path) is True
+        assert os.path.exists(task_storage.task_file_path) is False
+
+        tasks[0].remote_debugging_port = 9022
+        task_storage.update(task=tasks[0])
+
+        # Another storage instance sees the journaled tasks
+        task_storage_read = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ)
+        assert task_storage_read.count() == 3
+        task_saved = task_storage_read.get(task_id=tasks[0].task_id)
+        assert task_saved is not None
+        assert task_saved.remote_debugging_port == 9022
+
+        # The fifth record triggers compaction into the tasks file
+        task_storage.save(task=create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str))
+        assert os.path.exists(task_storage.journal_file_path) is False
+        assert os.path.exists(task_storage.task_file_path) is True
+
+        with open(task_storage.task_file_path, encoding="utf-8") as f:
+            assert len(json.load(f)) == 4
+
+        # Explicit compaction and clear
+        task_storage.save(task=create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str))
+        assert task_storage.compact() is True
+        assert task_storage.compact() is False
+        assert task_storage.count() == 5
+
+        assert task_storage.clear() is True
+        assert task_storage.load_all() is False
+
+        with pytest.raises(ValueError):
+            TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, journal=True, compact_threshold=0)
+
+    def test_batch(self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str) -> None:
+        """
+        Test the batch write API of TaskStorage.
+
+        This test checks:
+        - Tasks saved in a batch are written once, when the batch is committed
+        - Duplicate tasks are rejected and nothing is written in that case
+        - Updates in a batch are applied to existing tasks
+        """
+
+        task_storage = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 5)]
+        with task_storage.batch() as batch:
+            for task in tasks:
+                batch.save(task=task)
+            assert len(batch) == 5
+            # Nothing is written until the batch is committed
+            assert os.path.exists(task_storage.task_file_path) is False
+
+        task_storage_read = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ)
+        assert task_storage_read.get_all() == tasks
+
+        # A duplicate inside the batch or against the storage is rejected immediately
+        with task_storage.batch() as batch:
+            with pytest.raises(TaskDuplicateError):
+                batch.save(task=tasks[0])
+            new_task = create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str)
+            batch.save(task=new_task)
+            with pytest.raises(TaskDuplicateError):
+                batch.save(task=new_task)
+
+        # save_many rejects the whole batch when one of the tasks already exists
+        with pytest.raises(TaskDuplicateError):
+            task_storage.save_many(
+                tasks=[create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str), tasks[1]]
+            )
+        assert task_storage.count() == 6
+
+        # A failed block writes nothing
+        with pytest.raises(RuntimeError):
+            with task_storage.batch() as batch:
+                batch.save(task=create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str))
+                raise RuntimeError("abort")
+        assert task_storage.count() == 6
+
+        # Updates of existing tasks
+        with task_storage.batch() as batch:
+            with pytest.raises(ValueError):
+                batch.update(task=create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str))
+            for num, task in enumerate(tasks):
+                task.remote_debugging_port = 9000 + num
+                batch.update(task=task)
+
+        assert task_storage_read.load_all() is True
+        assert [t.remote_debugging_port for t in task_storage_read.get_all()[:5]] == [  # type: ignore
+            9000 + num for num in range(0, 5)
+        ]
+
+        # Read mode prohibits batches
+        with pytest.raises(ValueError):
+            with task_storage_read.batch():
+                pass
+
+    def test_load_one(self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str) -> None:
+        """
+        Test the single-task fast path of TaskStorage.
+
+        This test checks:
+        - A single task is loaded through the offset index without loading the other tasks
+        - The task is updated in place and the tasks file stays a valid document
+        - A stale index falls back to scanning the tasks file
+        """
+
+        task_storage = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 5)]
+        task_storage.save_many(tasks=tasks)
+        assert os.path.exists(task_storage.index_file_path) is True
+
+        # The document is the same as the one written by json.dump
+        with open(task_storage.task_file_path, encoding="utf-8") as f:
+            tasks_raw = f.read()
+        assert tasks_raw == json.dumps(json.loads(tasks_raw), indent=4)
+
+        worker_storage = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, preload=False)
+        assert worker_storage.get_all() is None
+
+        found_task = worker_storage.load_one(task_id=str(tasks[2].task_id))
+        assert found_task == tasks[2]
+        assert worker_storage.load_one(task_id=uuid4()) is None
+        assert worker_storage.get_all() is None
+
+        found_task.remote_debugging_port = 9022
+        found_task.unique_process_id = "unique_process_id"
+        worker_storage.update(task=found_task)
+        assert worker_storage.get_all() is None
+
+        with pytest.raises(ValueError):
+            worker_storage.update(task=create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str))
+
+        task_storage_read = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ)
+        tasks[2] = found_task
+        assert task_storage_read.get_all() == tasks
+
+        # A tasks file written without the index is still found by scanning it
+        with open(task_storage.task_file_path, "w", encoding="utf-8") as f:
+            json.dump([t.model_dump(mode="json") for t in reversed(tasks)], f)
+
+        found_task = worker_storage.load_one(task_id=tasks[4].task_id)
+        assert found_task == tasks[4]
+        found_task.remote_debugging_port = 9023
+        worker_storage.update(task=found_task)
+        assert worker_storage.load_one(task_id=tasks[4].task_id) == found_task
+
+        # Journaled changes are visible to the fast path as well
+        journal_storage = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, journal=True)
+        tasks[0].remote_debugging_port = 9024
+        journal_storage.update(task=tasks[0])
+        assert worker_storage.load_one(task_id=tasks[0].task_id) == tasks[0]
+
+    def test_queue(self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str) -> None:
+        """
+        Test the lease/claim queue of TaskStorage.
+
+        This test checks:
+        - Workers claim different pending tasks and the queue state is stored on disk
+        - Only the worker holding the lease can heartbeat, complete or fail a task
+        - A task with an expired lease is claimed again, or failed once it reaches max_attempts
+        """
+
+        task_storage = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 3)]
+        task_storage.save_many(tasks=tasks)
+
+        # Every worker uses its own storage instance, like separate processes
+        worker_1 = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, preload=False)
+        worker_2 = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, preload=False)
+
+        task_1 = worker_1.claim(worker_id="worker_1")
+        task_2 = worker_2.claim(worker_id="worker_2", lease_seconds=0.2)
+        assert task_1 is not None and task_2 is not None
+        assert task_1.task_id == tasks[0].task_id
+        assert task_2.task_id == tasks[1].task_id
+        assert task_1.status == TaskStatusEnum.RUNNING
+        assert task_1.attempts == 1
+
+        task_storage_read = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ)
+        assert [t.status for t in task_storage_read.get_all()] == [  # type: ignore
+            TaskStatusEnum.RUNNING,
+            TaskStatusEnum.RUNNING,
+            TaskStatusEnum.PENDING,
+        ]
+
+        # Only the lease holder can touch the task
+        with pytest.raises(TaskLeaseError):
+            worker_2.complete(task_id=task_1.task_id, worker_id="worker_2")
+        with pytest.raises(ValueError):
+            worker_1.heartbeat(task_id=uuid4(), worker_id="worker_1")
+
+        lease_expires_at = task_1.lease_expires_at
+        task_1 = worker_1.heartbeat(task_id=task_1.task_id, worker_id="worker_1")
+        assert task_1.lease_expires_at > lease_expires_at  # type: ignore
+        task_1 = worker_1.complete(task_id=task_1.task_id, worker_id="worker_1")
+        assert task_1.status == TaskStatusEnum.DONE
+        assert task_1.worker_id is None
+
+        # worker_2 "crashes", its lease expires and the task is claimed again
+        time.sleep(0.3)
+        task_3 = worker_1.claim(worker_id="worker_1", lease_seconds=0.2)
+        assert task_3 is not None
+        assert task_3.task_id == task_2.task_id
+        assert task_3.attempts == 2
+        with pytest.raises(TaskLeaseError):
+            worker_2.heartbeat(task_id=task_2.task_id, worker_id="worker_2")
+
+        # Once max_attempts is reached, the expired task fails instead
+        time.sleep(0.3)
+        task_4 = worker_2.claim(worker_id="worker_2", max_attempts=2)
+        assert task_4 is not None
+        assert task_4.task_id == tasks[2].task_id
+
+        assert task_storage_read.load_all() is True
+        failed_task = task_storage_read.get(task_id=task_2.task_id)
+        assert failed_task is not None
+        assert failed_task.status == TaskStatusEnum.FAILED
+        assert failed_task.error is not None
+
+        # A failed task can be put back to the queue
+        task_4 = worker_2.fail(task_id=task_4.task_id, worker_id="worker_2", error="boom", requeue=True)
+        assert task_4.status == TaskStatusEnum.PENDING
+        assert task_4.error == "boom"
+        task_5 = worker_1.claim(worker_id="worker_1")
+        assert task_5 is not None
+        assert task_5.task_id == task_4.task_id
+        worker_1.fail(task_id=task_5.task_id, worker_id="worker_1", error="boom")
+
+        # Nothing left to claim
+        assert worker_1.claim(worker_id="worker_1") is None
+
+        with pytest.raises(ValueError):
+            task_storage_read.claim(worker_id="worker_1")
+
+        # A failed write leaves the tasks in memory unchanged
+        task_4.status = TaskStatusEnum.PENDING
+        worker_1.update(task=task_4)
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(worker_1, "_write_entries", lambda entries: list(entries) and 1 / 0)
+        try:
+            with pytest.raises(ZeroDivisionError):
+                worker_1.claim(worker_id="worker_1")
+        finally:
+            monkeypatch.undo()
+        pending_task = worker_1.get(task_id=task_4.task_id)
+        assert pending_task is not None
+        assert pending_task.status == TaskStatusEnum.PENDING
+        assert pending_task.attempts == task_4.attempts
+
+    def test_cache(self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str) -> None:
+        """
+        Test the change-aware reload of TaskStorage.
+
+        This test checks:
+        - Unchanged files are not parsed again
+        - Records appended to the journal by another process are applied incrementally
+        - A tasks file rewritten by another process is reloaded
+        """
+
+        writer = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, journal=True)
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 3)]
+        writer.save_many(tasks=tasks)
+        writer.compact()
+
+        reader = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ)
+        loaded = reader.get_all()
+        assert loaded == tasks
+
+        # Nothing changed, the tasks in memory are kept as they are
+        assert reader.load_all() is True
+        assert reader.get_all() is loaded
+        assert reader.get_all()[0] is loaded[0]  # type: ignore
+
+        # Only the journal tail is applied, the tasks file is not parsed again
+        tasks[1].remote_debugging_port = 9025
+        writer.update(task=tasks[1])
+        task = create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str)
+        writer.save(task=task)
+        assert reader.load_all() is True
+        assert reader.get_all()[0] is loaded[0]  # type: ignore
+        assert reader.get_all() == tasks + [task]
+
+        # The writer does not read back its own records
+        assert writer.load_all() is True
+        assert writer.get_all() == tasks + [task]
+
+        # A compacted journal changes the tasks file
+        writer.compact()
+        assert reader.load_all() is True
+        assert reader.get(task_id=task.task_id) == task
+        assert reader.get_all()[0] is not loaded[0]  # type: ignore
+
+        # So does a tasks file written in place by another program
+        loaded = reader.get_all()
+        with open(writer.task_file_path, "r+", encoding="utf-8") as f:
+            data = f.read().replace("9025", "9026")
+            f.seek(0)
+            f.write(data)
+        assert reader.load_all() is True
+        assert reader.get(task_id=tasks[1].task_id).remote_debugging_port == 9026  # type: ignore
+
+        # force reloads unconditionally
+        loaded = reader.get_all()
+        assert reader.load_all(force=True) is True
+        assert reader.get_all() is not loaded
+
+        # A recently written tasks file is checked by its digest until it is older than the racy mtime window
+        loaded = reader.get_all()
+        identity = reader._task_file_identity  # pylint: disable=protected-access
+        assert identity is not None and identity.digest is not None
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(filesystem, "_racy_mtime_window_ns", 0)
+        try:
+            assert reader.load_all() is True
+        finally:
+            monkeypatch.undo()
+        assert identity.digest is None
+        assert reader.get_all() is loaded
+
+        assert writer.clear() is True
+        assert reader.load_all() is False
+
+    def test_iter_tasks(self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str) -> None:
+        """
+        Test the streaming reader and writer of TaskStorage.
+
+        This test checks:
+        - iter_tasks() yields the same tasks as get_all(), including journaled changes
+        - write_all() writes tasks from a generator and keeps them out of memory
+        - Duplicate tasks are rejected and the storage is left unchanged
+        - The tasks can be written back while iterating, to the same storage or another one in the same directory
+        """
+
+        task_storage = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, journal=True)
+        assert list(task_storage.iter_tasks()) == []
+
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 5)]
+        task_storage.save_many(tasks=tasks[:3])
+        task_storage.compact()
+
+        tasks[1].remote_debugging_port = 9022
+        task_storage.update(task=tasks[1])
+        task_storage.save_many(tasks=tasks[3:])
+        assert os.path.exists(task_storage.journal_file_path) is True
+        assert list(task_storage.iter_tasks()) == task_storage.get_all() == tasks
+
+        other_storage_dir = DirectoryPath(os.path.join(storage_dir, "other"))
+        os.makedirs(other_storage_dir)
+        other_storage = TaskStorage(storage_dir=other_storage_dir, mode=TaskStorageModeEnum.READ_WRITE)
+        assert other_storage.write_all(tasks=task_storage.iter_tasks()) == 5
+        assert other_storage.get_all() is None
+        assert os.path.exists(other_storage.index_file_path) is True
+
+        # Same document as the one written from memory
+        task_storage.compact()
+        with open(task_storage.task_file_path, "rb") as f, open(other_storage.task_file_path, "rb") as f_other:
+            assert f.read() == f_other.read()
+
+        with pytest.raises(TaskDuplicateError):
+            other_storage.write_all(tasks=(task for task in tasks + tasks[:1]))
+        assert list(other_storage.iter_tasks()) == tasks
+
+        with pytest.raises(ValueError):
+            TaskStorage(storage_dir=other_storage_dir, mode=TaskStorageModeEnum.READ).write_all(tasks=tasks)
+
+        # Copy between storages sharing the directory, and so the lock
+        copy_storage = TaskStorage(
+            storage_dir=other_storage_dir, task_filename=FilePath("copy.json"), mode=TaskStorageModeEnum.READ_WRITE
+        )
+        assert copy_storage.write_all(tasks=other_storage.iter_tasks()) == 5
+        assert list(copy_storage.iter_tasks()) == tasks
+
+        # Update while iterating
+        copy_storage.load_all()
+        for task in copy_storage.iter_tasks():
+            task.remote_debugging_port = 9023
+            copy_storage.update(task=task)
+        assert [task.remote_debugging_port for task in copy_storage.iter_tasks()] == [9023] * 5
+        assert list(other_storage.iter_tasks()) == tasks
+
+    def test_settings_template(
+        self, storage_dir: DirectoryPath, profiles_dir: DirectoryPath, fingerprint_str: str
+    ) -> None:
+        """
+        Test the tasks file with browser settings stored as differences from a template.
+
+        This test checks:
+        - Only the differences are written and the tasks are loaded unchanged
+        - Unchanged sections are shared between the tasks and cannot be changed in place
+        - The single-task fast path and export() give the full form
+        """
+
+        template = BasActionBrowserSettingsTemplate()
+        task_storage = TaskStorage(
+            storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, settings_template=template
+        )
+        tasks = [create_task(profiles_dir=profiles_dir, fingerprint_str=fingerprint_str) for _ in range(0, 3)]
+        task_storage.save_many(tasks=tasks)
+
+        with open(task_storage.task_file_path, encoding="utf-8") as f:
+            tasks_raw = json.load(f)
+        assert tasks_raw[0] == {"browser_settings_template": template.to_data()}
+        assert tasks_raw[1]["browser_settings"] == {
+            "profile": {"profile_folder_path": str(tasks[0].browser_settings.profile.profile_folder_path)}
+        }
+
+        # Any storage reads the file, the template is part of it
+        for task_storage_read in [
+            TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ),
+            TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ, preload=False),
+        ]:
+            assert task_storage_read.load_all() is True
+            loaded = task_storage_read.get_all()
+            assert loaded == tasks
+            assert list(task_storage_read.iter_tasks()) == tasks
+            assert loaded[0].browser_settings.components is loaded[1].browser_settings.components  # type: ignore
+            with pytest.raises(ValidationError):
+                loaded[0].browser_settings.components.widevine = "disable"  # type: ignore
+
+        # Assigning a new section is fine
+        tasks[1].browser_settings.fingerprint = BasActionApplyFingerprintModel(safe_canvas=False)
+        worker_storage = TaskStorage(
+            storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, preload=False, settings_template=template
+        )
+        assert worker_storage.load_one(task_id=tasks[1].task_id) != tasks[1]
+        worker_storage.update(task=tasks[1])
+        assert worker_storage.load_one(task_id=tasks[1].task_id) == tasks[1]
+        assert TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ).get_all() == tasks
+
+        # BAS reads the full form
+        export_file_path = FilePath(os.path.join(storage_dir, "export.json"))
+        assert task_storage.export(file_path=export_file_path) == 3
+        with open(export_file_path, encoding="utf-8") as f:
+            assert json.load(f) == [t.model_dump(mode="json") for t in tasks]
+
+        # A storage without the template writes the full form again
+        full_storage = TaskStorage(storage_dir=storage_dir, mode=TaskStorageModeEnum.READ_WRITE, preload=False)
+        tasks[2].remote_debugging_port = 9022
+        full_storage.update(task=tasks[2])
+        with open(full_storage.task_file_path, "rb") as f_full, open(export_file_path, "rb") as f_export:
+            assert f_full.read() != f_export.read()
+        full_storage.export(file_path=export_file_path)
+        with open(full_storage.task_file_path, "rb") as f_full, open(export_file_path, "rb") as f_export:
+            assert f_full.read() == f_export.read()
@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+import pytest
+
+from pybas_automation.utils import ReadWriteFileLock
+
+
+class TestReadWriteFileLock:
+    def test_reentrant(self) -> None:
+        """Test that the lock is reentrant and refuses to upgrade a read lock."""
+
+        # LOCALAPPDATA points to a temporary directory for every test
+        lock = ReadWriteFileLock(os.path.join(os.environ["LOCALAPPDATA"], "test.lock"))
+        assert lock.is_locked is False
+
+        with lock:
+            with lock.read():
+                with lock.write():
+                    assert lock.is_locked is True
+            assert lock.is_locked is True
+        assert lock.is_locked is False
+
+        with lock.read():
+            with pytest.raises(RuntimeError):
+                with lock.write():
+                    pass
+        assert lock.is_locked is False
+
+        print(lock)  # repr
+
+    @pytest.mark.parametrize("shared", [False, True])
+    def test_shared_readers(self, shared: bool) -> None:
+        """
+        Test that readers run in parallel and writers wait for them.
+
+        Every lock instance opens its own file descriptor, so separate instances behave like separate processes. A
+        shared instance checks the locking between the threads of a process.
+        """
+
+        lock_file = os.path.join(os.environ["LOCALAPPDATA"], "test.lock")
+        shared_lock = ReadWriteFileLock(lock_file)
+        events = []
+        readers_ready = threading.Barrier(3)
+
+        def get_lock() -> ReadWriteFileLock:
+            return shared_lock if shared else ReadWriteFileLock(lock_file)
+
+        def reader(num: int) -> None:
+            with get_lock().read():
+                events.append(f"read_{num}")
+                # Both readers hold the lock at the same time, otherwise the barrier times out
+                readers_ready.wait(timeout=5)
+                time.sleep(0.2)
+                # Still under the lock, the writer cannot come in between.
+                events.append("read_done")
+
+        def writer() -> None:
+            readers_ready.wait(timeout=5)
+            with get_lock().write():
+                events.append("write")
+
+        threads = [threading.Thread(target=reader, args=[num]) for num in range(0, 2)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(events[:2]) == ["read_0", "read_1"]
+        assert events[2:] == ["read_done", "read_done", "write"]
+        assert shared_lock.is_locked is False